@@ -3,6 +3,288 @@ import pandas as pd
 import psycopg2
 from datetime import datetime
 
+from cache import cached, invalidate_tables
+from metrics import instrumented, read_sql
+from plant_picker import plant_picker
+
+
+# ================================================================
+#  CACHED LOADERS  (invalidated per table, see cache.py)
+# ================================================================
+
+@instrumented
+@cached(tables=("app_users",), ttl=300)
+def load_users(_get_conn):
+    with _get_conn() as conn:
+        return read_sql("SELECT DISTINCT username, role FROM app_users ORDER BY username;", conn)
+
+
+# one entry per plant / contact looked at; bounded so a long-running server
+# doesn't keep every lookup forever (hit/miss/evictions: admin sidebar)
+@instrumented
+@cached(tables=("contact_plant_info",), ttl=600, max_entries=500, max_bytes=8 * 1024 * 1024)
+def load_contacts_for_plant(_get_conn, plant_id):
+    """Load contacts for a plant (cached)."""
+    with _get_conn() as conn:
+        query = """
+            SELECT 
+                cont_fname || ' ' || cont_lname AS full_name, 
+                MIN(cont_id) AS cont_id,
+                cont_fname, 
+                cont_lname
+            FROM contact_plant_info
+            WHERE plant_id = %s
+            GROUP BY cont_fname, cont_lname
+            ORDER BY cont_lname, cont_fname;
+        """
+        df = read_sql(query, conn, params=(plant_id,))
+    return df
+
+
+@instrumented
+@cached(tables=("contact_plant_info",), ttl=600, max_entries=2000, max_bytes=2 * 1024 * 1024)
+def load_contact_details(_get_conn, cont_id):
+    """Fetch email + phone for an existing contact."""
+    with _get_conn() as conn:
+        details_query = """
+            SELECT email, phone_number 
+            FROM contact_plant_info
+            WHERE cont_id = %s;
+        """
+        df = read_sql(details_query, conn, params=(cont_id,))
+    return df
+
+
+FEED_PAGE_SIZE = 50
+FEED_POLL = "30s"
+# ids are drawn at INSERT, not at commit, so a row can commit after higher
+# ids were already polled; each poll re-reads this many ids below the highest
+FEED_POLL_OVERLAP = 20
+
+# keyset pages on (created_at, id), served by sales_activity_feed_idx
+# (migration 004); polls go by id alone. Cursor columns ride along, hidden
+# on screen.
+FEED_QUERY = """
+    SELECT 
+        a.username AS "User",
+        COALESCE(c.cont_fname || ' ' || c.cont_lname, a.cont_id::text) AS "Contact",
+        a.plantname AS "Plant",
+        a.activitytype AS "Contacted Via",
+        a.notes AS "Notes",
+        a.follow_up_date AS "Follow-up Date",
+        TO_CHAR(a.created_at, 'YYYY-MM-DD HH24:MI') AS "Created At",
+        a.created_at AS _created_at,
+        a.id AS _id
+    FROM sales_activity a
+    LEFT JOIN contact_plant_info c ON a.cont_id = c.cont_id
+    WHERE {where}
+    ORDER BY {order}
+    LIMIT %s;
+"""
+
+
+def _feed_where(role, user, cursor=None, after_id=None):
+    where, params = [], []
+    if role != "admin":
+        where.append("a.username = %s")
+        params.append(user)
+    if cursor is not None:
+        where.append("(a.created_at, a.id) < (%s, %s)")
+        params.extend(cursor)
+    if after_id is not None:
+        where.append("a.id > %s")
+        params.append(after_id)
+    return " AND ".join(where) or "TRUE", params
+
+
+@instrumented
+@cached(tables=("sales_activity", "contact_plant_info"), ttl=120, max_entries=64)
+def load_activity_page(_get_conn, role, user, before=None, limit=FEED_PAGE_SIZE):
+    """Newest `limit` activities older than the `before` cursor (None = newest)."""
+    where, params = _feed_where(role, user, cursor=before)
+    with _get_conn() as conn:
+        return read_sql(
+            FEED_QUERY.format(where=where, order="a.created_at DESC, a.id DESC"),
+            conn, params=params + [limit],
+        )
+
+
+@instrumented
+def load_activity_since(_get_conn, role, user, after_id,
+                        limit=FEED_PAGE_SIZE + FEED_POLL_OVERLAP):
+    """
+    Activities with an id above `after_id - FEED_POLL_OVERLAP`, newest first
+    (not cached); callers drop the ones they already have.
+
+    Not created_at: that is now() at the start of the inserting transaction,
+    so a row can commit long after later-dated ones are on screen. The id is
+    drawn by log_activity's single INSERT right before it commits, so commits
+    land out of id order only briefly: a row still shows up as long as fewer
+    than FEED_POLL_OVERLAP higher ids were polled before it committed, and
+    otherwise on the next reload.
+    """
+    where, params = _feed_where(role, user, after_id=after_id - FEED_POLL_OVERLAP)
+    with _get_conn() as conn:
+        df = read_sql(
+            FEED_QUERY.format(where=where, order="a.id"), conn, params=params + [limit]
+        )
+    return df.iloc[::-1].reset_index(drop=True)
+
+
+def _cursor(row):
+    return (row["_created_at"].to_pydatetime(), int(row["_id"]))
+
+
+def _new_feed(get_conn, role, user):
+    page = load_activity_page(get_conn, role, user)
+    return {
+        "owner": (role, user),
+        "rows": page,
+        "oldest": _cursor(page.iloc[-1]) if not page.empty else None,
+        "last_id": int(page["_id"].max()) if not page.empty else None,
+        "exhausted": len(page) < FEED_PAGE_SIZE,
+    }
+
+
+def _load_older(get_conn):
+    feed = st.session_state["activity_feed"]
+    page = load_activity_page(get_conn, *feed["owner"], before=feed["oldest"])
+    feed["rows"] = pd.concat([feed["rows"], page], ignore_index=True)
+    feed["exhausted"] = len(page) < FEED_PAGE_SIZE
+    if not page.empty:
+        feed["oldest"] = _cursor(page.iloc[-1])
+
+
+def _refresh_feed(get_conn, role, user):
+    feed = st.session_state.get("activity_feed")
+    if feed is None or feed["owner"] != (role, user) or feed["last_id"] is None:
+        return _new_feed(get_conn, role, user)
+
+    fresh = load_activity_since(get_conn, role, user, feed["last_id"])
+    if len(fresh) >= FEED_PAGE_SIZE + FEED_POLL_OVERLAP:
+        # too far behind to stitch; start over from the newest page
+        return _new_feed(get_conn, role, user)
+    if not fresh.empty:
+        feed["last_id"] = max(feed["last_id"], int(fresh["_id"].max()))
+        # skip rows already paged in, and leave ones dated before the
+        # loaded pages to "Load more"
+        shown = set(feed["rows"]["_id"])
+        fresh = fresh[[
+            row["_id"] not in shown and (feed["exhausted"] or _cursor(row) > feed["oldest"])
+            for _, row in fresh.iterrows()
+        ]]
+    if not fresh.empty:
+        # a late commit can be dated before rows already shown
+        feed["rows"] = pd.concat([fresh, feed["rows"]], ignore_index=True).sort_values(
+            ["_created_at", "_id"], ascending=False, ignore_index=True,
+        )
+    return feed
+
+
+@st.fragment(run_every=FEED_POLL)
+def activity_feed(get_conn, role, user):
+    """
+    Recent Activity, newest first. Pages are kept in session_state: "Load
+    more" fetches only the next older page, and each poll fetches only rows
+    with an id near or above the highest one seen (FEED_POLL_OVERLAP).
+    """
+    # the fragment reruns on its own, outside display_sales_activity
+    try:
+        feed = _refresh_feed(get_conn, role, user)
+    except psycopg2.Error as e:
+        st.error(f"Database error while fetching records: {str(e).strip()}")
+        return
+    st.session_state["activity_feed"] = feed
+
+    if feed["rows"].empty:
+        st.info("📭 No activities logged yet.")
+        return
+
+    st.dataframe(
+        feed["rows"].drop(columns=["_created_at", "_id"]),
+        use_container_width=True,
+        hide_index=True,
+    )
+    st.caption(f"Showing the {len(feed['rows'])} most recent activities.")
+    if not feed["exhausted"]:
+        st.button(
+            "Load more", key="activity_load_more",
+            on_click=_load_older, args=(get_conn,),
+        )
+
+
+def log_activity(get_conn, plant_id, plantname, contact_name, cont_id,
+                 email, phone, username, activity_type, notes, follow_up):
+    """
+    Insert one activity, creating the contact first if nobody matches
+    `contact_name`. Returns True if a contact was created.
+    """
+    first, *last = contact_name.strip().split(" ", 1)
+    last = last[0] if last else ""
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            # One round trip: resolve the contact (picked id, else
+            # exact indexed name match, this plant first), create
+            # it if nobody matched, then log the activity
+            cur.execute("""
+                WITH found AS (
+                    SELECT cont_id FROM contact_plant_info
+                    WHERE %(cont_id)s::text IS NULL
+                      AND lower(cont_fname || ' ' || cont_lname) = lower(%(full_name)s)
+                    ORDER BY plant_id = %(plant_id)s DESC
+                    LIMIT 1
+                ),
+                created AS (
+                    INSERT INTO contact_plant_info (
+                        cont_id, plant_id, cont_fname, cont_lname, email, phone_number
+                    )
+                    SELECT %(new_id)s, %(plant_id)s, %(first)s, %(last)s, %(email)s, %(phone)s
+                    WHERE %(cont_id)s::text IS NULL
+                      AND NOT EXISTS (SELECT 1 FROM found)
+                    ON CONFLICT (cont_id) DO NOTHING
+                    RETURNING cont_id
+                )
+                INSERT INTO sales_activity (
+                    cont_id,
+                    plant_id,
+                    plantname,
+                    username,
+                    activitytype,
+                    notes,
+                    follow_up_date
+                )
+                SELECT
+                    COALESCE(
+                        %(cont_id)s,
+                        (SELECT cont_id FROM found),
+                        (SELECT cont_id FROM created),
+                        %(new_id)s
+                    ),
+                    %(plant_id)s, %(plantname)s, %(username)s,
+                    %(activity_type)s, %(notes)s, %(follow_up)s
+                RETURNING id, EXISTS (SELECT 1 FROM created);
+            """, {
+                "cont_id": cont_id,
+                "full_name": contact_name.strip(),
+                "new_id": f"{first} {last}".strip(),
+                "plant_id": plant_id,
+                "first": first,
+                "last": last,
+                "email": email,
+                "phone": phone,
+                "plantname": plantname,
+                "username": username,
+                "activity_type": activity_type,
+                "notes": notes,
+                "follow_up": follow_up,
+            })
+            _, contact_created = cur.fetchone()
+
+    # only loaders reading these tables rebuild, on next use
+    invalidate_tables("sales_activity", "contact_plant_info")
+    return contact_created
+
 
 def display_sales_activity(get_conn):
     st.header("🗂️ Customer Interaction History")
@@ -22,65 +304,23 @@ def display_sales_activity(get_conn):
     current_user = st.session_state.get("username", "AFCAdmin")
     current_role = st.session_state.get("role", "admin")
 
-    # ================================================================
-    #  CACHED LOADERS  (big performance gain)
-    # ================================================================
-
-    @st.cache_data(ttl=300)
-    def load_users_and_plants():
-        with get_conn() as conn:
-            users = pd.read_sql("SELECT DISTINCT username, role FROM app_users ORDER BY username;", conn)
-            plants = pd.read_sql("SELECT plant_id, plantname FROM general_plant_info ORDER BY plantname;", conn)
-        return users, plants
-
-    users_df, plants_df = load_users_and_plants()
+    users_df = load_users(get_conn)
     user_list = users_df["username"].tolist()
-    plant_names = plants_df["plantname"].tolist()
-
-    @st.cache_data
-    def load_contacts_for_plant(plantname):
-        """Load contacts for a plant (cached)."""
-        with get_conn() as conn:
-            query = """
-                SELECT DISTINCT 
-                    cont_fname || ' ' || cont_lname AS full_name, 
-                    cont_fname, 
-                    cont_lname
-                FROM contact_plant_info
-                WHERE plant_id = (
-                    SELECT plant_id FROM general_plant_info
-                    WHERE TRIM(plantname) ILIKE %s LIMIT 1
-                )
-                ORDER BY cont_lname, cont_fname;
-            """
-            df = pd.read_sql(query, conn, params=(f"%{plantname}%",))
-        return df
-
-    @st.cache_data
-    def load_contact_details(contact_name):
-        """Fetch email + phone for an existing contact."""
-        with get_conn() as conn:
-            details_query = """
-                SELECT email, phone_number 
-                FROM contact_plant_info
-                WHERE cont_fname || ' ' || cont_lname ILIKE %s
-                LIMIT 1;
-            """
-            df = pd.read_sql(details_query, conn, params=(f"%{contact_name}%",))
-        return df
 
     # ================================================================
     # STEP 1: Select Plant & Contact
     # ================================================================
     st.subheader("Select Plant & Contact")
 
-    plantname = st.selectbox("Plant Name:", [""] + plant_names)
+    plant_id, plantname = plant_picker(get_conn, "Plant Name:", key="activity_plant")
 
-    if plantname:
-        contact_df = load_contacts_for_plant(plantname)
+    if plant_id is not None:
+        contact_df = load_contacts_for_plant(get_conn, plant_id)
         contact_list = contact_df["full_name"].tolist()
+        contact_ids = dict(zip(contact_df["full_name"], contact_df["cont_id"]))
     else:
         contact_list = []
+        contact_ids = {}
 
     # ================================================================
     # Contact selection — hybrid input
@@ -109,7 +349,7 @@ def display_sales_activity(get_conn):
     # STEP 2: Auto-populate contact details
     # ================================================================
     if contact_name and contact_name in contact_list:
-        details_df = load_contact_details(contact_name)
+        details_df = load_contact_details(get_conn, contact_ids[contact_name])
         if not details_df.empty:
             contact_email = details_df.loc[0, "email"] or ""
             contact_phone = details_df.loc[0, "phone_number"] or ""
@@ -151,58 +391,15 @@ def display_sales_activity(get_conn):
             st.warning("Please fill in at least Plant, Contact, and Notes.")
         else:
             try:
-                with get_conn() as conn:
-                    with conn.cursor() as cur:
-
-                        # Insert new contact if needed
-                        cur.execute("""
-                            SELECT cont_id FROM contact_plant_info 
-                            WHERE cont_fname || ' ' || cont_lname ILIKE %s LIMIT 1;
-                        """, (f"%{contact_name}%",))
-                        existing_contact = cur.fetchone()
-
-                        if not existing_contact:
-                            first, *last = contact_name.split(" ", 1)
-                            last = last[0] if last else ""
-                            contact_id = f"{first} {last}".strip()
-
-                            cur.execute("""
-                                INSERT INTO contact_plant_info (
-                                    cont_id, plant_id, cont_fname, cont_lname, email, phone_number
-                                )
-                                VALUES (
-                                    %s,
-                                    (SELECT plant_id FROM general_plant_info WHERE plantname ILIKE %s LIMIT 1),
-                                    %s, %s, %s, %s
-                                );
-                            """, (contact_id, f"%{plantname}%", first, last, email, phone))
-                            st.info(f"🆕 Added new contact '{contact_name}' to {plantname}")
-
-                        # Insert activity
-                        cur.execute("""
-                            INSERT INTO sales_activity (
-                                cont_id,
-                                plant_id,
-                                plantname,
-                                username,
-                                activitytype,
-                                notes,
-                                follow_up_date
-                            )
-                            VALUES (
-                                (SELECT cont_id FROM contact_plant_info 
-                                 WHERE cont_fname || ' ' || cont_lname ILIKE %s LIMIT 1),
-                                (SELECT plant_id FROM general_plant_info 
-                                 WHERE plantname ILIKE %s LIMIT 1),
-                                %s, %s, %s, %s, %s
-                            );
-                        """, (f"%{contact_name}%", f"%{plantname}%", plantname,
-                              username, activity_type, notes, follow_up))
-
-                        conn.commit()
+                contact_created = log_activity(
+                    get_conn, plant_id, plantname, contact_name,
+                    contact_ids.get(contact_name), email, phone,
+                    username, activity_type, notes, follow_up,
+                )
 
+                if contact_created:
+                    st.info(f"🆕 Added new contact '{contact_name}' to {plantname}")
                 st.success(f"✅ Activity for {contact_name} at {plantname} logged successfully!")
-                st.cache_data.clear()
 
             except psycopg2.Error as e:
                 st.error(f"Database error: {e.pgerror}")
@@ -215,46 +412,4 @@ def display_sales_activity(get_conn):
     st.markdown("---")
     st.subheader("Recent Activity")
 
-    @st.cache_data(ttl=120)
-    def load_activity_log(role, user):
-        with get_conn() as conn:
-            if role == "admin":
-                query = """
-                    SELECT 
-                        a.username AS "User",
-                        COALESCE(c.cont_fname || ' ' || c.cont_lname, a.cont_id::text) AS "Contact",
-                        a.plantname AS "Plant",
-                        a.activitytype AS "Contacted Via",
-                        a.notes AS "Notes",
-                        a.follow_up_date AS "Follow-up Date",
-                        TO_CHAR(a.created_at, 'YYYY-MM-DD HH24:MI') AS "Created At"
-                    FROM sales_activity a
-                    LEFT JOIN contact_plant_info c ON a.cont_id = c.cont_id
-                    ORDER BY a.created_at DESC;
-                """
-                return pd.read_sql(query, conn)
-            else:
-                query = """ 
-                    SELECT 
-                        a.username AS "User",
-                        COALESCE(c.cont_fname || ' ' || c.cont_lname, a.cont_id::text) AS "Contact",
-                        a.plantname AS "Plant",
-                        a.activitytype AS "Contacted Via",
-                        a.notes AS "Notes",
-                        a.follow_up_date AS "Follow-up Date",
-                        TO_CHAR(a.created_at, 'YYYY-MM-DD HH24:MI') AS "Created At"
-                    FROM sales_activity a
-                    LEFT JOIN contact_plant_info c ON a.cont_id = c.cont_id
-                    WHERE a.username = %s
-                    ORDER BY a.created_at DESC;
-                """
-                return pd.read_sql(query, conn, params=(user,))
-
-    try:
-        df = load_activity_log(current_role, current_user)
-        if not df.empty:
-            st.dataframe(df, use_container_width=True, hide_index=True)
-        else:
-            st.info("📭 No activities logged yet.")
-    except psycopg2.Error as e:
-        st.error(f"Database error while fetching records: {e.pgerror}")
+    activity_feed(get_conn, current_role, current_user)
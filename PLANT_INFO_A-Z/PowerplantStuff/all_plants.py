@@ -2,39 +2,138 @@ import pandas as pd
 import streamlit as st
 import psycopg2
 
+from metrics import instrumented, read_sql
+
+
+PAGE_SIZES = [50, 100, 250, 500]
+DEFAULT_PAGE_SIZE = 100
+
+# display label -> column (whitelist, the ORDER BY is built from this)
+SORT_COLUMNS = {
+    "Plant Name": "plantname",
+    "Owner Name": "ownername",
+    "City": "company_city",
+    "State": "company_state",
+    "Primary Fuel Type": "fuel_type_1",
+}
+
+
+# ------------------------------------------------------
+# CACHED QUERIES
+# ------------------------------------------------------
+@instrumented
+@st.cache_data(ttl=900)
+def count_all_plants(_get_conn):
+    """Total plants, only used for the 'Page x of y' label."""
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM public.general_plant_info;")
+            return cur.fetchone()[0]
+
+
+@instrumented
+@st.cache_data(ttl=300)
+def load_plant_page(_get_conn, sort_col, descending, after, page_size):
+    """
+    One page of plants using keyset pagination on (sort_col, plant_id).
+    `after` is the (sort value, plant_id) of the last row of the previous page.
+    Each sort has a matching (COALESCE(col, ''), plant_id) index (migration
+    008), so every page is an index range scan; keep the expressions in sync.
+    """
+    sort_sql = f"COALESCE({SORT_COLUMNS[sort_col]}, '')"
+    direction = "DESC" if descending else "ASC"
+    op = "<" if descending else ">"
+
+    where = ""
+    params = []
+    if after is not None:
+        where = f"WHERE ({sort_sql}, plant_id) {op} (%s, %s)"
+        params = list(after)
+
+    query = f"""
+        SELECT plant_id, {sort_sql} AS sort_key,
+               plantname, ownername, company_address, company_city, company_state,
+               fuel_type_1, company_url
+        FROM public.general_plant_info
+        {where}
+        ORDER BY {sort_sql} {direction}, plant_id {direction}
+        LIMIT %s;
+    """
+    with _get_conn() as conn:
+        return read_sql(query, conn, params=params + [page_size])
+
 
 def display_all_plant(get_conn):
         st.subheader("☢️All Plants (Without Filters)")
-                    
+
         help_btn = st.popover("❓ Help")
         with help_btn:
             st.markdown("""
         ℹ️ **How to Use This Tab**
         - **All Plants** The purpose of the current tab is to have all the plants displayed.
         - If you don't know where to start you can start by scrolling down the list, finding one you like and start researching more on it!
+        - Use **Sort by** and **Rows per page** to move through the list, then **Prev/Next** to flip pages.
             """)
         st.write("The table below displays all the operational powerplants without any filters, some may contain contacts")
-        with get_conn() as conn:
-            gen_query = """
-            SELECT plantname, ownername, company_address, company_city, company_state,fuel_type_1, company_url FROM public.general_plant_info
-            """
-            gen_df = pd.read_sql_query(gen_query, conn)
-
-            if not gen_df.empty:
-                gen_df = gen_df.drop(columns=["plant_id","parentname"], errors="ignore")
-
-                gen_df = gen_df.rename(columns={
-                    "plantname":"Plant Name",
-                    "ownername":"Owner Name",
-                    "company_address":"Address",
-                    "company_city":"City",
-                    "company_state":"State",
-                    "company_phone":"Phone Number",
-                    "fuel_type_1":"Primary Fuel Type",
-                    "company_url":"URL"
-                })
-                st.dataframe(gen_df,width="stretch", hide_index=True, height="auto")
-
-
-            else:
-                st.warning("No plants found :((")
\ No newline at end of file
+
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            sort_col = st.selectbox("Sort by", list(SORT_COLUMNS), key="ap_sort")
+        with col2:
+            descending = st.toggle("Descending", key="ap_desc")
+        with col3:
+            page_size = st.selectbox(
+                "Rows per page", PAGE_SIZES,
+                index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key="ap_size"
+            )
+
+        # cursors[i] = key of the last row before page i (None for page 0)
+        view = (sort_col, descending, page_size)
+        if st.session_state.get("ap_view") != view:
+            st.session_state["ap_view"] = view
+            st.session_state["ap_cursors"] = [None]
+        cursors = st.session_state["ap_cursors"]
+
+        gen_df = load_plant_page(get_conn, sort_col, descending, cursors[-1], page_size)
+        total = count_all_plants(get_conn)
+        total_pages = max((total - 1) // page_size + 1, 1)
+        page = len(cursors) - 1
+
+        next_cursor = None
+        if not gen_df.empty:
+            last = gen_df[["sort_key", "plant_id"]].tail(1).to_dict("records")[0]
+            next_cursor = (last["sort_key"], last["plant_id"])
+
+            gen_df = gen_df.drop(columns=["plant_id", "sort_key", "parentname"], errors="ignore")
+
+            gen_df = gen_df.rename(columns={
+                "plantname":"Plant Name",
+                "ownername":"Owner Name",
+                "company_address":"Address",
+                "company_city":"City",
+                "company_state":"State",
+                "company_phone":"Phone Number",
+                "fuel_type_1":"Primary Fuel Type",
+                "company_url":"URL"
+            })
+            st.dataframe(gen_df,width="stretch", hide_index=True, height="auto")
+        else:
+            st.warning("No plants found :((")
+
+        # outside the empty check so an empty page still has a way back
+        colA, colB, colC = st.columns([1, 2, 1])
+        with colA:
+            if st.button("⬅️ Prev", disabled=page == 0, key="ap_prev"):
+                cursors.pop()
+                st.rerun()
+        with colB:
+            st.markdown(
+                f"<div style='text-align:center;'>Page {page+1} of {total_pages} "
+                f"({total:,} plants)</div>",
+                unsafe_allow_html=True,
+            )
+        with colC:
+            if st.button("Next ➡️", disabled=page + 1 >= total_pages or next_cursor is None,
+                         key="ap_next"):
+                cursors.append(next_cursor)
+                st.rerun()
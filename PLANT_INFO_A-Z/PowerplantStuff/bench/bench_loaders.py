@@ -0,0 +1,306 @@
+"""
+Loader benchmark: times every dashboard loader against the synthetic
+databases from bench/synthetic.py and writes the results as JSON.
+
+    python bench/bench_loaders.py                       # 1x, 5 runs each
+    python bench/bench_loaders.py --scale 1 10 100 --repeat 3
+    python bench/bench_loaders.py --compare bench/results/loaders-20260101-120000.json
+
+Loaders are called with their caches stripped off (st.cache_data,
+@cached, @instrumented), so each run measures query + pandas work the way
+a cache miss does. test.py is the app script and can't be imported, so its
+loaders are lifted out of the source by name.
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import date, datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.join(BENCH_DIR, "..")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+# keep benchmark runs out of the app's slow log and off the metrics port
+os.makedirs(RESULTS_DIR, exist_ok=True)
+os.environ.setdefault("SLOW_QUERY_LOG", os.path.join(RESULTS_DIR, "slow_queries.jsonl"))
+os.environ.setdefault("SLOW_QUERY_EXPLAIN", "0")
+os.environ.setdefault("METRICS_PORT", "0")
+# loaders run outside `streamlit run`; its bare-mode warnings are noise here
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+warnings.filterwarnings("ignore", category=UserWarning)   # pandas wants SQLAlchemy
+
+import pandas as pd  # noqa: E402
+import psycopg2  # noqa: E402
+import streamlit as st  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+import activity  # noqa: E402
+import all_plants  # noqa: E402
+import login  # noqa: E402
+import outtage  # noqa: E402
+import plant_picker  # noqa: E402
+import search_index  # noqa: E402
+import synthetic  # noqa: E402
+from cache import TaggedLoader, cached  # noqa: E402
+from calldir import build_call_query  # noqa: E402
+from db import ConnectionPool  # noqa: E402
+from metrics import instrumented, read_sql  # noqa: E402
+
+TEST_PY_FUNCTIONS = ["load_filter_data", "load_main_plant_summary", "build_search_queries"]
+
+
+def raw(func):
+    """The undecorated loader under any cache/instrumentation wrappers."""
+    while True:
+        if isinstance(func, TaggedLoader):
+            func = func.func
+        elif hasattr(func, "__wrapped__"):
+            func = func.__wrapped__
+        else:
+            return func
+
+
+def test_py_functions(get_conn, decorated=False):
+    """
+    Pull TEST_PY_FUNCTIONS out of test.py, without their decorators unless
+    `decorated` (then they cache under the same names as in the app).
+    """
+    with open(os.path.join(BASE_DIR, "test.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    nodes = [n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name in TEST_PY_FUNCTIONS]
+    if not decorated:
+        for node in nodes:
+            node.decorator_list = []
+    namespace = {"__name__": "__main__", "get_conn": get_conn, "read_sql": read_sql,
+                 "pd": pd, "st": st, "cached": cached, "instrumented": instrumented}
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), "test.py", "exec"), namespace)
+    return {name: namespace[name] for name in TEST_PY_FUNCTIONS}
+
+
+def samples(get_conn):
+    """Realistic arguments: the busiest state/fuel/plant/user in this dataset."""
+    with get_conn() as conn, conn.cursor() as cur:
+        def one(sql):
+            cur.execute(sql)
+            return cur.fetchone()[0]
+        plant_id = one("SELECT plant_id FROM contact_plant_info GROUP BY plant_id "
+                       "ORDER BY count(*) DESC LIMIT 1;")
+        return {
+            "state": one("SELECT company_state FROM general_plant_info GROUP BY 1 ORDER BY count(*) DESC LIMIT 1;"),
+            "fuel": one("SELECT fuel_type_1 FROM general_plant_info GROUP BY 1 ORDER BY count(*) DESC LIMIT 1;"),
+            "plantname": one("SELECT plantname FROM general_plant_info ORDER BY plant_id LIMIT 1;"),
+            "plant_id": plant_id,
+            "cont_id": one(f"SELECT min(cont_id) FROM contact_plant_info WHERE plant_id = {int(plant_id)};"),
+            "user": one("SELECT username FROM sales_activity GROUP BY 1 ORDER BY count(*) DESC LIMIT 1;"),
+            "plant_ids": [r for r in pd.read_sql(
+                "SELECT plant_id FROM outtage_info WHERE start_date >= CURRENT_DATE "
+                "ORDER BY start_date LIMIT 100;", conn)["plant_id"].tolist()],
+        }
+
+
+def cases(get_conn, s):
+    """(name, zero-arg callable) for every loader and tab query."""
+    t = test_py_functions(get_conn)
+    today = date.today()
+
+    def search_sql(**filters):
+        args = {"plantname": "All", "plantstate": "All", "plantfuel": "All",
+                "drive_info": "All", "drivemanufacturer": "All", "drivestartup": ""}
+        args.update(filters)
+        contact_query, drive_query, plant_params, drive_params = t["build_search_queries"](**args)
+        with get_conn() as conn:
+            return (read_sql(contact_query, conn, params=plant_params),
+                    read_sql(drive_query, conn, params=plant_params + drive_params))
+
+    def call_sql(state="", role="", fuel=""):
+        query, params = build_call_query(state, role, fuel)
+        with get_conn() as conn:
+            return read_sql(query, conn, params=params)
+
+    def prefetch():
+        outtage.contact_cache().clear()
+        raw(outtage.prefetch_contacts)(get_conn, s["plant_ids"])
+        return s["plant_ids"]
+
+    built = {}
+
+    def index():
+        # built on first use only: takes seconds at 100x
+        if "index" not in built:
+            built["index"] = raw(search_index.load_search_index)(get_conn, None)
+        return built["index"]
+
+    version = raw(outtage.outage_version)(get_conn)
+    tsquery = outtage.build_tsquery("pump, inspection")
+    # an id 50 rows back from the newest, so "since" has a page to return
+    page = raw(activity.load_activity_page)(get_conn, "admin", "admin")
+    since = int(page["_id"].min())
+
+    return [
+        ("test.load_filter_data", t["load_filter_data"]),
+        ("test.load_main_plant_summary", t["load_main_plant_summary"]),
+        ("test.search_sql[no filters]", lambda: search_sql()),
+        ("test.search_sql[state+fuel]", lambda: search_sql(plantstate=s["state"], plantfuel=s["fuel"])),
+        ("test.search_sql[plant name]", lambda: search_sql(plantname=s["plantname"])),
+        ("search_index.search_index_version", lambda: raw(search_index.search_index_version)(get_conn)),
+        ("search_index.load_search_index", lambda: raw(search_index.load_search_index)(get_conn, None)),
+        ("search_index.search[state+fuel]", lambda: index().search(state=s["state"], fuel=s["fuel"])),
+        ("calldir.call_query[state]", lambda: call_sql(state=s["state"])),
+        ("calldir.call_query[title]", lambda: call_sql(role="plant")),
+        ("outtage.outage_version", lambda: raw(outtage.outage_version)(get_conn)),
+        ("outtage.load_outage_snapshot", lambda: raw(outtage.load_outage_snapshot)(get_conn, version, today)),
+        ("outtage.load_comment_filters", lambda: raw(outtage.load_comment_filters)(get_conn, version)),
+        ("outtage.search_comments[pump, inspection]",
+         lambda: raw(outtage.search_comments)(get_conn, version, tsquery, "All", "All", today)),
+        ("outtage.prefetch_contacts[100 plants]", prefetch),
+        ("activity.load_users", lambda: raw(activity.load_users)(get_conn)),
+        ("activity.load_contacts_for_plant", lambda: raw(activity.load_contacts_for_plant)(get_conn, s["plant_id"])),
+        ("activity.load_contact_details", lambda: raw(activity.load_contact_details)(get_conn, s["cont_id"])),
+        ("activity.load_activity_page[admin]", lambda: raw(activity.load_activity_page)(get_conn, "admin", "admin")),
+        ("activity.load_activity_page[user]", lambda: raw(activity.load_activity_page)(get_conn, "user", s["user"])),
+        ("activity.load_activity_since", lambda: raw(activity.load_activity_since)(get_conn, "admin", "admin", since)),
+        ("all_plants.count_all_plants", lambda: raw(all_plants.count_all_plants)(get_conn)),
+        ("all_plants.load_plant_page[first]",
+         lambda: raw(all_plants.load_plant_page)(get_conn, "Plant Name", False, None, 100)),
+        ("login.user_directory_version", lambda: raw(login.user_directory_version)(get_conn)),
+        ("login.load_user_directory", lambda: raw(login.load_user_directory)(get_conn, None)),
+        ("plant_picker.search_plants", lambda: raw(plant_picker.search_plants)(get_conn, s["plantname"][:2].lower())),
+    ]
+
+
+def row_count(value):
+    if isinstance(value, tuple):
+        return sum(row_count(v) for v in value)
+    if hasattr(value, "__len__") and not isinstance(value, str):
+        return len(value)
+    return 1
+
+
+def time_case(func, repeat):
+    func()      # warm the connection / plan cache, not counted
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        value = func()
+        runs.append((time.perf_counter() - t0) * 1000)
+    runs.sort()
+    return {
+        "rows": row_count(value),
+        "min_ms": round(runs[0], 3),
+        "median_ms": round(statistics.median(runs), 3),
+        "p95_ms": round(runs[max(int(len(runs) * 0.95 + 0.5) - 1, 0)], 3),
+        "max_ms": round(runs[-1], 3),
+    }
+
+
+def table_counts(get_conn):
+    with get_conn() as conn, conn.cursor() as cur:
+        counts = {}
+        for table in synthetic.BASE_ROWS:
+            cur.execute(f"SELECT count(*) FROM {table};")
+            counts[table] = cur.fetchone()[0]
+        cur.execute("SHOW server_version;")
+        return counts, cur.fetchone()[0]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, results, threshold):
+    """Print median ratios against an older run; returns the regressions."""
+    with open(old_path, encoding="utf-8") as f:
+        old = {(r["scale"], r["name"]): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\nvs {os.path.basename(old_path)}")
+    for r in results:
+        before = old.get((r["scale"], r["name"]))
+        if not before:
+            continue
+        ratio = r["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        # sub-millisecond noise is not a regression
+        slower = ratio > threshold and r["median_ms"] - before["median_ms"] > 1
+        if slower:
+            regressions.append(r)
+        print(f"{r['scale']:>4}x {r['name']:<44} {before['median_ms']:>9.1f} -> "
+              f"{r['median_ms']:>9.1f} ms  {ratio:>5.2f}x{'  SLOWER' if slower else ''}")
+    return regressions
+
+
+def main(argv=None):
+    load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, nargs="+", default=[1], choices=synthetic.SCALES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42, help="used when a dataset has to be built")
+    parser.add_argument("--rebuild", action="store_true", help="regenerate the synthetic databases first")
+    parser.add_argument("--only", help="run cases whose name contains this")
+    parser.add_argument("--out", help="JSON path (default bench/results/loaders-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="median ratio that counts as a regression (default 1.2)")
+    args = parser.parse_args(argv)
+
+    started = datetime.now(timezone.utc)
+    report = {
+        "meta": {
+            "started": started.isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "repeat": args.repeat,
+            "datasets": {},
+        },
+        "results": [],
+    }
+
+    for scale in args.scale:
+        dsn = synthetic.ensure(scale, seed=args.seed, rebuild=args.rebuild)
+        pool = ConnectionPool(dsn, minconn=1, maxconn=4)
+        try:
+            counts, server = table_counts(pool.connection)
+            report["meta"]["datasets"][f"{scale}x"] = counts
+            report["meta"]["postgres"] = server
+            print(f"\n{synthetic.DB_PREFIX}_{scale}x  " + ", ".join(f"{t}={n:,}" for t, n in counts.items()))
+            print(f"{'':<46}{'rows':>10} {'min ms':>9} {'median':>9} {'p95':>9} {'max':>9}")
+
+            for name, func in cases(pool.connection, samples(pool.connection)):
+                if args.only and args.only not in name:
+                    continue
+                try:
+                    result = time_case(func, args.repeat)
+                except psycopg2.Error as e:
+                    print(f"{name:<46} FAILED {str(e).strip().splitlines()[0]}")
+                    continue
+                report["results"].append({"scale": scale, "name": name, **result})
+                print(f"{name:<46}{result['rows']:>10,} {result['min_ms']:>9.1f} "
+                      f"{result['median_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['max_ms']:>9.1f}")
+        finally:
+            pool.closeall()
+
+    out = args.out or os.path.join(RESULTS_DIR, f"loaders-{started:%Y%m%d-%H%M%S}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nwrote {out}")
+
+    if args.compare:
+        return 1 if compare(args.compare, report["results"], args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
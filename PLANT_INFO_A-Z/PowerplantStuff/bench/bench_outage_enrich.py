@@ -0,0 +1,109 @@
+"""
+Micro-benchmark: per-row .apply() urgency code vs outtage.enrich_outages.
+
+    python bench/bench_outage_enrich.py            # 10k and 100k rows
+    python bench/bench_outage_enrich.py 1000000
+"""
+import os
+import sys
+import time
+import warnings
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+warnings.filterwarnings("ignore")
+
+from outtage import enrich_outages  # noqa: E402
+
+
+# ------------------------------------------------------
+# What outtage.py used to do, kept here for comparison
+# ------------------------------------------------------
+def _label(days):
+    if pd.isna(days):
+        return "Unknown"
+    if days <= 7:
+        return "Urgent (<7d)"
+    if days <= 30:
+        return "Upcoming (<30d)"
+    return "Future (>30d)"
+
+
+def _css(days):
+    if pd.isna(days):
+        return "soft-blue"
+    if days <= 7:
+        return "soft-red"
+    if days <= 30:
+        return "soft-orange"
+    return "soft-green"
+
+
+def _rgb(days):
+    if pd.isna(days):
+        return [160, 160, 180]
+    if days <= 7:
+        return [255, 77, 77]
+    if days <= 30:
+        return [255, 210, 77]
+    return [77, 210, 130]
+
+
+def legacy_enrich(df, today):
+    df = df.copy()
+    df["start_date"] = pd.to_datetime(df["start_date"], errors="coerce")
+    df["end_date"] = pd.to_datetime(df["end_date"], errors="coerce")
+    df["days_left"] = df["start_date"].apply(
+        lambda d: (d.date() - today).days if pd.notnull(d) else None
+    )
+    df["Urgency"] = df["days_left"].apply(_label)
+    df["css_class"] = df["days_left"].apply(_css)
+    df["color"] = df["days_left"].apply(_rgb)
+    df["radius"] = df["days_left"].apply(
+        lambda d: 60000 if d is not None and d <= 7
+        else 40000 if d is not None and d <= 30
+        else 30000
+    )
+    return df
+
+
+def make_frame(n, today, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(today) + pd.to_timedelta(rng.integers(-10, 365, n), unit="D")
+    start = pd.Series(start).mask(rng.random(n) < 0.02)  # a few missing dates
+    return pd.DataFrame({
+        "start_date": start.dt.date,
+        "end_date": (start + pd.Timedelta(days=10)).dt.date,
+    })
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main(sizes):
+    today = date.today()
+    print(f"{'rows':>10} {'apply (s)':>10} {'vector (s)':>11} {'speedup':>8}")
+    for n in sizes:
+        df = make_frame(n, today)
+
+        old = legacy_enrich(df, today)
+        new = enrich_outages(df, today)
+        assert (old["css_class"].to_numpy() == new["css_class"].to_numpy()).all()
+        assert (old["radius"].to_numpy() == new["radius"].to_numpy()).all()
+
+        t_old = best_of(lambda: legacy_enrich(df, today))
+        t_new = best_of(lambda: enrich_outages(df, today))
+        print(f"{n:>10,} {t_old:>10.3f} {t_new:>11.4f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
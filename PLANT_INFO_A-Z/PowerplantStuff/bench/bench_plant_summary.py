@@ -0,0 +1,187 @@
+"""
+Query-plan benchmark: the old contacts x drives join behind
+load_main_plant_summary vs the trigger-maintained plant_summary view.
+
+    python bench/bench_plant_summary.py                 # 12k plants, 8 contacts, 6 drives each
+    python bench/bench_plant_summary.py --plants 50000 --plans
+
+Everything is built in a throwaway schema inside one transaction that is
+rolled back at the end, so it is safe to point at the real DATABASE_URL.
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BASE_DIR)
+
+from migrations import MIGRATIONS  # noqa: E402
+
+SCHEMA = "bench_plant_summary"
+
+# ------------------------------------------------------
+# What test.py used to run, kept here for comparison
+# ------------------------------------------------------
+LEGACY_QUERY = """
+    SELECT DISTINCT
+        g.plant_id,
+        g.plantname,
+        g.ownername,
+        g.company_city,
+        g.company_state,
+        g.fuel_type_1,
+        COUNT(DISTINCT c.cont_id) AS contact_count,
+        COUNT(DISTINCT d.drive_id) AS drive_count
+    FROM general_plant_info g
+    INNER JOIN contact_plant_info c ON g.plant_id = c.plant_id
+    INNER JOIN plant_drive_info d ON g.plant_id = d.plant_id
+    GROUP BY g.plant_id, g.plantname, g.ownername, g.company_address, g.company_city, g.company_state, g.fuel_type_1
+    ORDER BY g.plantname ASC
+"""
+
+SUMMARY_QUERY = """
+    SELECT plant_id, plantname, ownername, company_city, company_state,
+           fuel_type_1, contact_count, drive_count
+    FROM plant_summary
+    ORDER BY plantname ASC
+"""
+
+
+def build_schema(cur, plants, contacts, drives):
+    cur.execute(f"CREATE SCHEMA {SCHEMA}; SET LOCAL search_path TO {SCHEMA};")
+    cur.execute(
+        """
+        CREATE TABLE general_plant_info (
+            plant_id bigint PRIMARY KEY, plantname text, ownername text,
+            company_address text, company_city text, company_state text,
+            fuel_type_1 text
+        );
+        CREATE TABLE contact_plant_info (cont_id text PRIMARY KEY, plant_id bigint);
+        CREATE TABLE plant_drive_info (drive_id bigint PRIMARY KEY, plant_id bigint);
+
+        INSERT INTO general_plant_info
+        SELECT g, 'Plant ' || g, 'Owner ' || g %% 900, g || ' Main St', 'City ' || g %% 300,
+               (ARRAY['TX','CA','OR','NY','FL'])[1 + g %% 5],
+               (ARRAY['Coal','Gas','Hydro','Wind','Solar'])[1 + g %% 5]
+        FROM generate_series(1, %(plants)s) g;
+
+        -- uneven per-plant counts, like the real data
+        INSERT INTO contact_plant_info
+        SELECT 'c' || g, 1 + (random() * random() * (%(plants)s - 1))::bigint
+        FROM generate_series(1, %(plants)s * %(contacts)s) g;
+
+        INSERT INTO plant_drive_info
+        SELECT g, 1 + (random() * random() * (%(plants)s - 1))::bigint
+        FROM generate_series(1, %(plants)s * %(drives)s) g;
+        """,
+        {"plants": plants, "contacts": contacts, "drives": drives},
+    )
+    migrations = dict(MIGRATIONS)
+    sql = migrations["002_plant_summary_counts"] + migrations["006_plant_summary_deltas"]
+    t0 = time.perf_counter()
+    cur.execute(sql)
+    backfill = time.perf_counter() - t0
+    cur.execute("ANALYZE general_plant_info; ANALYZE contact_plant_info; "
+                "ANALYZE plant_drive_info; ANALYZE plant_summary_counts;")
+    return backfill
+
+
+def explain(cur, query):
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query)
+    plan = cur.fetchone()[0][0]
+    root = plan["Plan"]
+    return {
+        "planning_ms": plan["Planning Time"],
+        "execution_ms": plan["Execution Time"],
+        "rows": root["Actual Rows"],
+        "shared_hit": root.get("Shared Hit Blocks", 0),
+        "shared_read": root.get("Shared Read Blocks", 0),
+        "temp_written": root.get("Temp Written Blocks", 0),
+    }
+
+
+def best_of(cur, query, repeat=3):
+    runs = [explain(cur, query) for _ in range(repeat)]
+    return min(runs, key=lambda r: r["execution_ms"])
+
+
+def time_statement(cur, sql):
+    t0 = time.perf_counter()
+    cur.execute(sql)
+    return (time.perf_counter() - t0) * 1000
+
+
+def drifted(cur):
+    """Summary rows whose counts disagree with the base tables."""
+    cur.execute(
+        "SELECT count(*) FROM plant_summary_counts s "
+        "WHERE (contact_count, drive_count) IS DISTINCT FROM ("
+        "  (SELECT count(*) FROM contact_plant_info c WHERE c.plant_id = s.plant_id),"
+        "  (SELECT count(*) FROM plant_drive_info d WHERE d.plant_id = s.plant_id));"
+    )
+    return cur.fetchone()[0]
+
+
+def main(argv=None):
+    load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--plants", type=int, default=12_000)
+    parser.add_argument("--contacts", type=int, default=8, help="avg contacts per plant")
+    parser.add_argument("--drives", type=int, default=6, help="avg drives per plant")
+    parser.add_argument("--plans", action="store_true", help="also print both text plans")
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        with conn.cursor() as cur:
+            backfill = build_schema(cur, args.plants, args.contacts, args.drives)
+
+            old = best_of(cur, LEGACY_QUERY)
+            new = best_of(cur, SUMMARY_QUERY)
+            assert old["rows"] == new["rows"], (old["rows"], new["rows"])
+
+            print(f"plants={args.plants:,} contacts={args.plants * args.contacts:,} "
+                  f"drives={args.plants * args.drives:,} (backfill {backfill:.2f}s)")
+            print(f"{'':>10} {'plan ms':>9} {'exec ms':>9} {'rows':>8} "
+                  f"{'hit':>8} {'read':>7} {'temp':>7}")
+            for label, r in (("join", old), ("summary", new)):
+                print(f"{label:>10} {r['planning_ms']:>9.2f} {r['execution_ms']:>9.2f} "
+                      f"{r['rows']:>8,} {r['shared_hit']:>8,} {r['shared_read']:>7,} "
+                      f"{r['temp_written']:>7,}")
+            print(f"speedup {old['execution_ms'] / new['execution_ms']:.1f}x")
+
+            # what the triggers add to writes
+            single = time_statement(
+                cur, "INSERT INTO contact_plant_info VALUES ('bench-one', 1);")
+            batch = time_statement(
+                cur,
+                "INSERT INTO contact_plant_info "
+                "SELECT 'bench-' || g, 1 + g % 500 FROM generate_series(1, 5000) g;",
+            )
+            moved = time_statement(
+                cur, "UPDATE plant_drive_info SET plant_id = plant_id + 1 WHERE drive_id <= 1000;")
+            print(f"trigger upkeep: 1 insert {single:.2f} ms, "
+                  f"5,000-row insert {batch:.1f} ms, 1,000-row move {moved:.1f} ms")
+
+            assert drifted(cur) == 0, "summary drifted from the base tables"
+            cur.execute("TRUNCATE plant_drive_info;")
+            assert drifted(cur) == 0, "summary drifted after TRUNCATE"
+
+            if args.plans:
+                for label, query in (("join", LEGACY_QUERY), ("summary", SUMMARY_QUERY)):
+                    cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + query)
+                    print(f"\n--- {label} ---")
+                    print("\n".join(r[0] for r in cur.fetchall()))
+    finally:
+        conn.rollback()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
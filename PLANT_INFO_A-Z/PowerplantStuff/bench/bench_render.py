@@ -0,0 +1,295 @@
+"""
+Render benchmark: drives test.py headless through Streamlit's AppTest,
+one scenario per tab, against the synthetic databases from
+bench/synthetic.py and writes wall time, element count and message
+payload size for every rerun as JSON.
+
+    python bench/bench_render.py                        # 1x, 3 passes each
+    python bench/bench_render.py --scale 1 10 --repeat 5
+    python bench/bench_render.py --cold --only Outtages
+    python bench/bench_render.py --compare bench/results/render-20260101-120000.json
+
+Each scenario gets a fresh AppTest session logged in as an admin, opens its
+tab and then plays a few interactions (search click, next page, ...). One
+untimed pass warms the caches unless --cold, which clears them before every
+pass. Payload is the serialized size of the ForwardMsgs a browser would
+receive for that rerun.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+from bench_loaders import (  # noqa: F401  (sets up paths and env first)
+    BASE_DIR, RESULTS_DIR, compare, git_commit, table_counts,
+)
+
+import pandas as pd  # noqa: E402
+import psycopg2  # noqa: E402
+import streamlit as st  # noqa: E402
+import streamlit.logger  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1 import app_test  # noqa: E402
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner  # noqa: E402
+
+import cache  # noqa: E402
+import db  # noqa: E402
+import outage_cards  # noqa: E402
+import synthetic  # noqa: E402
+
+APP = os.path.join(BASE_DIR, "test.py")
+RUN_TIMEOUT = 120       # seconds per rerun; 100x first loads are slow
+
+
+# ------------------------------------------------------
+# CAPTURE
+# ------------------------------------------------------
+class RecordingScriptRunner(LocalScriptRunner):
+    """LocalScriptRunner that keeps the ForwardMsgs of the rerun it ran."""
+
+    last_msgs = []
+
+    def run(self, *args, **kwargs):
+        tree = super().run(*args, **kwargs)
+        RecordingScriptRunner.last_msgs = list(self.forward_msgs())
+        return tree
+
+
+# AppTest builds a fresh runner per run(); swap in the recording one
+app_test.LocalScriptRunner = RecordingScriptRunner
+
+
+def _card_grid_stand_in(data, key=None, **kwargs):
+    # AppTest mocks the Runtime, so v2 components can't mount. An st.json
+    # carrying the same data keeps element count and payload comparable.
+    st.json(data, expanded=False)
+    return type("CardGridResult", (), {"selected": None})()
+
+
+outage_cards._card_grid = _card_grid_stand_in
+
+
+def payload(msgs):
+    """(elements, bytes) of one rerun's forward messages."""
+    elements = sum(1 for m in msgs if m.WhichOneof("type") == "delta"
+                   and m.delta.WhichOneof("type") == "new_element")
+    return elements, sum(m.ByteSize() for m in msgs)
+
+
+# ------------------------------------------------------
+# SCENARIOS
+# ------------------------------------------------------
+def _button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+def _text_input(at, label):
+    return next(t for t in at.text_input if t.label == label)
+
+
+def scenarios(s):
+    """
+    {tab: [(step name, action(at) or None)]}. The first step is the page
+    load with the tab already selected; each later action sets widgets and
+    the rerun after it is what gets timed. Every step is a full script run:
+    AppTest never fires run_every fragment polls, so the feed poll's query
+    is timed by bench_loaders (activity.load_activity_since) instead.
+    """
+    return {
+        "Search Plants By Name": [
+            ("load", None),
+            ("state filter", lambda at: at.selectbox(key="p2").set_value(s["state"])),
+            ("search click", lambda at: _button(at, "Search Plants").click()),
+        ],
+        "Call Directory Overview": [
+            ("load", None),
+            ("search all", lambda at: _button(at, "Search Contacts").click()),
+            ("search state", lambda at: (_text_input(at, "State").input(s["state"]),
+                                         _button(at, "Search Contacts").click())),
+        ],
+        "All Plants": [
+            ("load", None),
+            ("next page", lambda at: at.button(key="ap_next").click()),
+            ("500 rows", lambda at: at.selectbox(key="ap_size").set_value(500)),
+            ("sort desc", lambda at: at.toggle(key="ap_desc").set_value(True)),
+        ],
+        "Sales Activity": [
+            ("load", None),
+            ("load more", lambda at: at.button(key="activity_load_more").click()),
+        ],
+        "Outtages": [
+            ("load", None),
+            ("keyword search", lambda at: at.text_input(key="tab1_keywords").input("turbine")),
+            ("state filter", lambda at: at.selectbox(key="tab1_state").set_value(s["state"])),
+            ("next page", lambda at: _button(at, "Next ➡️").click()),
+        ],
+    }
+
+
+def samples():
+    with db.get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT company_state FROM general_plant_info "
+                    "GROUP BY 1 ORDER BY count(*) DESC LIMIT 1;")
+        return {"state": cur.fetchone()[0]}
+
+
+def clear_caches():
+    st.cache_data.clear()
+    for lru in cache._registry.values():
+        lru.clear()
+
+
+def new_session(tab):
+    at = AppTest.from_file(APP, default_timeout=RUN_TIMEOUT)
+    # what restore_login leaves behind for a signed-in admin
+    at.session_state["username"] = "admin"
+    at.session_state["role"] = "admin"
+    at.session_state["full_name"] = "Admin"
+    at.session_state["main_nav"] = tab
+    return at
+
+
+def play(tab, steps):
+    """One pass over a scenario: [(step, ms, elements, bytes, error)]."""
+    at = new_session(tab)
+    out = []
+    for step, action in steps:
+        error = None
+        # a step that fails before at.run() must not report the previous payload
+        RecordingScriptRunner.last_msgs = []
+        try:
+            if action is not None:
+                action(at)
+            t0 = time.perf_counter()
+            at.run()
+            ms = (time.perf_counter() - t0) * 1000
+            if at.exception:
+                error = at.exception[0].message.strip().splitlines()[0]
+        except (StopIteration, KeyError, RuntimeError) as e:
+            ms, error = None, f"{type(e).__name__}: {e}"
+        elements, nbytes = payload(RecordingScriptRunner.last_msgs)
+        out.append((step, ms, elements, nbytes, error))
+        if error:
+            break       # later steps depend on this one
+    return out
+
+
+def run_scenario(tab, steps, repeat, cold):
+    if not cold:
+        play(tab, steps)        # warm-up pass, not counted
+    passes = []
+    for _ in range(repeat):
+        if cold:
+            clear_caches()
+        passes.append(play(tab, steps))
+
+    results = []
+    for i, (step, _) in enumerate(steps):
+        runs = [p[i] for p in passes if len(p) > i]
+        ms = sorted(r[1] for r in runs if r[1] is not None)
+        errors = [r[4] for r in runs if r[4]]
+        last = runs[-1] if runs else (step, None, 0, 0, None)
+        results.append({
+            "name": f"{tab} / {step}",
+            "tab": tab,
+            "step": step,
+            "runs": len(ms),
+            "elements": last[2],
+            "payload_bytes": last[3],
+            "min_ms": round(ms[0], 1) if ms else None,
+            "median_ms": round(statistics.median(ms), 1) if ms else None,
+            "p95_ms": round(ms[max(int(len(ms) * 0.95 + 0.5) - 1, 0)], 1) if ms else None,
+            "max_ms": round(ms[-1], 1) if ms else None,
+            "errors": sorted(set(errors)),
+        })
+    return results
+
+
+def use_dataset(dsn):
+    """Point the app's pool at one synthetic database."""
+    try:
+        db.get_pool().closeall()
+    except KeyError:
+        pass        # no DATABASE_URL yet
+    os.environ["DATABASE_URL"] = dsn
+    st.cache_resource.clear()
+    clear_caches()
+
+
+def main(argv=None):
+    load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, nargs="+", default=[1], choices=synthetic.SCALES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cold", action="store_true", help="clear the caches before every pass")
+    parser.add_argument("--seed", type=int, default=42, help="used when a dataset has to be built")
+    parser.add_argument("--rebuild", action="store_true", help="regenerate the synthetic databases first")
+    parser.add_argument("--only", help="run tabs whose name contains this")
+    parser.add_argument("--out", help="JSON path (default bench/results/render-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="median ratio that counts as a regression (default 1.2)")
+    args = parser.parse_args(argv)
+    # AppTest parses the config after import and resets the level
+    streamlit.logger.set_log_level(os.environ["STREAMLIT_LOGGER_LEVEL"])
+
+    started = datetime.now(timezone.utc)
+    report = {
+        "meta": {
+            "started": started.isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "streamlit": st.__version__,
+            "pandas": pd.__version__,
+            "repeat": args.repeat,
+            "cold": args.cold,
+            "datasets": {},
+        },
+        "results": [],
+    }
+
+    for scale in args.scale:
+        dsn = synthetic.ensure(scale, seed=args.seed, rebuild=args.rebuild)
+        use_dataset(dsn)
+        counts, server = table_counts(db.get_conn)
+        report["meta"]["datasets"][f"{scale}x"] = counts
+        report["meta"]["postgres"] = server
+        print(f"\n{synthetic.DB_PREFIX}_{scale}x  " + ", ".join(f"{t}={n:,}" for t, n in counts.items()))
+        print(f"{'':<46}{'elements':>9} {'payload':>10} {'min ms':>9} {'median':>9} {'max':>9}")
+
+        for tab, steps in scenarios(samples()).items():
+            if args.only and args.only not in tab:
+                continue
+            try:
+                results = run_scenario(tab, steps, args.repeat, args.cold)
+            except psycopg2.Error as e:
+                print(f"{tab:<46} FAILED {str(e).strip().splitlines()[0]}")
+                continue
+            for r in results:
+                report["results"].append({"scale": scale, **r})
+                if r["median_ms"] is None:
+                    print(f"{r['name']:<46} FAILED {r['errors'][0] if r['errors'] else ''}")
+                    continue
+                print(f"{r['name']:<46}{r['elements']:>9,} {r['payload_bytes'] / 1024:>8,.0f}kB "
+                      f"{r['min_ms']:>9.0f} {r['median_ms']:>9.0f} {r['max_ms']:>9.0f}"
+                      + (f"  ! {r['errors'][0]}" if r["errors"] else ""))
+
+    out = args.out or os.path.join(RESULTS_DIR, f"render-{started:%Y%m%d-%H%M%S}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nwrote {out}")
+
+    failed = any(r["errors"] for r in report["results"])
+    if args.compare:
+        timed = [r for r in report["results"] if r["median_ms"] is not None]
+        return 1 if compare(args.compare, timed, args.threshold) or failed else 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
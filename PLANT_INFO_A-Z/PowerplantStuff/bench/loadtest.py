@@ -0,0 +1,399 @@
+"""
+Load test: N simulated sales reps hitting one server process's connection
+pool and caches at once, ramped up in stages, against the synthetic
+databases from bench/synthetic.py.
+
+    python bench/loadtest.py                             # 1x, 1/5/10/25 sessions, 30 s each
+    python bench/loadtest.py --sessions 10 50 100 --duration 60 --think 2
+    python bench/loadtest.py --mix search=4,outages=3,log=1,feed=2
+    DB_POOL_MAX=40 python bench/loadtest.py --scale 10
+
+Every session logs in once, then loops over actions picked from --mix with
+an exponential think time between them. Each action makes the same loader
+and insert calls as one rerun of its tab (the Streamlit frontend itself is
+not simulated; bench_render.py covers render cost). Per stage it reports
+throughput, latency percentiles, error rate, pool and server connection
+counts and the loader cache hit rate.
+
+Sessions write real rows (log action) into the synthetic database;
+--rebuild resets it.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from bench_loaders import (  # noqa: F401  (sets up paths and env first)
+    BASE_DIR, RESULTS_DIR, git_commit, table_counts, test_py_functions,
+)
+
+import pandas as pd  # noqa: E402
+import psycopg2  # noqa: E402
+import streamlit as st  # noqa: E402
+import streamlit.logger  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+import activity  # noqa: E402
+import cache  # noqa: E402
+import db  # noqa: E402
+import login  # noqa: E402
+import outtage  # noqa: E402
+import plant_picker  # noqa: E402
+import search_index  # noqa: E402
+import synthetic  # noqa: E402
+from metrics import LOADER_CALLS, _samples, read_sql  # noqa: E402
+from slowlog import percentile  # noqa: E402
+
+DEFAULT_MIX = "search=4,outages=3,feed=2,log=1"
+KEYWORDS = ["pump", "inspection", "turbine", "gas turb*", "boiler, valve", "generator"]
+MONITOR_SECONDS = 0.5
+# failed logins retry after 0.1 s, doubling up to 5 s, instead of spinning
+LOGIN_BACKOFF = (0.1, 5.0)
+
+
+# ------------------------------------------------------
+# ACTIONS
+# ------------------------------------------------------
+class Workload:
+    """What every session shares: test.py's loaders and realistic picks."""
+
+    def __init__(self, get_conn):
+        self.get_conn = get_conn
+        self.test_py = test_py_functions(get_conn, decorated=True)
+        with get_conn() as conn:
+            self.states = pd.read_sql(
+                "SELECT company_state, count(*) AS n FROM general_plant_info GROUP BY 1;", conn)
+            self.fuels = pd.read_sql(
+                "SELECT DISTINCT fuel_type_1 FROM general_plant_info "
+                "WHERE fuel_type_1 IS NOT NULL;", conn)["fuel_type_1"].tolist()
+            self.plants = pd.read_sql(
+                "SELECT plant_id, plantname FROM general_plant_info "
+                "ORDER BY random() LIMIT 500;", conn)
+
+    def pick_state(self, rng):
+        # busy states get searched more, like on the floor
+        return rng.choices(self.states["company_state"].tolist(),
+                           weights=self.states["n"].tolist())[0]
+
+
+class Session:
+    """One simulated rep: their login, feed cursor and random stream."""
+
+    def __init__(self, work, seed):
+        self.work = work
+        self.rng = random.Random(seed)
+        self.user = None
+        self.last_id = None         # activity feed poll cursor, like session_state
+
+    # ---------------- actions ----------------
+    def login(self):
+        """show_login: user directory, then the signed cookie round trip."""
+        users = login.get_all_users(self.work.get_conn)
+        user = self.rng.choice(users)
+        token = login.make_token(user, datetime.now() + timedelta(days=1))
+        self.user = login.read_token(token)
+        if self.user is None:
+            raise RuntimeError("session token did not verify")
+
+    def search(self):
+        """Search tab: dropdown data, plant summary, then a search click."""
+        t, get_conn, rng = self.work.test_py, self.work.get_conn, self.rng
+        t["load_filter_data"]()
+        t["load_main_plant_summary"]()
+
+        state = self.work.pick_state(rng)
+        fuel = rng.choice(self.work.fuels) if rng.random() < 0.5 else "All"
+        # a partial startup year can't use the index and goes to SQL
+        startup = rng.choice(["19", "20", "199"]) if rng.random() < 0.2 else ""
+        plantname = "All"
+        if rng.random() < 0.3:
+            name = self.work.plants["plantname"].iloc[rng.randrange(len(self.work.plants))]
+            plant_picker.search_plants(get_conn, name[:4])
+            plantname = name
+
+        if search_index.PlantSearchIndex.can_answer(startup):
+            index = search_index.load_search_index(get_conn, search_index.search_index_version(get_conn))
+            index.search(plantname=None if plantname == "All" else plantname,
+                         state=state, fuel=None if fuel == "All" else fuel, startup=startup or None)
+        else:
+            contact_query, drive_query, plant_params, drive_params = t["build_search_queries"](
+                plantname, state, fuel, "All", "All", startup)
+            with get_conn() as conn:
+                read_sql(contact_query, conn, params=plant_params)
+                read_sql(drive_query, conn, params=plant_params + drive_params)
+
+    def outages(self):
+        """Outtages tab: snapshot, comment search, one card page, one sidebar."""
+        get_conn, rng = self.work.get_conn, self.rng
+        today = date.today()
+        version = outtage.outage_version(get_conn)
+        df = outtage.load_outage_snapshot(get_conn, version, today)
+        outtage.load_comment_filters(get_conn, version)
+        outtage.search_comments(get_conn, version, outtage.build_tsquery(rng.choice(KEYWORDS)),
+                                self.work.pick_state(rng) if rng.random() < 0.5 else "All",
+                                "All", today)
+        if df.empty:
+            return
+        outtage.get_distinct_plants(df)
+        pages = max((len(df) - 1) // outtage.PAGE_SIZE + 1, 1)
+        start = min(int(rng.expovariate(0.5)), pages - 1) * outtage.PAGE_SIZE
+        page_ids = df["plant_id"].iloc[start:start + outtage.PAGE_SIZE].dropna().tolist()
+        outtage.prefetch_contacts(get_conn, page_ids)
+        if page_ids:
+            outtage.get_contacts(get_conn, rng.choice(page_ids))
+
+    def feed(self):
+        """Sales Activity poll: first page once, then only newer rows."""
+        get_conn = self.work.get_conn
+        role, user = self.user["role"], self.user["username"]
+        if self.last_id is None:
+            page = activity.load_activity_page(get_conn, role, user)
+        else:
+            page = activity.load_activity_since(get_conn, role, user, self.last_id)
+        if not page.empty:
+            self.last_id = int(page["_id"].max())
+
+    def log(self):
+        """Sales Activity form: pick plant and contact, insert, refresh the feed."""
+        get_conn, rng = self.work.get_conn, self.rng
+        activity.load_users(get_conn)
+        plant = self.work.plants.iloc[rng.randrange(len(self.work.plants))]
+        plant_picker.search_plants(get_conn, plant["plantname"][:4])
+        contacts = activity.load_contacts_for_plant(get_conn, int(plant["plant_id"]))
+
+        if not contacts.empty and rng.random() < 0.8:
+            contact = contacts.iloc[rng.randrange(len(contacts))]
+            contact_name, cont_id = contact["full_name"], contact["cont_id"]
+            activity.load_contact_details(get_conn, cont_id)
+        else:
+            contact_name, cont_id = f"Load Test {rng.randrange(10 ** 6)}", None
+
+        activity.log_activity(
+            get_conn, int(plant["plant_id"]), plant["plantname"], contact_name, cont_id,
+            "", "", self.user["username"], rng.choice(["Call", "Email", "Meeting"]),
+            "Load test activity", "Next week",
+        )
+        self.feed()
+
+
+# ------------------------------------------------------
+# STAGES
+# ------------------------------------------------------
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if not hasattr(Session, name) or name == "login":
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def session_loop(session, mix, think, stop, records):
+    names, weights = list(mix), list(mix.values())
+    action = "login"
+    failed_logins = 0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        error = None
+        try:
+            getattr(session, action)()
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e).strip().splitlines()[0] if str(e).strip() else ''}"
+        records.append((action, (time.perf_counter() - t0) * 1000, error))
+        if error and action == "login":
+            # nothing else works without a user; retry, but not in a tight loop
+            first, cap = LOGIN_BACKOFF
+            stop.wait(min(first * 2 ** failed_logins, cap))
+            failed_logins += 1
+            continue
+        failed_logins = 0
+        action = session.rng.choices(names, weights)[0]
+        if think:
+            stop.wait(session.rng.expovariate(1 / think))
+
+
+def server_connections(conn):
+    with conn.cursor() as cur:
+        # client backends only; parallel query workers show up here too
+        cur.execute("SELECT count(*) FROM pg_stat_activity "
+                    "WHERE datname = current_database() AND backend_type = 'client backend';")
+        return cur.fetchone()[0] - 1       # minus this monitor
+
+
+def monitor(dsn, stop, samples):
+    """Pool and server-side connection counts every MONITOR_SECONDS."""
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        while not stop.wait(MONITOR_SECONDS):
+            pool = db.pool_metrics()
+            samples.append({"in_use": pool["in_use"], "open": pool["open"],
+                            "server": server_connections(conn)})
+    finally:
+        conn.close()
+
+
+def loader_calls():
+    return _samples(LOADER_CALLS, "_total")
+
+
+def run_stage(work, dsn, sessions, duration, mix, think, seed):
+    records, samples = [], []
+    stop = threading.Event()
+    pool_before, calls_before = db.pool_metrics(), loader_calls()
+
+    watcher = threading.Thread(target=monitor, args=(dsn, stop, samples), daemon=True)
+    threads = [
+        threading.Thread(target=session_loop, daemon=True,
+                         args=(Session(work, seed * 100003 + sessions * 1009 + i), mix, think, stop, records))
+        for i in range(sessions)
+    ]
+    t0 = time.perf_counter()
+    watcher.start()
+    for t in threads:
+        t.start()
+    stop.wait(duration)
+    stop.set()
+    for t in threads:
+        t.join()        # in-flight actions finish and count
+    elapsed = time.perf_counter() - t0
+    watcher.join()
+
+    return summarize(sessions, elapsed, records, samples, pool_before, db.pool_metrics(),
+                     calls_before, loader_calls())
+
+
+def latency(ms):
+    ms = sorted(ms)
+    if not ms:
+        return {"count": 0}
+    return {"count": len(ms), "p50_ms": round(percentile(ms, 50), 1),
+            "p95_ms": round(percentile(ms, 95), 1), "p99_ms": round(percentile(ms, 99), 1),
+            "max_ms": round(ms[-1], 1)}
+
+
+def summarize(sessions, elapsed, records, samples, pool_before, pool_after,
+              calls_before, calls_after):
+    errors = {}
+    for _, _, error in records:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+    by_action = {}
+    for action, ms, error in records:
+        by_action.setdefault(action, []).append(ms)
+
+    def delta(result):
+        return sum(v - calls_before.get(k, 0) for k, v in calls_after.items() if k[1] == result)
+
+    hits, misses = delta("hit"), delta("miss")
+    return {
+        "sessions": sessions,
+        "seconds": round(elapsed, 1),
+        "actions": len(records),
+        "throughput_per_s": round(len(records) / elapsed, 2),
+        "error_rate": round(sum(errors.values()) / len(records), 4) if records else None,
+        "errors": errors,
+        **latency([ms for _, ms, error in records if not error]),
+        "actions_by_kind": {name: latency(ms) for name, ms in sorted(by_action.items())},
+        "pool": {
+            "max": pool_after["max"],
+            "peak_in_use": max((s["in_use"] for s in samples), default=0),
+            "peak_open": max((s["open"] for s in samples), default=0),
+            "checkouts": pool_after["checkouts"] - pool_before["checkouts"],
+            "waits": pool_after["waits"] - pool_before["waits"],
+            "wait_seconds": round(pool_after["wait_seconds"] - pool_before["wait_seconds"], 2),
+            "timeouts": pool_after["timeouts"] - pool_before["timeouts"],
+            "created": pool_after["created"] - pool_before["created"],
+        },
+        "server_connections_peak": max((s["server"] for s in samples), default=0),
+        "cache_hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+    }
+
+
+def main(argv=None):
+    load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1, choices=synthetic.SCALES)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25],
+                        help="concurrent sessions per ramp stage")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per stage")
+    parser.add_argument("--think", type=float, default=1.0,
+                        help="mean seconds between a session's actions (0 = flat out)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"action weights (default {DEFAULT_MIX})")
+    parser.add_argument("--cold", action="store_true", help="clear the caches before every stage")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rebuild", action="store_true", help="regenerate the synthetic database first")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="exit 1 if any stage's error rate is above this (default 0.01)")
+    parser.add_argument("--out", help="JSON path (default bench/results/loadtest-<timestamp>.json)")
+    args = parser.parse_args(argv)
+    streamlit.logger.set_log_level(os.environ["STREAMLIT_LOGGER_LEVEL"])
+
+    dsn = synthetic.ensure(args.scale, seed=args.seed, rebuild=args.rebuild)
+    os.environ["DATABASE_URL"] = dsn
+    counts, server = table_counts(db.get_conn)
+    work = Workload(db.get_conn)
+
+    started = datetime.now(timezone.utc)
+    report = {
+        "meta": {
+            "started": started.isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "postgres": server,
+            "dataset": {f"{args.scale}x": counts},
+            "duration": args.duration,
+            "think": args.think,
+            "mix": args.mix,
+            "cold": args.cold,
+            "pool_max": db.pool_metrics()["max"],
+        },
+        "stages": [],
+    }
+
+    print(f"{synthetic.DB_PREFIX}_{args.scale}x  " + ", ".join(f"{t}={n:,}" for t, n in counts.items()))
+    print(f"pool max {report['meta']['pool_max']}, {args.duration:.0f}s per stage, "
+          f"think {args.think}s, mix " + ", ".join(f"{k}={v:g}" for k, v in args.mix.items()) + "\n")
+    print(f"{'sessions':>8} {'actions':>8} {'act/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'pool':>6} {'waits':>6} {'server':>7} {'hit %':>6}")
+
+    for sessions in args.sessions:
+        if args.cold:
+            st.cache_data.clear()
+            for lru in cache._registry.values():
+                lru.clear()
+        stage = run_stage(work, dsn, sessions, args.duration, args.mix, args.think, args.seed)
+        report["stages"].append(stage)
+        hit = f"{100 * stage['cache_hit_rate']:.0f}" if stage["cache_hit_rate"] is not None else "-"
+        print(f"{sessions:>8} {stage['actions']:>8,} {stage['throughput_per_s']:>7.1f} "
+              f"{stage.get('p50_ms', 0):>8.0f} {stage.get('p95_ms', 0):>8.0f} {stage.get('p99_ms', 0):>8.0f} "
+              f"{100 * (stage['error_rate'] or 0):>6.1f}% {stage['pool']['peak_in_use']:>6} "
+              f"{stage['pool']['waits']:>6} {stage['server_connections_peak']:>7} {hit:>6}")
+        for error, n in sorted(stage["errors"].items(), key=lambda e: -e[1])[:3]:
+            print(f"{'':>8} {n:>8,} x {error[:100]}")
+
+    print("\nper action, last stage:")
+    for name, lat in report["stages"][-1]["actions_by_kind"].items():
+        if lat["count"]:
+            print(f"  {name:<8} {lat['count']:>7,}  p50 {lat['p50_ms']:>7.0f}  p95 {lat['p95_ms']:>7.0f}  "
+                  f"p99 {lat['p99_ms']:>7.0f} ms")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"loadtest-{started:%Y%m%d-%H%M%S}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nwrote {out}")
+
+    worst = max((s["error_rate"] or 0 for s in report["stages"]), default=0)
+    return 1 if worst > args.max_error_rate else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,452 @@
+"""
+Synthetic dashboard database for benchmarks, generated with Faker.
+
+    python bench/synthetic.py --scale 1            # build powerplant_bench_1x if missing
+    python bench/synthetic.py --scale 10 --rebuild
+    python bench/synthetic.py --scale 1 10 100 --seed 7
+
+Every scale gets its own database (powerplant_bench_<n>x) on the server
+from BENCH_DATABASE_URL (falls back to DATABASE_URL), so the real tables
+are never touched. 1x is about the size of the PLANT_INFO workbooks.
+
+Faker fills pools of names, cities, titles, etc. once per seed, and rows
+are assembled from those pools with numpy. That keeps a 100x build
+(~5.5M rows) at about half a minute (33 s measured), and the same seed
+always gives the same rows. Outage and
+activity dates are relative to today, so the Upcoming Outages tab has
+data.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from dotenv import load_dotenv
+from faker import Faker
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BASE_DIR)
+
+from migrations import MIGRATIONS, ensure_table  # noqa: E402
+
+SCALES = (1, 10, 100)
+DB_PREFIX = "powerplant_bench"
+
+# rows at 1x
+BASE_ROWS = {
+    "app_users": 25,
+    "general_plant_info": 5_000,
+    "contact_plant_info": 23_000,
+    "plant_drive_info": 15_000,
+    "outtage_info": 2_000,
+    "sales_activity": 10_000,
+}
+
+# rows per COPY round trip
+CHUNK_ROWS = 50_000
+
+SCHEMA = """
+    CREATE TABLE app_users (
+        username text PRIMARY KEY, full_name text, role text
+    );
+    CREATE TABLE general_plant_info (
+        plant_id bigint PRIMARY KEY, parentname text, plantname text, ownername text,
+        company_address text, company_city text, company_state text,
+        company_phone text, fuel_type_1 text, company_url text
+    );
+    CREATE TABLE contact_plant_info (
+        cont_id text PRIMARY KEY, plant_id bigint, functional_title text,
+        actual_title text, cont_fname text, cont_lname text, email text,
+        phone_number text
+    );
+    CREATE TABLE plant_drive_info (
+        drive_id bigint PRIMARY KEY, plant_id bigint, drive_name text,
+        drive_capacity text, drive_manufacturer text, drive_type text,
+        drive_series text, drive_info text, drive_primary_fuel text,
+        drive_startup text
+    );
+    CREATE TABLE outtage_info (
+        event_id bigint PRIMARY KEY, plant_id bigint, plant_name text,
+        plant_state text, primary_fuel text, start_date date, end_date date,
+        duration_days integer, com text, lat double precision, long double precision
+    );
+    CREATE TABLE sales_activity (
+        id serial PRIMARY KEY, cont_id text, plant_id bigint, plantname text,
+        username text, activitytype text, notes text, follow_up_date text,
+        created_at timestamp DEFAULT now()
+    );
+"""
+
+# weighted the way the real fleet is: lots of gas, few geothermal
+FUELS = {"Natural Gas": 30, "Coal": 15, "Solar": 15, "Wind": 12, "Hydro": 10,
+         "Oil": 6, "Biomass": 5, "Nuclear": 4, "Geothermal": 3}
+PLANT_KINDS = ["Generating Station", "Power Plant", "Energy Center", "Steam Plant",
+               "Solar Farm", "Wind Farm", "Hydro Station", "Cogeneration Facility"]
+TITLES = ["Plant Manager", "Maintenance Manager", "Operations Manager", "Chief Engineer",
+          "I&C Technician", "Electrical Supervisor", "Purchasing Agent", "Plant Engineer",
+          "Reliability Engineer", "Outage Coordinator"]
+MANUFACTURERS = ["GE", "Siemens", "ABB", "Mitsubishi", "Toshiba", "Alstom",
+                 "Westinghouse", "Allen-Bradley", "Yaskawa", "Eaton"]
+DRIVE_INFO = ["Gas Turbine", "Steam Turbine", "Boiler Feed Pump", "ID Fan", "FD Fan",
+              "Cooling Tower Fan", "Circulating Water Pump", "Coal Mill", "Compressor"]
+DRIVE_TYPES = ["VFD", "LCI", "Soft Starter", "DC Drive"]
+ACTIVITY_TYPES = ["Call", "Email", "Meeting", "Site Visit"]
+# outage comments mix Faker filler with words reps actually search for
+OUTAGE_TERMS = ["pump inspection", "gas turbine overhaul", "boiler tube repair",
+                "generator rewind", "valve replacement", "drive upgrade",
+                "transformer testing", "cooling tower maintenance", "turbine blade inspection"]
+
+
+def bench_dsn(scale, base_dsn=None):
+    base_dsn = base_dsn or os.environ.get("BENCH_DATABASE_URL") or os.environ["DATABASE_URL"]
+    return psycopg2.extensions.make_dsn(base_dsn, dbname=f"{DB_PREFIX}_{scale}x")
+
+
+def database_built(scale, base_dsn=None):
+    """
+    True once build() finished: the bench_meta row is written last, so a
+    build that died after CREATE DATABASE doesn't count.
+    """
+    try:
+        conn = psycopg2.connect(bench_dsn(scale, base_dsn))
+    except psycopg2.OperationalError:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM bench_meta LIMIT 1;")
+            return cur.fetchone() is not None
+    except psycopg2.errors.UndefinedTable:
+        return False
+    finally:
+        conn.close()
+
+
+# ------------------------------------------------------
+# Value pools
+# ------------------------------------------------------
+class Pools:
+    """Faker values drawn once; rows pick from these by index."""
+
+    def __init__(self, seed, size=2000):
+        fake = Faker("en_US")
+        fake.seed_instance(seed)
+        self.rng = np.random.default_rng(seed)
+        self.first = np.array([fake.first_name() for _ in range(size)], dtype=object)
+        self.last = np.array([fake.last_name() for _ in range(size)], dtype=object)
+        self.company = np.array([fake.company() for _ in range(size)], dtype=object)
+        self.street = np.array([fake.street_address() for _ in range(size)], dtype=object)
+        self.city = np.array([fake.city() for _ in range(size)], dtype=object)
+        self.phone = np.array([fake.phone_number() for _ in range(size)], dtype=object)
+        self.domain = np.array([fake.domain_name() for _ in range(size)], dtype=object)
+        self.sentence = np.array([fake.sentence(nb_words=10) for _ in range(size)], dtype=object)
+        self.state = np.array(sorted({fake.state_abbr(include_territories=False) for _ in range(500)}), dtype=object)
+
+    def pick(self, values, n, p=None):
+        values = np.asarray(values, dtype=object)
+        return values[self.rng.choice(len(values), size=n, p=p)]
+
+    def skewed(self, n_rows, n_parents):
+        """Parent ids with a long tail: a few parents get many children."""
+        return 1 + (self.rng.random(n_rows) * self.rng.random(n_rows) * n_parents).astype(np.int64)
+
+
+def _join(*parts):
+    out = parts[0].astype(str)
+    for part in parts[1:]:
+        out = np.char.add(out.astype(str), part.astype(str) if isinstance(part, np.ndarray) else part)
+    return out.astype(object)
+
+
+# ------------------------------------------------------
+# Tables
+# ------------------------------------------------------
+def gen_users(pools, n):
+    first, last = pools.pick(pools.first, n), pools.pick(pools.last, n)
+    names = [f"{f} {l}" for f, l in zip(first, last)]
+    usernames = ["admin"] + [f"rep{i:03d}" for i in range(1, n)]
+    roles = ["admin"] + ["user"] * (n - 1)
+    return list(zip(usernames, names, roles))
+
+
+def gen_plants(pools, n):
+    ids = np.arange(1, n + 1)
+    fuel_names = list(FUELS)
+    fuel_p = np.array(list(FUELS.values()), dtype=float)
+    fuel_p /= fuel_p.sum()
+    names = _join(pools.pick(pools.last, n), " ", pools.pick(PLANT_KINDS, n))
+    owners = pools.pick(pools.company, n)
+    domains = pools.pick(pools.domain, n)
+    return zip(
+        ids,
+        pools.pick(pools.company, n),                     # parentname
+        names,
+        owners,
+        pools.pick(pools.street, n),
+        pools.pick(pools.city, n),
+        pools.pick(pools.state, n),
+        pools.pick(pools.phone, n),
+        pools.pick(fuel_names, n, p=fuel_p),
+        np.char.add("https://www.", domains.astype(str)).astype(object),
+    ), names
+
+
+def gen_contacts(pools, n, n_plants):
+    first, last = pools.pick(pools.first, n), pools.pick(pools.last, n)
+    ids = np.arange(1, n + 1)
+    emails = [f"{f[0].lower()}{l.lower()}{i}@{d}" for f, l, i, d
+              in zip(first, last, ids, pools.pick(pools.domain, n))]
+    titles = pools.pick(TITLES, n)
+    return zip(
+        np.char.add("C", ids.astype(str)).astype(object),
+        pools.skewed(n, n_plants),
+        titles,
+        titles,                                            # actual_title
+        first,
+        last,
+        emails,
+        pools.pick(pools.phone, n),
+    )
+
+
+def gen_drives(pools, n, n_plants):
+    ids = np.arange(1, n + 1)
+    info = pools.pick(DRIVE_INFO, n)
+    makers = pools.pick(MANUFACTURERS, n)
+    return zip(
+        ids,
+        pools.skewed(n, n_plants),
+        _join(makers, " ", info, " #", pools.rng.integers(1, 9, n)),
+        _join(pools.rng.integers(1, 200, n) * 50, " HP"),
+        makers,
+        pools.pick(DRIVE_TYPES, n),
+        _join(makers, "-", pools.rng.integers(100, 999, n)),
+        info,
+        pools.pick(list(FUELS), n),
+        pools.rng.integers(1965, 2025, n).astype(str).astype(object),
+    )
+
+
+def gen_outages(pools, n, plants, today):
+    plant_ids, plant_names, states, fuels = plants
+    pick = pools.rng.integers(0, len(plant_ids), n)
+    start = pools.rng.integers(-60, 365, n)
+    duration = pools.rng.integers(1, 60, n)
+    terms = pools.pick(OUTAGE_TERMS, n)
+    filler = pools.pick(pools.sentence, n)
+    has_comment = pools.rng.random(n) < 0.6
+    return zip(
+        np.arange(1, n + 1),
+        plant_ids[pick],
+        plant_names[pick],
+        states[pick],
+        fuels[pick],
+        [today + timedelta(days=int(d)) for d in start],
+        [today + timedelta(days=int(d + k)) for d, k in zip(start, duration)],
+        duration,
+        np.where(has_comment, _join(terms, ": ", filler), None),
+        np.round(pools.rng.uniform(25.0, 49.0, n), 5),
+        np.round(pools.rng.uniform(-124.0, -67.0, n), 5),
+    )
+
+
+def gen_activity(pools, n, contacts, plant_names, usernames, now):
+    cont_ids, cont_plants = contacts
+    pick = pools.rng.integers(0, len(cont_ids), n)
+    ages = pools.rng.integers(0, 365 * 24 * 3600, n)
+    follow = pools.rng.integers(1, 60, n)
+    has_follow = pools.rng.random(n) < 0.4
+    return zip(
+        cont_ids[pick],
+        cont_plants[pick],
+        plant_names[cont_plants[pick] - 1],
+        pools.pick(usernames, n),
+        pools.pick(ACTIVITY_TYPES, n),
+        pools.pick(pools.sentence, n),
+        [(now - timedelta(seconds=int(a)) + timedelta(days=int(f))).date().isoformat() if h else ""
+         for a, f, h in zip(ages, follow, has_follow)],
+        [now - timedelta(seconds=int(a)) for a in ages],
+    )
+
+
+# ------------------------------------------------------
+# COPY
+# ------------------------------------------------------
+def copy_rows(cur, table, columns, rows):
+    """COPY `rows` in CHUNK_ROWS batches; returns the row count."""
+    total = 0
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def flush():
+        buf.seek(0)
+        cur.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+        buf.seek(0)
+        buf.truncate()
+
+    pending = 0
+    for row in rows:
+        writer.writerow(["\\N" if v is None else v for v in row])
+        pending += 1
+        if pending == CHUNK_ROWS:
+            flush()
+            total += pending
+            pending = 0
+    if pending:
+        flush()
+        total += pending
+    return total
+
+
+def apply_migrations(conn):
+    """Run every migration; ones the server can't take (e.g. no pg_trgm) are skipped."""
+    applied, skipped = [], []
+    with conn.cursor() as cur:
+        ensure_table(cur)
+    conn.commit()
+    for name, sql in MIGRATIONS:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                cur.execute("INSERT INTO schema_migrations (name) VALUES (%s);", (name,))
+            conn.commit()
+            applied.append(name)
+        except psycopg2.Error as e:
+            conn.rollback()
+            skipped.append((name, str(e).strip().splitlines()[0]))
+    return applied, skipped
+
+
+# ------------------------------------------------------
+# Build
+# ------------------------------------------------------
+def build(scale, seed=42, base_dsn=None, log=print):
+    """(Re)create powerplant_bench_<scale>x. Returns {table: rows}."""
+    base_dsn = base_dsn or os.environ.get("BENCH_DATABASE_URL") or os.environ["DATABASE_URL"]
+    dbname = f"{DB_PREFIX}_{scale}x"
+
+    admin = psycopg2.connect(base_dsn)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {dbname};")
+        cur.execute(f"CREATE DATABASE {dbname};")
+    admin.close()
+
+    rows = {t: n * scale for t, n in BASE_ROWS.items()}
+    rows["app_users"] = BASE_ROWS["app_users"] * max(1, int(scale ** 0.5))
+    pools = Pools(seed)
+    today = date.today()
+    now = datetime.now().replace(microsecond=0)
+    counts = {}
+
+    conn = psycopg2.connect(bench_dsn(scale, base_dsn))
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA)
+            t0 = time.perf_counter()
+
+            users = gen_users(pools, rows["app_users"])
+            counts["app_users"] = copy_rows(cur, "app_users", ["username", "full_name", "role"], users)
+
+            plant_rows, plant_names = gen_plants(pools, rows["general_plant_info"])
+            plant_rows = list(plant_rows)
+            counts["general_plant_info"] = copy_rows(
+                cur, "general_plant_info",
+                ["plant_id", "parentname", "plantname", "ownername", "company_address",
+                 "company_city", "company_state", "company_phone", "fuel_type_1", "company_url"],
+                plant_rows,
+            )
+            plant_cols = (
+                np.array([r[0] for r in plant_rows]), plant_names,
+                np.array([r[6] for r in plant_rows], dtype=object),
+                np.array([r[8] for r in plant_rows], dtype=object),
+            )
+            del plant_rows
+
+            contact_rows = list(gen_contacts(pools, rows["contact_plant_info"], rows["general_plant_info"]))
+            counts["contact_plant_info"] = copy_rows(
+                cur, "contact_plant_info",
+                ["cont_id", "plant_id", "functional_title", "actual_title",
+                 "cont_fname", "cont_lname", "email", "phone_number"],
+                contact_rows,
+            )
+            contacts = (np.array([r[0] for r in contact_rows], dtype=object),
+                        np.array([r[1] for r in contact_rows]))
+            del contact_rows
+
+            counts["plant_drive_info"] = copy_rows(
+                cur, "plant_drive_info",
+                ["drive_id", "plant_id", "drive_name", "drive_capacity", "drive_manufacturer",
+                 "drive_type", "drive_series", "drive_info", "drive_primary_fuel", "drive_startup"],
+                gen_drives(pools, rows["plant_drive_info"], rows["general_plant_info"]),
+            )
+            counts["outtage_info"] = copy_rows(
+                cur, "outtage_info",
+                ["event_id", "plant_id", "plant_name", "plant_state", "primary_fuel",
+                 "start_date", "end_date", "duration_days", "com", "lat", "long"],
+                gen_outages(pools, rows["outtage_info"], plant_cols, today),
+            )
+            counts["sales_activity"] = copy_rows(
+                cur, "sales_activity",
+                ["cont_id", "plant_id", "plantname", "username", "activitytype",
+                 "notes", "follow_up_date", "created_at"],
+                gen_activity(pools, rows["sales_activity"], contacts, plant_names,
+                             [u[0] for u in users], now),
+            )
+            log(f"{dbname}: rows loaded in {time.perf_counter() - t0:.1f}s")
+        conn.commit()
+
+        t0 = time.perf_counter()
+        applied, skipped = apply_migrations(conn)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE;")
+            # completion marker for database_built(); written last
+            cur.execute(
+                "CREATE TABLE bench_meta (scale int, seed int, built_at timestamptz, row_counts jsonb);"
+                "INSERT INTO bench_meta VALUES (%s, %s, now(), %s);",
+                (scale, seed, json.dumps(counts)),
+            )
+        log(f"{dbname}: {len(applied)} migrations + analyze in {time.perf_counter() - t0:.1f}s")
+        for name, reason in skipped:
+            log(f"{dbname}: skipped {name} ({reason})")
+    finally:
+        conn.close()
+    return counts
+
+
+def ensure(scale, seed=42, base_dsn=None, rebuild=False, log=print):
+    """DSN for the scale's database, building it first if needed."""
+    if rebuild or not database_built(scale, base_dsn):
+        build(scale, seed=seed, base_dsn=base_dsn, log=log)
+    return bench_dsn(scale, base_dsn)
+
+
+def main(argv=None):
+    load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, nargs="+", default=[1], choices=SCALES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rebuild", action="store_true", help="drop and regenerate even if it exists")
+    args = parser.parse_args(argv)
+
+    for scale in args.scale:
+        if not args.rebuild and database_built(scale):
+            print(f"{DB_PREFIX}_{scale}x exists (use --rebuild to regenerate)")
+            continue
+        counts = build(scale, seed=args.seed)
+        print("  " + ", ".join(f"{t}={n:,}" for t, n in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
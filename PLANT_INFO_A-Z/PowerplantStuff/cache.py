@@ -0,0 +1,228 @@
+import functools
+import inspect
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+_registry = {}               # name -> LRUCache, for cache_stats()
+
+
+def sizeof(value):
+    """Rough bytes held by a cached value (deep for pandas objects)."""
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU shared by every session (hold it in
+    st.cache_resource). Entries past `ttl` seconds count as misses.
+
+    Bounded by `max_entries` and, if given, `max_bytes` (see sizeof); the
+    least recently used entries go first. Named caches show up in
+    cache_stats().
+    """
+
+    def __init__(self, max_entries=1000, ttl=None, max_bytes=None, name=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (stored_at, value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+        if name:
+            _registry[name] = self
+
+    def _fresh(self, stored_at):
+        return self.ttl is None or time.monotonic() - stored_at < self.ttl
+
+    def _drop(self, key):
+        self._bytes -= self._data.pop(key)[2]
+
+    def get(self, key, default=None, valid=None, count=True):
+        """
+        `valid(value)` returning False drops the entry like an expired one.
+        count=False skips the hit/miss counters (re-checks under a lock).
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and not (self._fresh(item[0]) and (valid is None or valid(item[1]))):
+                self._drop(key)
+                self.expired += 1
+                item = None
+            if item is None:
+                self.misses += count
+                return default
+            self.hits += count
+            self._data.move_to_end(key)
+            return item[1]
+
+    def __contains__(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and self._fresh(item[0])
+
+    def set(self, key, value):
+        nbytes = sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                self.evictions += 1          # would evict everything else; skip
+                return
+            self._data[key] = (time.monotonic(), value, nbytes)
+            self._bytes += nbytes
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+def cache_stats():
+    """One row per named cache, for the admin diagnostics panel."""
+    return [{"cache": name, **c.stats()} for name, c in sorted(_registry.items())]
+
+
+# ------------------------------------------------------
+# TABLE-TAGGED LOADERS
+# ------------------------------------------------------
+# Each @cached loader names the tables it reads. A write calls
+# invalidate_tables(...), which bumps those tables' generation; entries built
+# under an older generation are treated as misses. Nothing else is touched,
+# unlike st.cache_data.clear(). Per process, like every other cache here.
+
+_generations = {}            # table -> int
+_generations_lock = threading.Lock()
+
+
+def table_generations(tables):
+    with _generations_lock:
+        return tuple(_generations.get(t, 0) for t in tables)
+
+
+def invalidate_tables(*tables):
+    with _generations_lock:
+        for t in tables:
+            _generations[t] = _generations.get(t, 0) + 1
+
+
+def _copy(value):
+    """Hand each caller its own frame(s), like st.cache_data does."""
+    if isinstance(value, tuple):
+        return tuple(_copy(v) for v in value)
+    return value.copy() if hasattr(value, "copy") else value
+
+
+class TaggedLoader:
+    """
+    Wraps one loader. Arguments whose name starts with "_" (e.g. _get_conn)
+    are left out of the key, as with st.cache_data. Concurrent misses on the
+    same key are single-flight: one caller queries, the rest wait for it.
+    """
+
+    def __init__(self, func, tables, ttl=None, max_entries=256, max_bytes=None):
+        self.func = func
+        self.tables = tuple(tables)
+        self._signature = inspect.signature(func)
+        self._params = [
+            p for p in self._signature.parameters.values()
+            if not p.name.startswith("_")
+        ]
+        self._entries = LRUCache(
+            max_entries=max_entries, ttl=ttl, max_bytes=max_bytes,
+            name=f"{func.__module__}.{func.__qualname__}",
+        )
+        self._inflight = {}           # key -> [lock, waiters]
+        self._inflight_lock = threading.Lock()
+        functools.update_wrapper(self, func)
+
+    def _key(self, args, kwargs):
+        bound = self._signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple(bound.arguments[p.name] for p in self._params)
+
+    def _fresh(self, key, count=True):
+        generation = table_generations(self.tables)
+        return self._entries.get(key, valid=lambda item: item[0] == generation, count=count)
+
+    def __call__(self, *args, **kwargs):
+        key = self._key(args, kwargs)
+        item = self._fresh(key)
+        if item is None:
+            with self._inflight_lock:
+                slot = self._inflight.setdefault(key, [threading.Lock(), 0])
+                slot[1] += 1
+            try:
+                with slot[0]:
+                    item = self._fresh(key, count=False)    # someone else may have built it
+                    if item is None:
+                        # generation *before* the query: a write that lands
+                        # mid-build leaves this entry already stale
+                        generation = table_generations(self.tables)
+                        item = (generation, self.func(*args, **kwargs))
+                        self._entries.set(key, item)
+            finally:
+                with self._inflight_lock:
+                    slot[1] -= 1
+                    if slot[1] == 0:
+                        del self._inflight[key]
+        return _copy(item[1])
+
+    def clear(self):
+        self._entries.clear()
+
+
+_loaders = {}                # "module.qualname" -> TaggedLoader
+_loaders_lock = threading.Lock()
+
+
+def cached(tables, ttl=None, max_entries=256, max_bytes=None):
+    """
+    @cached(tables=("sales_activity",), ttl=120) on a loader function.
+    One TaggedLoader per name and process: test.py is re-executed on every
+    rerun, and its loaders must keep their entries and single-flight state.
+    """
+    def decorate(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        with _loaders_lock:
+            loader = _loaders.get(name)
+            if loader is None:
+                loader = _loaders[name] = TaggedLoader(
+                    func, tables, ttl=ttl, max_entries=max_entries, max_bytes=max_bytes,
+                )
+            else:
+                loader.func = func      # the rerun's copy of the same body
+        return loader
+    return decorate
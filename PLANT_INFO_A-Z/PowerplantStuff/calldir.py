@@ -2,6 +2,42 @@ import pandas as pd
 import streamlit as st
 import psycopg2
 
+from export import csv_download_button
+from metrics import read_sql
+
+
+
+def build_call_query(state, role, fuel):
+    """Call Directory SQL + params; each box is a case-insensitive prefix."""
+    filters = []
+    params = []
+
+    if state:
+        filters.append("g.company_state ILIKE %s")
+        params.append(f"{state}%")
+    if role:
+        filters.append("c.functional_title ILIKE %s")
+        params.append(f"{role}%")
+    if fuel:
+        filters.append("g.fuel_type_1 ILIKE %s")
+        params.append(f"{fuel}%")
+
+    contact_query = f"""
+        SELECT 
+            g.plantname AS "Plant Name",
+            g.company_state AS "State",
+            g.fuel_type_1 AS "Primary Fuel Type",
+            c.functional_title AS "Title",
+            c.cont_fname AS "First Name",
+            c.cont_lname AS "Last Name",
+            c.email AS "Email",
+            c.phone_number AS "Phone Number"
+        FROM general_plant_info g
+        JOIN contact_plant_info c ON g.plant_id = c.plant_id
+        {' WHERE '+' AND '.join(filters)if filters else ''}
+        ORDER BY g.plantname
+        """
+    return contact_query, params
 
 
 def call_directory(get_conn):
@@ -30,39 +66,17 @@ def call_directory(get_conn):
             
             search_btn = st.button("Search Contacts", width="stretch")
 
-        filters = []
-        params = []
-
-        if state:
-            filters.append("g.company_state ILIKE %s")
-            params.append(f"{state}%")
-        if role:
-            filters.append("c.functional_title ILIKE %s")
-            params.append(f"{role}%")
-        if fuel:
-            filters.append("g.fuel_type_1 ILIKE %s")
-            params.append(f"{fuel}%")
-
         if search_btn:
-            contact_query = F"""
-                SELECT 
-                    g.plantname AS "Plant Name",
-                    g.company_state AS "State",
-                    g.fuel_type_1 AS "Primary Fuel Type",
-                    c.functional_title AS "Title",
-                    c.cont_fname AS "First Name",
-                    c.cont_lname AS "Last Name",
-                    c.email AS "Email",
-                    c.phone_number AS "Phone Number"
-                FROM general_plant_info g
-                JOIN contact_plant_info c ON g.plant_id = c.plant_id
-                {' WHERE '+' AND '.join(filters)if filters else ''}
-                ORDER BY g.plantname
-                """
+            contact_query, params = build_call_query(state, role, fuel)
             with get_conn() as conn:
-                call_df = pd.read_sql_query(contact_query, conn, params=params)
+                call_df = read_sql(contact_query, conn, params=params)
 
             if not call_df.empty:
                 st.dataframe(call_df,width="stretch", hide_index=True)
+                csv_download_button(
+                    "Download Call List (CSV)",
+                    get_conn, contact_query, params,
+                    file_name="call_directory.csv",
+                )
             else:
                 st.warning("Nothing found LOL")
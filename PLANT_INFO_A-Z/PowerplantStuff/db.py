@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import streamlit as st
+
+from metrics import mark_db_use
+from slowlog import TracingCursor
+
+
+# ------------------------------------------------------
+# Pool settings (override in .env if needed)
+# ------------------------------------------------------
+POOL_MIN = int(os.environ.get("DB_POOL_MIN", 2))
+POOL_MAX = int(os.environ.get("DB_POOL_MAX", 20))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+# connections idle longer than this get closed (down to POOL_MIN)
+POOL_IDLE_SECONDS = float(os.environ.get("DB_POOL_IDLE_SECONDS", 300))
+# connections idle longer than this get a SELECT 1 before being handed out
+POOL_CHECK_SECONDS = float(os.environ.get("DB_POOL_CHECK_SECONDS", 30))
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became free within POOL_TIMEOUT seconds."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 pool shared by every Streamlit session.
+    Idle connections are kept LIFO so the warm ones get reused and
+    the cold ones age out through recycle().
+    """
+
+    def __init__(self, dsn, minconn=POOL_MIN, maxconn=POOL_MAX,
+                 timeout=POOL_TIMEOUT, idle_seconds=POOL_IDLE_SECONDS,
+                 check_seconds=POOL_CHECK_SECONDS):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self.check_seconds = check_seconds
+
+        self._cond = threading.Condition()
+        self._idle = []          # [(conn, returned_at)]
+        self._open = 0
+        self.stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "broken": 0,
+        }
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    # ---------------- internals ----------------
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, cursor_factory=TracingCursor)
+        self._open += 1
+        self.stats["created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        self._open -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.check_seconds:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _take(self, deadline):
+        """
+        Pop an idle connection, or reserve a slot for a new one
+        (returns (None, None) in that case). Blocks while the pool is full.
+        """
+        waited_from = None
+        with self._cond:
+            while True:
+                self._recycle_locked()
+
+                if self._idle:
+                    taken = self._idle.pop()
+                    break
+                if self._open < self.maxconn:
+                    self._open += 1
+                    taken = (None, None)
+                    break
+
+                if waited_from is None:
+                    waited_from = time.monotonic()
+                    self.stats["waits"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    self.stats["wait_seconds"] += time.monotonic() - waited_from
+                    raise PoolTimeout(
+                        f"No database connection free after {self.timeout:.0f}s "
+                        f"({self._open}/{self.maxconn} open)"
+                    )
+                self._cond.wait(remaining)
+
+            if waited_from is not None:
+                self.stats["wait_seconds"] += time.monotonic() - waited_from
+            return taken
+
+    # ---------------- public API ----------------
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self.stats["checkouts"] += 1
+
+        while True:
+            conn, returned_at = self._take(deadline)
+
+            # new connection: handshake happens outside the lock
+            if conn is None:
+                try:
+                    conn = psycopg2.connect(self.dsn, cursor_factory=TracingCursor)
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self.stats["created"] += 1
+                return conn
+
+            if self._healthy(conn, time.monotonic() - returned_at):
+                return conn
+
+            with self._cond:
+                self.stats["broken"] += 1
+                self._discard(conn)
+                self._cond.notify()
+
+    def putconn(self, conn):
+        with self._cond:
+            if conn.closed:
+                self.stats["broken"] += 1
+                self._open -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _recycle_locked(self):
+        """Close connections idle past idle_seconds, keeping minconn around."""
+        now = time.monotonic()
+        keep = []
+        # _idle is LIFO so the oldest entries are at the front
+        for conn, returned_at in self._idle:
+            too_old = now - returned_at > self.idle_seconds
+            if too_old and self._open > self.minconn:
+                self.stats["recycled"] += 1
+                self._discard(conn)
+            else:
+                keep.append((conn, returned_at))
+        self._idle = keep
+
+    def recycle(self):
+        with self._cond:
+            self._recycle_locked()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection. Commits on success, rolls back on error,
+        and always hands the connection back to the pool.
+
+        BaseException, not Exception: a generator closed early (GeneratorExit,
+        see export.stream_rows) or st.rerun()/st.stop() must not hand the
+        connection back mid-transaction either.
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+            if not conn.closed:
+                conn.commit()
+        except BaseException:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    conn.close()
+            raise
+        finally:
+            self.putconn(conn)
+
+    def metrics(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                **self.stats,
+                "open": self._open,
+                "idle": idle,
+                "in_use": self._open - idle,
+                "max": self.maxconn,
+            }
+
+    def closeall(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+
+
+# ------------------------------------------------------
+# One pool per server process
+# ------------------------------------------------------
+@st.cache_resource
+def get_pool():
+    return ConnectionPool(os.environ["DATABASE_URL"])
+
+
+def get_conn():
+    """
+    Drop-in replacement for psycopg2.connect(DATABASE_URL):
+    `with get_conn() as conn:` borrows a pooled connection.
+    """
+    mark_db_use()
+    return get_pool().connection()
+
+
+def pool_metrics():
+    return get_pool().metrics()
@@ -0,0 +1,102 @@
+import csv
+import io
+import itertools
+import tempfile
+
+import streamlit as st
+import xlsxwriter
+
+EXPORT_CHUNK = 2000
+CSV_MIME = "text/csv"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_cursor_ids = itertools.count()
+
+
+# ------------------------------------------------------
+# ROW SOURCE
+# ------------------------------------------------------
+def stream_rows(get_conn, query, params=None, chunk=EXPORT_CHUNK):
+    """
+    Yield the column names, then every row, pulled from a server-side
+    (named) cursor `chunk` rows at a time. Only one chunk is ever held.
+    """
+    with get_conn() as conn:
+        with conn.cursor(name=f"export_{next(_cursor_ids)}") as cur:
+            cur.itersize = chunk
+            cur.execute(query, params)
+            rows = cur.fetchmany(chunk)
+            # description is only there after the first fetch
+            yield [col.name for col in cur.description]
+            while rows:
+                yield from rows
+                rows = cur.fetchmany(chunk)
+
+
+def _spooled(write):
+    """Run write(file) against a temp file on disk and return its bytes."""
+    with tempfile.TemporaryFile() as tmp:
+        write(tmp)
+        tmp.seek(0)
+        return tmp.read()
+
+
+# ------------------------------------------------------
+# FILE BUILDERS (called on click, not on rerun)
+# ------------------------------------------------------
+def build_csv(get_conn, query, params=None):
+    def write(tmp):
+        text = io.TextIOWrapper(tmp, encoding="utf-8", newline="")
+        csv.writer(text).writerows(stream_rows(get_conn, query, params))
+        text.flush()
+        text.detach()
+    return _spooled(write)
+
+
+def build_xlsx(get_conn, sheets):
+    """
+    sheets: [(sheet_name, query, params)]. Written in constant_memory
+    mode, so each row is flushed to disk as soon as it is written.
+    """
+    def write(tmp):
+        workbook = xlsxwriter.Workbook(tmp, {
+            "constant_memory": True,
+            "remove_timezone": True,
+            "default_date_format": "yyyy-mm-dd",
+        })
+        header = workbook.add_format({"bold": True})
+        for sheet_name, query, params in sheets:
+            sheet = workbook.add_worksheet(sheet_name)
+            rows = stream_rows(get_conn, query, params)
+            sheet.write_row(0, 0, next(rows), header)
+            for i, row in enumerate(rows, start=1):
+                sheet.write_row(i, 0, row)
+        workbook.close()
+    return _spooled(write)
+
+
+# ------------------------------------------------------
+# WIDGETS
+# ------------------------------------------------------
+def csv_download_button(label, get_conn, query, params=None, file_name="export.csv", **kwargs):
+    """Download button that only runs the query when it is clicked."""
+    return st.download_button(
+        label,
+        data=lambda: build_csv(get_conn, query, params),
+        file_name=file_name,
+        mime=CSV_MIME,
+        on_click="ignore",
+        **kwargs,
+    )
+
+
+def xlsx_download_button(label, get_conn, sheets, file_name="export.xlsx", **kwargs):
+    """Same as csv_download_button, one worksheet per (name, query, params)."""
+    return st.download_button(
+        label,
+        data=lambda: build_xlsx(get_conn, sheets),
+        file_name=file_name,
+        mime=XLSX_MIME,
+        on_click="ignore",
+        **kwargs,
+    )
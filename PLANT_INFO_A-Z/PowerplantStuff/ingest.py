@@ -0,0 +1,489 @@
+"""
+Bulk loader for the PLANT_INFO workbooks.
+
+    python ingest.py                                  # every workbook in ../PLANT_INFO
+    python ingest.py "../PLANT_INFO/Plant_3.xlsx"     # just one file
+    python ingest.py --workers 8 --dry-run
+
+Rows are streamed out of each sheet (openpyxl read-only mode), COPY'd into a
+temp staging table and merged into the real table with an upsert that skips
+unchanged rows, so running the same file twice writes nothing.
+
+Change detection: ingest_manifest keeps a content hash per workbook and per
+sheet, ingest_row_hash one per plant/contact/drive key. Unchanged workbooks
+are skipped without being opened, unchanged sheets are not merged, and only
+rows whose hash moved are upserted. Use --full to ignore the fingerprints
+(e.g. after rows were edited directly in the database).
+"""
+import argparse
+import glob
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import psycopg2
+from dotenv import load_dotenv
+from openpyxl import load_workbook
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "PLANT_INFO")
+
+# rows buffered before each COPY round trip
+CHUNK_ROWS = 5000
+
+# ------------------------------------------------------
+# Workbook header -> table column
+# ------------------------------------------------------
+# A sheet is matched to a table when its header row contains the "detect"
+# column. Tables are loaded in this order so plants exist before contacts.
+TABLES = {
+    "general_plant_info": {
+        "key": "plant_id",
+        "detect": "PLANT_NAME",
+        "columns": {
+            "PLANT_ID": "plant_id",
+            "PARENTNAME": "parentname",
+            "PLANT_NAME": "plantname",
+            "OWNER_NAME": "ownername",
+            "COMP_ADDR": "company_address",
+            "COMP_CITY": "company_city",
+            "COMP_STATE": "company_state",
+            "PHONE": "company_phone",
+            "FUEL_TYPE1": "fuel_type_1",
+            "COMP_URL": "company_url",
+        },
+    },
+    "contact_plant_info": {
+        "key": "cont_id",
+        "detect": "CONT_ID",
+        "columns": {
+            "CONT_ID": "cont_id",
+            "PLANT_ID": "plant_id",
+            "FUNCTIONAL_TITLE": "functional_title",
+            "ACTUAL_TITLE": "actual_title",
+            "CONT_FNAME": "cont_fname",
+            "CONT_LNAME": "cont_lname",
+            "EMAIL": "email",
+            "TELEPHONE": "phone_number",
+        },
+    },
+    "plant_drive_info": {
+        "key": "drive_id",
+        "detect": "DRIVE_ID",
+        "columns": {
+            "DRIVE_ID": "drive_id",
+            "PLANT_ID": "plant_id",
+            "DRIVE_NAME": "drive_name",
+            "DRIVE_CAPACITY": "drive_capacity",
+            "DRIVE_MANUFACTURER": "drive_manufacturer",
+            "DRIVE_TYPE": "drive_type",
+            "DRIVE_SERIES": "drive_series",
+            "DRIVE_INFO": "drive_info",
+            "DRIVE_PRIMARY_FUEL": "drive_primary_fuel",
+            "DRIVE_STARTUP": "drive_startup",
+        },
+    },
+}
+
+
+# ------------------------------------------------------
+# Reading
+# ------------------------------------------------------
+def _clean(value):
+    """Excel cell -> text for COPY (None stays None)."""
+    if value is None:
+        return None
+    # ids come back as 1012500.0 from the numbered exports
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, str):
+        value = value.strip()
+        if value.endswith(".0") and value[:-2].isdigit():
+            value = value[:-2]
+        return value or None
+    return str(value)
+
+
+def classify_sheet(header):
+    """Which table a sheet feeds, based on its header row (or None)."""
+    names = {str(h).strip().upper() for h in header if h is not None}
+    for table in ("contact_plant_info", "plant_drive_info", "general_plant_info"):
+        if TABLES[table]["detect"] in names:
+            return table
+    return None
+
+
+def iter_sheet_rows(ws, table, columns):
+    """
+    Yield tuples in `columns` order from a read-only worksheet.
+    Rows without the table key are skipped.
+    """
+    mapping = TABLES[table]["columns"]
+    rows = ws.iter_rows(values_only=True)
+    header = [str(h).strip().upper() if h is not None else "" for h in next(rows, ())]
+
+    wanted = {col: None for col in columns}
+    for idx, name in enumerate(header):
+        col = mapping.get(name)
+        if col in wanted and wanted[col] is None:
+            wanted[col] = idx
+    positions = [wanted[col] for col in columns]
+    key_pos = columns.index(TABLES[table]["key"])
+    key_header = header[positions[key_pos]] if positions[key_pos] is not None else None
+
+    for row in rows:
+        values = tuple(
+            _clean(row[i]) if i is not None and i < len(row) else None
+            for i in positions
+        )
+        # some exports repeat the header row between appended batches
+        if values[key_pos] is not None and values[key_pos].upper() != key_header:
+            yield values
+
+
+# ------------------------------------------------------
+# Loading
+# ------------------------------------------------------
+def _copy_field(value):
+    if value is None:
+        return r"\N"
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def table_columns(cur, table):
+    cur.execute(
+        """
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s;
+        """,
+        (table,),
+    )
+    return {r[0] for r in cur.fetchall()}
+
+
+def row_hash(values):
+    return hashlib.md5(
+        "\x1f".join("\x00" if v is None else v for v in values).encode("utf-8")
+    ).hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def copy_to_stage(cur, stage, columns, rows, sheet_digest):
+    """
+    COPY rows (plus their row hash) into the staging table in CHUNK_ROWS
+    batches, feeding each row hash into `sheet_digest`. Returns row count.
+    """
+    copy_sql = f"COPY {stage} ({', '.join(columns)}, _ord, _hash) FROM STDIN"
+    buf = io.StringIO()
+    pending = 0
+    total = 0
+
+    for row in rows:
+        h = row_hash(row)
+        sheet_digest.update(h.encode("ascii"))
+        buf.write("\t".join(_copy_field(v) for v in row))
+        buf.write(f"\t{total}\t{h}\n")
+        pending += 1
+        total += 1
+        if pending >= CHUNK_ROWS:
+            buf.seek(0)
+            cur.copy_expert(copy_sql, buf)
+            buf = io.StringIO()
+            pending = 0
+
+    if pending:
+        buf.seek(0)
+        cur.copy_expert(copy_sql, buf)
+    return total
+
+
+def merge_stage(cur, table, stage, columns, full=False):
+    """
+    Upsert staging rows into `table` (last row wins per key), but only the
+    keys whose row hash differs from ingest_row_hash (every key when `full`).
+    The IS DISTINCT FROM guard still skips rows that already match.
+    Returns (inserted, updated).
+    """
+    key = TABLES[table]["key"]
+    cols = ", ".join(columns)
+    others = [c for c in columns if c != key]
+    set_sql = ", ".join(f"{c} = EXCLUDED.{c}" for c in others)
+    old = ", ".join(f"t.{c}" for c in others)
+    new = ", ".join(f"EXCLUDED.{c}" for c in others)
+
+    cur.execute(
+        f"""
+        WITH latest AS (
+            SELECT DISTINCT ON ({key}) {cols}, _hash
+            FROM {stage}
+            ORDER BY {key}, _ord DESC
+        ), changed AS (
+            SELECT l.*
+            FROM latest l
+            LEFT JOIN ingest_row_hash h
+              ON h.table_name = %(table)s AND h.row_key = l.{key}::text
+            WHERE %(full)s OR h.row_hash IS DISTINCT FROM l._hash
+        ), merged AS (
+            INSERT INTO {table} AS t ({cols})
+            SELECT {cols} FROM changed
+            ORDER BY {key}
+            ON CONFLICT ({key}) DO UPDATE SET {set_sql}
+            WHERE ROW({old}) IS DISTINCT FROM ROW({new})
+            RETURNING (xmax = 0) AS inserted
+        ), hashed AS (
+            INSERT INTO ingest_row_hash (table_name, row_key, row_hash)
+            SELECT %(table)s, {key}::text, _hash FROM changed
+            ORDER BY {key}
+            ON CONFLICT (table_name, row_key)
+            DO UPDATE SET row_hash = EXCLUDED.row_hash, loaded_at = now()
+        )
+        SELECT COUNT(*) FILTER (WHERE inserted),
+               COUNT(*) FILTER (WHERE NOT inserted)
+        FROM merged;
+        """,
+        {"table": table, "full": full},
+    )
+    return cur.fetchone()
+
+
+# ------------------------------------------------------
+# Fingerprints
+# ------------------------------------------------------
+def ensure_manifest(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_manifest (
+                workbook     text NOT NULL,
+                sheet        text NOT NULL,   -- '' = the whole file
+                content_hash text NOT NULL,
+                row_count    integer,
+                loaded_at    timestamptz NOT NULL DEFAULT now(),
+                PRIMARY KEY (workbook, sheet)
+            );
+            CREATE TABLE IF NOT EXISTS ingest_row_hash (
+                table_name text NOT NULL,
+                row_key    text NOT NULL,
+                row_hash   text NOT NULL,
+                loaded_at  timestamptz NOT NULL DEFAULT now(),
+                PRIMARY KEY (table_name, row_key)
+            );
+            """
+        )
+    conn.commit()
+
+
+def manifest_hashes(cur, workbook):
+    cur.execute(
+        "SELECT sheet, content_hash FROM ingest_manifest WHERE workbook = %s;",
+        (workbook,),
+    )
+    return dict(cur.fetchall())
+
+
+def save_manifest(cur, workbook, sheet, content_hash, row_count):
+    cur.execute(
+        """
+        INSERT INTO ingest_manifest (workbook, sheet, content_hash, row_count)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (workbook, sheet) DO UPDATE
+        SET content_hash = EXCLUDED.content_hash,
+            row_count = EXCLUDED.row_count,
+            loaded_at = now();
+        """,
+        (workbook, sheet, content_hash, row_count),
+    )
+
+
+# ------------------------------------------------------
+# Per-file work
+# ------------------------------------------------------
+def load_sheet(cur, ws, table, known_hash=None, full=False):
+    """
+    Stage one sheet and merge it unless its content hash matches `known_hash`.
+    Returns (rows, inserted, updated, sheet_hash).
+    """
+    existing = table_columns(cur, table)
+    columns = [c for c in TABLES[table]["columns"].values() if c in existing]
+    stage = f"_stage_{table}"
+    cur.execute(
+        f"""
+        DROP TABLE IF EXISTS {stage};
+        CREATE TEMP TABLE {stage} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP;
+        ALTER TABLE {stage} ADD COLUMN _ord bigint, ADD COLUMN _hash text;
+        """
+    )
+    digest = hashlib.sha256()
+    rows = copy_to_stage(cur, stage, columns, iter_sheet_rows(ws, table, columns), digest)
+    sheet_hash = digest.hexdigest()
+
+    inserted = updated = 0
+    if sheet_hash != known_hash:
+        inserted, updated = merge_stage(cur, table, stage, columns, full)
+    cur.execute(f"DROP TABLE {stage};")
+    return rows, inserted, updated, sheet_hash
+
+
+def ingest_file(path, dsn, dry_run=False, full=False):
+    """
+    Load every recognised sheet of one workbook in a single transaction.
+    Runs inside a worker process, so it opens its own connection.
+    """
+    started = time.perf_counter()
+    workbook = os.path.basename(path)
+    result = {"file": workbook, "rows": 0, "inserted": 0, "updated": 0,
+              "tables": {}, "skipped": False}
+
+    content_hash = file_hash(path)
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            known = {} if full else manifest_hashes(cur, workbook)
+            if known.get("") == content_hash:
+                result["skipped"] = True
+                result["seconds"] = time.perf_counter() - started
+                return result
+
+            wb = load_workbook(path, read_only=True, data_only=True)
+            try:
+                sheets = {}
+                for ws in wb.worksheets:
+                    header = next(ws.iter_rows(max_row=1, values_only=True), ())
+                    table = classify_sheet(header)
+                    if table and table not in sheets:
+                        sheets[table] = ws
+
+                for table in TABLES:
+                    if table not in sheets:
+                        continue
+                    ws = sheets[table]
+                    rows, inserted, updated, sheet_hash = load_sheet(
+                        cur, ws, table, known.get(ws.title), full
+                    )
+                    save_manifest(cur, workbook, ws.title, sheet_hash, rows)
+                    result["tables"][table] = rows
+                    result["rows"] += rows
+                    result["inserted"] += inserted
+                    result["updated"] += updated
+            finally:
+                wb.close()
+
+            save_manifest(cur, workbook, "", content_hash, result["rows"])
+
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    finally:
+        conn.close()
+
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+# ------------------------------------------------------
+# CLI
+# ------------------------------------------------------
+def find_workbooks(paths):
+    if not paths:
+        paths = [DATA_DIR]
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            for ext in ("*.xlsx", "*.xlsm"):
+                files.extend(glob.glob(os.path.join(p, ext)))
+        else:
+            files.append(p)
+    return sorted(f for f in files if not os.path.basename(f).startswith("~$"))
+
+
+def _report(res):
+    if res["skipped"]:
+        print(f"{res['file']:<32} unchanged, skipped", flush=True)
+        return
+    rate = res["rows"] / res["seconds"] if res["seconds"] else 0
+    print(
+        f"{res['file']:<32} {res['rows']:>8,} rows  {res['seconds']:>6.2f}s  "
+        f"{rate:>9,.0f} rows/s  +{res['inserted']:,} new  ~{res['updated']:,} changed",
+        flush=True,
+    )
+
+
+def run(files, dsn, workers, dry_run=False, full=False):
+    """
+    Contact-only workbooks go in a second wave so the plants they
+    reference are already committed by the first one.
+    """
+    first = [f for f in files if "contact" not in os.path.basename(f).lower()]
+    second = [f for f in files if f not in first]
+    results = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for wave in (first, second):
+            futures = {pool.submit(ingest_file, f, dsn, dry_run, full): f for f in wave}
+            for fut in as_completed(futures):
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    print(f"{os.path.basename(futures[fut]):<32} FAILED: {e}", flush=True)
+                    continue
+                _report(res)
+                results.append(res)
+    return results
+
+
+def main(argv=None):
+    load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+    parser = argparse.ArgumentParser(description="Load PLANT_INFO workbooks into Postgres.")
+    parser.add_argument("paths", nargs="*", help="workbooks or folders (default: ../PLANT_INFO)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="load and merge, then roll back")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore stored fingerprints and re-merge every row")
+    args = parser.parse_args(argv)
+
+    files = find_workbooks(args.paths)
+    if not files:
+        parser.error("no workbooks found")
+
+    dsn = os.environ["DATABASE_URL"]
+    conn = psycopg2.connect(dsn)
+    try:
+        ensure_manifest(conn)
+    finally:
+        conn.close()
+
+    started = time.perf_counter()
+    results = run(files, dsn, args.workers, args.dry_run, args.full)
+    elapsed = time.perf_counter() - started
+
+    rows = sum(r["rows"] for r in results)
+    skipped = sum(r["skipped"] for r in results)
+    print(
+        f"\n{len(results)}/{len(files)} files ({skipped} unchanged), "
+        f"{rows:,} rows in {elapsed:.1f}s "
+        f"({rows / elapsed if elapsed else 0:,.0f} rows/s)"
+        + ("  [dry run]" if args.dry_run else "")
+    )
+    return 0 if len(results) == len(files) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,14 +1,26 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+
 import streamlit as st
 import extra_streamlit_components as stx
 import psycopg2
 from datetime import datetime, timedelta
 
+from cache import cached
+from metrics import instrumented
+
+SESSION_COOKIE = "afc_session"
+LEGACY_COOKIES = ["username", "role", "full_name"]
+
+
 # ------------------------------------------------------------
-# 🔹 Cookie Manager Init
+# 🔹 Cookie Manager (only mounted when a cookie is written)
 # ------------------------------------------------------------
-if "cookie_manager" not in st.session_state:
-    st.session_state.cookie_manager = stx.CookieManager(key="crm_cookie_manager")
-
 def get_cookie_manager():
     if "cookie_manager" not in st.session_state or st.session_state.cookie_manager is None:
         st.session_state.cookie_manager = stx.CookieManager(key="crm_cookie_manager")
@@ -16,10 +28,87 @@ def get_cookie_manager():
 
 
 # ------------------------------------------------------------
-# 🔹 Get all usernames from DB (no password needed)
+# 🔹 Signed session token: payload.signature, both base64url
 # ------------------------------------------------------------
-def get_all_users(get_conn):
-    with get_conn() as conn:
+@st.cache_resource
+def _session_secret():
+    # without SESSION_SECRET tokens only survive until the server restarts
+    secret = os.environ.get("SESSION_SECRET")
+    return secret.encode() if secret else secrets.token_bytes(32)
+
+
+@st.cache_resource
+def _revoked_tokens():
+    return {}   # signature -> expiry timestamp
+
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload):
+    return _b64(hmac.new(_session_secret(), payload.encode(), hashlib.sha256).digest())
+
+
+def make_token(user, expires):
+    payload = _b64(json.dumps(
+        {"u": user["username"], "r": user["role"], "n": user["full_name"],
+         "x": int(expires.timestamp())},
+        separators=(",", ":"),
+    ).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def read_token(token):
+    """User dict from a valid, unexpired, unrevoked token, else None."""
+    try:
+        payload, signature = token.split(".")
+        # as bytes: compare_digest refuses non-ASCII str from a tampered cookie
+        if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+            return None
+        data = json.loads(_unb64(payload))
+    except (ValueError, AttributeError):
+        return None
+    if data["x"] < time.time() or signature in _revoked_tokens():
+        return None
+    return {"username": data["u"], "role": data["r"], "full_name": data["n"]}
+
+
+def revoke_token(token):
+    revoked = _revoked_tokens()
+    now = time.time()
+    for sig, expires in list(revoked.items()):
+        if expires < now:
+            del revoked[sig]
+    try:
+        payload, signature = token.split(".")
+        revoked[signature] = json.loads(_unb64(payload))["x"]
+    except (ValueError, AttributeError, KeyError):
+        pass
+
+
+# ------------------------------------------------------------
+# 🔹 User directory (cached; reloads when app_users changes)
+# ------------------------------------------------------------
+@instrumented
+@st.cache_data(ttl=60)
+def user_directory_version(_get_conn):
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT COUNT(*), COALESCE(MAX(xmin::text::bigint), 0) FROM app_users;"
+            )
+            return tuple(cur.fetchone())
+
+
+@instrumented
+@cached(tables=("app_users",), ttl=3600, max_entries=2)
+def load_user_directory(_get_conn, version):
+    with _get_conn() as conn:
         cur = conn.cursor()
         cur.execute("SELECT username, full_name, role FROM app_users ORDER BY username;")
         rows = cur.fetchall()
@@ -30,8 +119,12 @@ def get_all_users(get_conn):
         return users
 
 
+def get_all_users(get_conn):
+    return load_user_directory(get_conn, user_directory_version(get_conn))
+
+
 # ------------------------------------------------------------
-# 🔹 Save login in cookies + session
+# 🔹 Save login in one cookie + session
 # ------------------------------------------------------------
 def save_login(user, remember=False):
     cookie = get_cookie_manager()
@@ -43,38 +136,25 @@ def save_login(user, remember=False):
     expires = datetime.now() + timedelta(days=7 if remember else 1)
 
     cookie.set(
-        "username",
-        user["username"],
-        expires_at=expires,
-        key=f"set_username_{user['username']}"
-    )
-
-    cookie.set(
-        "role",
-        user["role"],
-        expires_at=expires,
-        key=f"set_role_{user['username']}"
-    )
-
-    cookie.set(
-        "full_name",
-        user["full_name"],
+        SESSION_COOKIE,
+        make_token(user, expires),
         expires_at=expires,
-        key=f"set_fullname_{user['username']}"
+        key=f"set_session_{user['username']}"
     )
 
 
 # ------------------------------------------------------------
-# 🔹 Restore login from cookies
+# 🔹 Restore login from the session cookie
 # ------------------------------------------------------------
 def restore_login():
-    cookie = get_cookie_manager()
-    cookies = cookie.get_all()
-
-    if cookies and "username" in cookies and "role" in cookies:
-        st.session_state.username = cookies["username"]
-        st.session_state.role = cookies["role"]
-        st.session_state.full_name = cookies.get("full_name", "")
+    # request cookies come with the page load: no component, no DB query
+    token = st.context.cookies.get(SESSION_COOKIE)
+    user = read_token(token) if token else None
+
+    if user:
+        st.session_state.username = user["username"]
+        st.session_state.role = user["role"]
+        st.session_state.full_name = user["full_name"]
         return True
     return False
 
@@ -83,11 +163,17 @@ def restore_login():
 # 🔹 Logout clears session and cookies
 # ------------------------------------------------------------
 def logout_user():
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if token:
+        # this session's request still carries the cookie after deletion
+        revoke_token(token)
+
     cookie = get_cookie_manager()
     timestamp = datetime.now().timestamp()
-    for key in ["username", "role", "full_name"]:
+    for key in [SESSION_COOKIE] + LEGACY_COOKIES:
         cookie.delete(key,
                       key=f"del_{key}_{timestamp}")
+    for key in ["username", "role", "full_name"]:
         if key in st.session_state:
             del st.session_state[key]
     st.session_state.logged_out = True
@@ -0,0 +1,256 @@
+import contextvars
+import functools
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from prometheus_client import REGISTRY, Counter, Histogram, start_http_server
+
+from cache import sizeof
+
+# Prometheus scrape port, one per server process; 0 turns the endpoint off
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9108))
+
+# keep the per-rerun event list short enough to show in the sidebar
+MAX_RERUN_EVENTS = 200
+
+_SECONDS_BUCKETS = (.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+
+def _metric(cls, name, doc, labels, **kwargs):
+    # Streamlit re-imports edited modules; reuse what's already registered
+    existing = REGISTRY._names_to_collectors.get(name)
+    if existing is not None:
+        return existing
+    return cls(name, doc, labels, **kwargs)
+
+
+LOADER_CALLS = _metric(Counter, "dashboard_loader_calls", "Loader calls by cache result.", ["loader", "result"])
+LOADER_SECONDS = _metric(Histogram, "dashboard_loader_seconds", "Loader wall time, hits included.", ["loader"], buckets=_SECONDS_BUCKETS)
+QUERY_SECONDS = _metric(Histogram, "dashboard_query_seconds", "read_sql wall time.", ["loader"], buckets=_SECONDS_BUCKETS)
+QUERY_ROWS = _metric(Counter, "dashboard_query_rows", "Rows returned by read_sql.", ["loader"])
+QUERY_BYTES = _metric(Counter, "dashboard_query_bytes", "In-memory size of read_sql results.", ["loader"])
+RERUN_SECONDS = _metric(Histogram, "dashboard_rerun_seconds", "Full script run time per tab.", ["tab"], buckets=_SECONDS_BUCKETS)
+FRAGMENT_SECONDS = _metric(Histogram, "dashboard_fragment_seconds", "Fragment-only run time.", ["fragment"], buckets=_SECONDS_BUCKETS)
+
+_loader = contextvars.ContextVar("loader", default=None)     # innermost loader frame
+_events = contextvars.ContextVar("events", default=None)     # this rerun's events
+_tab = contextvars.ContextVar("tab", default=None)
+
+
+def _record(event):
+    events = _events.get()
+    if events is not None and len(events) < MAX_RERUN_EVENTS:
+        events.append(event)
+
+
+# ------------------------------------------------------
+# ENDPOINT
+# ------------------------------------------------------
+@st.cache_resource
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics once per process. Returns the port, or None if off/taken."""
+    if not port:
+        return None
+    try:
+        start_http_server(port)
+    except OSError:
+        return None     # another server process already has it
+    return port
+
+
+# ------------------------------------------------------
+# LOADERS
+# ------------------------------------------------------
+def current_context():
+    """(tab, loader) the running code belongs to, either may be None."""
+    frame = _loader.get()
+    return _tab.get(), frame["name"] if frame else None
+
+
+def mark_db_use():
+    """Called by db.get_conn(): the running loader went to the database."""
+    frame = _loader.get()
+    if frame is not None:
+        frame["db"] = True
+
+
+def instrumented(func):
+    """
+    Outermost decorator on a loader (above st.cache_data / @cached).
+    A call that borrowed a DB connection counts as a miss, anything else
+    was served from cache.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        parent = _loader.get()
+        frame = {"name": name, "db": False}
+        token = _loader.set(frame)
+        t0 = time.perf_counter()
+        result = "error"
+        try:
+            value = func(*args, **kwargs)
+            result = "miss" if frame["db"] else "hit"
+            return value
+        finally:
+            elapsed = time.perf_counter() - t0
+            _loader.reset(token)
+            if frame["db"] and parent is not None:
+                parent["db"] = True
+            LOADER_CALLS.labels(name, result).inc()
+            LOADER_SECONDS.labels(name).observe(elapsed)
+            _record({"loader": name, "kind": result, "ms": elapsed * 1000,
+                     "rows": None, "bytes": None})
+
+    if hasattr(func, "clear"):
+        wrapper.clear = func.clear
+    return wrapper
+
+
+def read_sql(query, conn, params=None, **kwargs):
+    """pd.read_sql, timed and counted under the calling loader."""
+    frame = _loader.get()
+    if frame is not None:
+        name = frame["name"]
+    else:
+        caller = sys._getframe(1)
+        name = f"{caller.f_globals.get('__name__')}.{caller.f_code.co_name}"
+
+    t0 = time.perf_counter()
+    df = pd.read_sql(query, conn, params=params, **kwargs)
+    elapsed = time.perf_counter() - t0
+
+    nbytes = sizeof(df)
+    QUERY_SECONDS.labels(name).observe(elapsed)
+    QUERY_ROWS.labels(name).inc(len(df))
+    QUERY_BYTES.labels(name).inc(nbytes)
+    _record({"loader": name, "kind": "query", "ms": elapsed * 1000,
+             "rows": len(df), "bytes": nbytes})
+    return df
+
+
+# ------------------------------------------------------
+# RERUNS
+# ------------------------------------------------------
+@contextmanager
+def track_rerun(tab):
+    """Time one script run of `tab` and keep its events for perf_panel()."""
+    events = []
+    token = _events.set(events)
+    tab_token = _tab.set(tab)
+    runs = _count_run("full script")
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        _events.reset(token)
+        _tab.reset(tab_token)
+        RERUN_SECONDS.labels(tab).observe(elapsed)
+        st.session_state["perf_last_rerun"] = {
+            "tab": tab, "ms": elapsed * 1000, "events": events,
+        }
+        runs["last_ms"] = elapsed * 1000
+
+
+def _count_run(scope):
+    """Bump this session's run counter for `scope`; returns its entry."""
+    entry = st.session_state.setdefault("perf_runs", {}).setdefault(
+        scope, {"runs": 0, "last_ms": None},
+    )
+    entry["runs"] += 1
+    return entry
+
+
+def _fragment_run():
+    """True while Streamlit is rerunning fragments only, not the script."""
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+
+@contextmanager
+def track_fragment(name):
+    """
+    Time one run of fragment `name`. Only fragment-only reruns count: during
+    a full script run the fragment is part of track_rerun's time.
+    """
+    if not _fragment_run():
+        yield
+        return
+    runs = _count_run(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        FRAGMENT_SECONDS.labels(name).observe(elapsed)
+        runs["last_ms"] = elapsed * 1000
+
+
+def run_counts_caption(name):
+    """Admin-only line inside fragment `name`: its own runs vs full script runs."""
+    if st.session_state.get("role") != "admin":
+        return
+    runs = st.session_state.get("perf_runs", {})
+    mine = runs.get(name, {"runs": 0, "last_ms": None})
+    last = f", previous {mine['last_ms']:.0f} ms" if mine["last_ms"] is not None else ""
+    st.caption(
+        f"⏱ {name}: {mine['runs']} fragment runs{last} · "
+        f"full script runs: {runs.get('full script', {}).get('runs', 0)}"
+    )
+
+
+def _samples(metric, suffix):
+    """{labels tuple: value} for one sample series of a collector."""
+    out = {}
+    for family in metric.collect():
+        for sample in family.samples:
+            if sample.name.endswith(suffix):
+                out[tuple(sample.labels.values())] = sample.value
+    return out
+
+
+def perf_panel():
+    """Admin sidebar: this session's last rerun plus process-wide loader totals."""
+    last = st.session_state.get("perf_last_rerun")
+    if last:
+        events = pd.DataFrame(last["events"], columns=["loader", "kind", "ms", "rows", "bytes"])
+        queries = events[events["kind"] == "query"]
+        st.caption(
+            f"Last rerun: **{last['tab']}** {last['ms']:.0f} ms · "
+            f"{len(queries)} queries ({queries['ms'].sum():.0f} ms) · "
+            f"{(events['kind'] == 'hit').sum()} hits / {(events['kind'] == 'miss').sum()} misses"
+        )
+        st.dataframe(events.round({"ms": 1}), hide_index=True)
+
+    runs = st.session_state.get("perf_runs")
+    if runs:
+        st.caption("Runs this session: " + " · ".join(
+            f"{scope} {entry['runs']}" for scope, entry in runs.items()
+        ))
+
+    calls = _samples(LOADER_CALLS, "_total")
+    seconds = _samples(LOADER_SECONDS, "_sum")
+    rows = []
+    for name in sorted({labels[0] for labels in calls}):
+        hits = calls.get((name, "hit"), 0)
+        misses = calls.get((name, "miss"), 0)
+        total = hits + misses + calls.get((name, "error"), 0)
+        rows.append({
+            "loader": name,
+            "calls": int(total),
+            "hit %": round(100 * hits / total, 1) if total else None,
+            "avg ms": round(1000 * seconds.get((name,), 0) / total, 1) if total else None,
+        })
+    if rows:
+        st.caption("Since server start")
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+
+    port = start_metrics_server()
+    st.caption(f"Prometheus: :{port}/metrics" if port else "Prometheus endpoint off")
@@ -0,0 +1,483 @@
+"""
+Schema changes the dashboard relies on (indexes, derived columns, ...).
+
+    python migrations.py            # apply anything pending
+    python migrations.py --list     # show applied / pending
+    python migrations.py --verify   # EXPLAIN the app's lookups, fail on a missing index
+
+Each migration runs once, in its own transaction, and is recorded in
+schema_migrations. Add new ones to the end of MIGRATIONS, never edit old ones.
+"""
+import argparse
+import os
+
+import psycopg2
+from dotenv import load_dotenv
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ------------------------------------------------------
+# (name, sql) in the order they must run
+# ------------------------------------------------------
+MIGRATIONS = [
+    (
+        "001_outage_comment_search",
+        """
+        ALTER TABLE outtage_info
+            ADD COLUMN IF NOT EXISTS com_tsv tsvector
+            GENERATED ALWAYS AS (to_tsvector('english', coalesce(com, ''))) STORED;
+
+        CREATE INDEX IF NOT EXISTS outtage_info_com_tsv_idx
+            ON outtage_info USING GIN (com_tsv);
+        """,
+    ),
+    (
+        # per-plant contact/drive counts kept current by statement triggers,
+        # so the Search tab never re-joins contacts x drives
+        "002_plant_summary_counts",
+        """
+        CREATE INDEX IF NOT EXISTS contact_plant_info_plant_id_idx
+            ON contact_plant_info (plant_id);
+        CREATE INDEX IF NOT EXISTS plant_drive_info_plant_id_idx
+            ON plant_drive_info (plant_id);
+
+        CREATE TABLE IF NOT EXISTS plant_summary_counts (
+            plant_id      bigint PRIMARY KEY,
+            contact_count integer NOT NULL DEFAULT 0,
+            drive_count   integer NOT NULL DEFAULT 0
+        );
+
+        -- recount only the given plants (both counts are cheap index scans)
+        CREATE OR REPLACE FUNCTION refresh_plant_summary(ids bigint[])
+        RETURNS void LANGUAGE sql AS $$
+            INSERT INTO plant_summary_counts AS s (plant_id, contact_count, drive_count)
+            SELECT p.plant_id,
+                   (SELECT COUNT(*) FROM contact_plant_info c WHERE c.plant_id = p.plant_id),
+                   (SELECT COUNT(*) FROM plant_drive_info d WHERE d.plant_id = p.plant_id)
+            FROM unnest(ids) AS p(plant_id)
+            WHERE p.plant_id IS NOT NULL
+            ON CONFLICT (plant_id) DO UPDATE
+                SET contact_count = EXCLUDED.contact_count,
+                    drive_count   = EXCLUDED.drive_count
+                WHERE (s.contact_count, s.drive_count)
+                      IS DISTINCT FROM (EXCLUDED.contact_count, EXCLUDED.drive_count);
+        $$;
+
+        -- transition tables only exist for the event that fired, hence TG_OP
+        CREATE OR REPLACE FUNCTION plant_summary_on_change()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM refresh_plant_summary(ARRAY(SELECT DISTINCT plant_id FROM new_rows));
+            ELSIF TG_OP = 'UPDATE' THEN
+                PERFORM refresh_plant_summary(ARRAY(
+                    SELECT plant_id FROM new_rows UNION SELECT plant_id FROM old_rows
+                ));
+            ELSE
+                PERFORM refresh_plant_summary(ARRAY(SELECT DISTINCT plant_id FROM old_rows));
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+
+        DO $$
+        DECLARE
+            t text;
+        BEGIN
+            FOREACH t IN ARRAY ARRAY['contact_plant_info', 'plant_drive_info'] LOOP
+                EXECUTE format(
+                    'CREATE TRIGGER %1$s_summary_ins AFTER INSERT ON %1$I
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION plant_summary_on_change();
+                     CREATE TRIGGER %1$s_summary_upd AFTER UPDATE ON %1$I
+                        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION plant_summary_on_change();
+                     CREATE TRIGGER %1$s_summary_del AFTER DELETE ON %1$I
+                        REFERENCING OLD TABLE AS old_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION plant_summary_on_change();',
+                    t
+                );
+            END LOOP;
+        END;
+        $$;
+
+        -- same rows load_main_plant_summary used to build with the join:
+        -- plants having at least one contact and one drive
+        CREATE OR REPLACE VIEW plant_summary AS
+        SELECT g.plant_id,
+               g.plantname,
+               g.ownername,
+               g.company_city,
+               g.company_state,
+               g.fuel_type_1,
+               s.contact_count,
+               s.drive_count
+        FROM plant_summary_counts s
+        JOIN general_plant_info g ON g.plant_id = s.plant_id
+        WHERE s.contact_count > 0 AND s.drive_count > 0;
+
+        SELECT refresh_plant_summary(ARRAY(
+            SELECT plant_id FROM contact_plant_info
+            UNION
+            SELECT plant_id FROM plant_drive_info
+        ));
+        """,
+    ),
+    (
+        # trigram GIN indexes serve ILIKE '%..%' / 'x%' (the SQL search
+        # fallback, calldir); the lower(full name) b-tree serves exact
+        # contact lookups in activity.py
+        "003_trigram_lookup_indexes",
+        """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+        CREATE INDEX IF NOT EXISTS general_plant_info_plantname_trgm_idx
+            ON general_plant_info USING GIN (plantname gin_trgm_ops);
+
+        CREATE INDEX IF NOT EXISTS contact_plant_info_full_name_trgm_idx
+            ON contact_plant_info USING GIN ((cont_fname || ' ' || cont_lname) gin_trgm_ops);
+
+        CREATE INDEX IF NOT EXISTS contact_plant_info_full_name_lower_idx
+            ON contact_plant_info (lower(cont_fname || ' ' || cont_lname));
+
+        CREATE INDEX IF NOT EXISTS contact_plant_info_title_trgm_idx
+            ON contact_plant_info USING GIN (functional_title gin_trgm_ops);
+
+        CREATE INDEX IF NOT EXISTS plant_drive_info_startup_trgm_idx
+            ON plant_drive_info USING GIN (drive_startup gin_trgm_ops);
+        """,
+    ),
+    (
+        # keyset pagination for the Recent Activity feed (activity.py)
+        "004_sales_activity_feed_index",
+        """
+        CREATE INDEX IF NOT EXISTS sales_activity_feed_idx
+            ON sales_activity (created_at DESC, id DESC);
+
+        CREATE INDEX IF NOT EXISTS sales_activity_user_feed_idx
+            ON sales_activity (username, created_at DESC, id DESC);
+        """,
+    ),
+    (
+        # type-ahead plant picker: anchored prefix matches (plant_picker.py);
+        # "contains" matches use the trigram index from 003
+        "005_plantname_prefix_index",
+        """
+        CREATE INDEX IF NOT EXISTS general_plant_info_plantname_prefix_idx
+            ON general_plant_info (lower(plantname) text_pattern_ops);
+        """,
+    ),
+    (
+        # 002's triggers recounted under the writer's snapshot and overwrote
+        # the row, so two concurrent writers to one plant lost an update.
+        # Apply +/- deltas from the transition tables instead: ON CONFLICT
+        # DO UPDATE always adds to the latest committed row. TRUNCATE zeroes
+        # the table's column.
+        "006_plant_summary_deltas",
+        """
+        CREATE OR REPLACE FUNCTION plant_summary_add(is_contact boolean, added bigint[], removed bigint[])
+        RETURNS void LANGUAGE sql AS $$
+            INSERT INTO plant_summary_counts AS s (plant_id, contact_count, drive_count)
+            SELECT d.plant_id,
+                   CASE WHEN is_contact THEN d.n ELSE 0 END,
+                   CASE WHEN is_contact THEN 0 ELSE d.n END
+            FROM (
+                SELECT plant_id, SUM(n)::integer AS n
+                FROM (
+                    SELECT unnest(added) AS plant_id, 1 AS n
+                    UNION ALL
+                    SELECT unnest(removed), -1
+                ) x
+                WHERE plant_id IS NOT NULL
+                GROUP BY plant_id
+                HAVING SUM(n) <> 0
+            ) d
+            ORDER BY d.plant_id      -- one lock order for every writer: no deadlocks
+            ON CONFLICT (plant_id) DO UPDATE
+                SET contact_count = s.contact_count + EXCLUDED.contact_count,
+                    drive_count   = s.drive_count + EXCLUDED.drive_count;
+        $$;
+
+        -- transition tables only exist for the event that fired, hence TG_OP
+        CREATE OR REPLACE FUNCTION plant_summary_on_change()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            is_contact boolean := TG_TABLE_NAME = 'contact_plant_info';
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM plant_summary_add(is_contact, ARRAY(SELECT plant_id FROM new_rows), '{}');
+            ELSIF TG_OP = 'UPDATE' THEN
+                PERFORM plant_summary_add(is_contact, ARRAY(SELECT plant_id FROM new_rows),
+                                          ARRAY(SELECT plant_id FROM old_rows));
+            ELSE
+                PERFORM plant_summary_add(is_contact, '{}', ARRAY(SELECT plant_id FROM old_rows));
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+
+        CREATE OR REPLACE FUNCTION plant_summary_on_truncate()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_TABLE_NAME = 'contact_plant_info' THEN
+                UPDATE plant_summary_counts SET contact_count = 0 WHERE contact_count <> 0;
+            ELSE
+                UPDATE plant_summary_counts SET drive_count = 0 WHERE drive_count <> 0;
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+
+        CREATE TRIGGER contact_plant_info_summary_trunc AFTER TRUNCATE ON contact_plant_info
+            FOR EACH STATEMENT EXECUTE FUNCTION plant_summary_on_truncate();
+        CREATE TRIGGER plant_drive_info_summary_trunc AFTER TRUNCATE ON plant_drive_info
+            FOR EACH STATEMENT EXECUTE FUNCTION plant_summary_on_truncate();
+
+        -- repair any drift from the recount triggers; writers wait meanwhile
+        -- (refresh_plant_summary is only safe under this lock)
+        LOCK TABLE contact_plant_info, plant_drive_info IN SHARE MODE;
+        SELECT refresh_plant_summary(ARRAY(
+            SELECT plant_id FROM contact_plant_info
+            UNION
+            SELECT plant_id FROM plant_drive_info
+            UNION
+            SELECT plant_id FROM plant_summary_counts
+        ));
+        """,
+    ),
+    (
+        # Recent Activity polls by id (activity.load_activity_since); the
+        # primary key serves admins, this one a single user's rows
+        "007_sales_activity_poll_index",
+        """
+        CREATE INDEX IF NOT EXISTS sales_activity_user_id_idx
+            ON sales_activity (username, id);
+        """,
+    ),
+    (
+        # All Plants keyset pages (all_plants.load_plant_page), one per
+        # SORT_COLUMNS entry; the expression must match its ORDER BY exactly.
+        # Descending pages scan the same index backwards.
+        "008_all_plants_sort_indexes",
+        """
+        CREATE INDEX IF NOT EXISTS general_plant_info_plantname_sort_idx
+            ON general_plant_info ((COALESCE(plantname, '')), plant_id);
+        CREATE INDEX IF NOT EXISTS general_plant_info_ownername_sort_idx
+            ON general_plant_info ((COALESCE(ownername, '')), plant_id);
+        CREATE INDEX IF NOT EXISTS general_plant_info_company_city_sort_idx
+            ON general_plant_info ((COALESCE(company_city, '')), plant_id);
+        CREATE INDEX IF NOT EXISTS general_plant_info_company_state_sort_idx
+            ON general_plant_info ((COALESCE(company_state, '')), plant_id);
+        CREATE INDEX IF NOT EXISTS general_plant_info_fuel_type_1_sort_idx
+            ON general_plant_info ((COALESCE(fuel_type_1, '')), plant_id);
+        """,
+    ),
+]
+
+# ------------------------------------------------------
+# (name, sql, params, index the plan must use) for --verify.
+# Seq scans are disabled while checking, so tiny tables still prove
+# the index *can* serve the query shape the app sends.
+# ------------------------------------------------------
+PLAN_CHECKS = [
+    (
+        "outage comment search",
+        "SELECT event_id FROM outtage_info WHERE com_tsv @@ to_tsquery('english', %s);",
+        ("pump",),
+        "outtage_info_com_tsv_idx",
+    ),
+    (
+        "contacts for a plant",
+        "SELECT cont_id FROM contact_plant_info WHERE plant_id = %s;",
+        (1,),
+        "contact_plant_info_plant_id_idx",
+    ),
+    (
+        "plant name contains (search fallback)",
+        "SELECT plant_id FROM general_plant_info WHERE plantname ILIKE %s;",
+        ("%plant%",),
+        "general_plant_info_plantname_trgm_idx",
+    ),
+    (
+        "contact name contains",
+        "SELECT cont_id FROM contact_plant_info "
+        "WHERE cont_fname || ' ' || cont_lname ILIKE %s;",
+        ("%smith%",),
+        "contact_plant_info_full_name_trgm_idx",
+    ),
+    (
+        "contact name exact (activity insert)",
+        "SELECT cont_id FROM contact_plant_info "
+        "WHERE lower(cont_fname || ' ' || cont_lname) = lower(%s);",
+        ("John Smith",),
+        "contact_plant_info_full_name_lower_idx",
+    ),
+    (
+        "title prefix (call directory)",
+        "SELECT cont_id FROM contact_plant_info WHERE functional_title ILIKE %s;",
+        ("plant man%",),
+        "contact_plant_info_title_trgm_idx",
+    ),
+    (
+        "startup year contains (search fallback)",
+        "SELECT drive_id FROM plant_drive_info WHERE drive_startup ILIKE %s;",
+        ("%199%",),
+        "plant_drive_info_startup_trgm_idx",
+    ),
+    (
+        "activity feed, older page",
+        "SELECT id FROM sales_activity WHERE (created_at, id) < (%s, %s) "
+        "ORDER BY created_at DESC, id DESC LIMIT 50;",
+        ("2100-01-01", 0),
+        "sales_activity_feed_idx",
+    ),
+    (
+        "activity feed, delta",
+        "SELECT id FROM sales_activity WHERE id > %s ORDER BY id LIMIT 50;",
+        (0,),
+        "sales_activity_pkey",
+    ),
+    (
+        "activity feed, one user's delta",
+        "SELECT id FROM sales_activity WHERE username = %s AND id > %s ORDER BY id LIMIT 50;",
+        ("rep1", 0),
+        "sales_activity_user_id_idx",
+    ),
+    (
+        "plant picker, prefix",
+        "SELECT plant_id FROM general_plant_info WHERE lower(plantname) LIKE %s "
+        "ORDER BY lower(plantname) LIMIT 20;",
+        ("plant 1%",),
+        "general_plant_info_plantname_prefix_idx",
+    ),
+    (
+        "all plants, first page",
+        "SELECT plant_id FROM general_plant_info "
+        "ORDER BY COALESCE(plantname, '') ASC, plant_id ASC LIMIT 100;",
+        (),
+        "general_plant_info_plantname_sort_idx",
+    ),
+] + [
+    (
+        f"all plants, {col} page (desc)",
+        f"SELECT plant_id FROM general_plant_info "
+        f"WHERE (COALESCE({col}, ''), plant_id) < (%s, %s) "
+        f"ORDER BY COALESCE({col}, '') DESC, plant_id DESC LIMIT 100;",
+        ("M", 0),
+        f"general_plant_info_{col}_sort_idx",
+    )
+    for col in ("plantname", "ownername", "company_city", "company_state", "fuel_type_1")
+]
+
+
+def ensure_table(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name       text PRIMARY KEY,
+            applied_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+
+
+def applied_migrations(cur):
+    cur.execute("SELECT name FROM schema_migrations;")
+    return {r[0] for r in cur.fetchall()}
+
+
+def migrate(conn):
+    """Apply every pending migration. Returns the names that ran."""
+    with conn.cursor() as cur:
+        ensure_table(cur)
+        done = applied_migrations(cur)
+    conn.commit()
+
+    ran = []
+    for name, sql in MIGRATIONS:
+        if name in done:
+            continue
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            cur.execute("INSERT INTO schema_migrations (name) VALUES (%s);", (name,))
+        conn.commit()
+        ran.append(name)
+    return ran
+
+
+def _plan_indexes(node):
+    """Every index name used anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    found = set()
+    if "Index Name" in node:
+        found.add(node["Index Name"])
+    for child in node.get("Plans", []):
+        found |= _plan_indexes(child)
+    return found
+
+
+def verify(conn):
+    """
+    EXPLAIN each PLAN_CHECKS query. Returns [(name, ok, detail)]; nothing
+    is executed, the transaction is rolled back.
+    """
+    results = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off;")
+            for name, sql, params, index in PLAN_CHECKS:
+                cur.execute("SAVEPOINT plan_check;")
+                try:
+                    cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+                except psycopg2.Error as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT plan_check;")
+                    results.append((name, False, str(e).strip().splitlines()[0]))
+                    continue
+                used = _plan_indexes(cur.fetchone()[0][0]["Plan"])
+                if index in used:
+                    results.append((name, True, index))
+                else:
+                    results.append((name, False, f"wanted {index}, plan used {sorted(used) or 'no index'}"))
+    finally:
+        conn.rollback()
+    return results
+
+
+def main(argv=None):
+    load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+    parser = argparse.ArgumentParser(description="Apply dashboard schema migrations.")
+    parser.add_argument("--list", action="store_true", help="show status and exit")
+    parser.add_argument("--verify", action="store_true",
+                        help="check the app's lookups plan onto their indexes, exit 1 if not")
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        if args.verify:
+            results = verify(conn)
+            for name, ok, detail in results:
+                print(f"{'ok' if ok else 'FAIL':<5} {name:<42} {detail}")
+            return 0 if all(ok for _, ok, _ in results) else 1
+
+        if args.list:
+            with conn.cursor() as cur:
+                ensure_table(cur)
+                done = applied_migrations(cur)
+            conn.commit()
+            for name, _ in MIGRATIONS:
+                print(f"{'applied' if name in done else 'pending':<8} {name}")
+            return 0
+
+        ran = migrate(conn)
+    finally:
+        conn.close()
+
+    for name in ran:
+        print(f"applied  {name}")
+    if not ran:
+        print("nothing to do")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,218 @@
+import pandas as pd
+import streamlit as st
+
+# ============================================================
+# 🔵 OUTAGE CARD GRID (one client-side component per page)
+# ============================================================
+# The whole page of cards goes to the browser as one JSON payload and is
+# drawn there; only the rows in view exist in the DOM. Clicking "View"
+# sends the event_id back as a single "selected" trigger.
+
+CARD_CSS = """
+.grid-viewport {
+    position: relative;
+    overflow-y: auto;
+}
+.grid-row {
+    position: absolute;
+    left: 0;
+    right: 0;
+    display: grid;
+    grid-template-columns: repeat(3, minmax(0, 1fr));
+    gap: 1rem;
+    padding: 0 0.25rem;
+}
+.outage-card {
+    border-radius: 16px;
+    padding: 1.1rem;
+    background: linear-gradient(145deg, #2b2b2b, #1f1f1f);
+    box-shadow: 0 4px 12px rgba(0,0,0,0.35);
+    border-left: 6px solid #6A5ACD;
+    transition: all 0.25s ease;
+    overflow: hidden;
+}
+.outage-card:hover {
+    transform: translateY(-4px);
+    box-shadow: 0 8px 20px rgba(0,0,0,0.55);
+}
+.outage-card.selected {
+    outline: 2px solid #4A90E2;
+}
+.soft-red {
+    border-left-color:#FF6B6B !important;
+    background:linear-gradient(145deg,#3b2020,#2a1a1a);
+}
+.soft-orange {
+    border-left-color:#FFB347 !important;
+    background:linear-gradient(145deg,#3d2c17,#2a1e10);
+}
+.soft-green {
+    border-left-color:#27AE60 !important;
+    background:linear-gradient(145deg,#20382a,#1a2c22);
+}
+.soft-blue {
+    border-left-color:#4A90E2 !important;
+    background:linear-gradient(145deg,#1e2d42,#162232);
+}
+.card-title {
+    font-size:1.1rem;
+    font-weight:600;
+    color:#ffffff;
+    margin-bottom:.35rem;
+    white-space: nowrap;
+    overflow: hidden;
+    text-overflow: ellipsis;
+}
+.card-text {
+    font-size:0.9rem;
+    color:#d2d2d2;
+    margin:0.15rem 0;
+    white-space: nowrap;
+    overflow: hidden;
+    text-overflow: ellipsis;
+}
+.card-view {
+    margin-top: 0.5rem;
+    width: 100%;
+    padding: 0.3rem;
+    border-radius: 8px;
+    border: 1px solid #444;
+    background: #1b1e27;
+    color: #e0e0e0;
+    cursor: pointer;
+}
+.card-view:hover {
+    border-color: #4A90E2;
+}
+"""
+
+CARD_JS = """
+const ROW_HEIGHT = 270;
+const COLUMNS = 3;
+const MAX_VIEW_HEIGHT = 820;
+const OVERSCAN = 2;
+
+const esc = (v) => String(v ?? "").replace(/[&<>"']/g, (c) => ({
+    "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"
+}[c]));
+
+function cardHtml(c, selected) {
+    return `
+        <div class="outage-card ${esc(c.css_class)}${c.event_id === selected ? " selected" : ""}">
+            <div class="card-title">🏭 ${esc(c.plant_name)}</div>
+            <div class="card-text"><b>State:</b> ${esc(c.plant_state)}</div>
+            <div class="card-text"><b>Fuel:</b> ${esc(c.primary_fuel)}</div>
+            <div class="card-text"><b>Start:</b> ${esc(c.start)}</div>
+            <div class="card-text"><b>End:</b> ${esc(c.end)}</div>
+            <div class="card-text"><b>Duration:</b> ${esc(c.duration_days)} days</div>
+            <div class="card-text"><b>Note:</b> ${esc(c.note)}...</div>
+            <button class="card-view" data-event="${esc(c.event_id)}">View</button>
+        </div>`;
+}
+
+export default function (component) {
+    const { data, setTriggerValue, parentElement } = component;
+    const cards = (data && data.cards) || [];
+    let selected = data ? data.selected : null;
+    const rows = Math.ceil(cards.length / COLUMNS);
+
+    let viewport = parentElement.querySelector(".grid-viewport");
+    if (!viewport) {
+        viewport = document.createElement("div");
+        viewport.className = "grid-viewport";
+        viewport.innerHTML = '<div class="grid-spacer"></div><div class="grid-rows"></div>';
+        parentElement.appendChild(viewport);
+    }
+    const spacer = viewport.querySelector(".grid-spacer");
+    const layer = viewport.querySelector(".grid-rows");
+
+    spacer.style.height = `${rows * ROW_HEIGHT}px`;
+    viewport.style.height = `${Math.min(MAX_VIEW_HEIGHT, rows * ROW_HEIGHT)}px`;
+    // back to the top only when a different page of cards arrives
+    const signature = `${cards.length}:${cards.length ? cards[0].event_id : ""}`;
+    if (viewport.dataset.signature !== signature) {
+        viewport.dataset.signature = signature;
+        viewport.scrollTop = 0;
+    }
+
+    let painted = "";
+    const paint = () => {
+        const first = Math.max(0, Math.floor(viewport.scrollTop / ROW_HEIGHT) - OVERSCAN);
+        const last = Math.min(
+            rows,
+            Math.ceil((viewport.scrollTop + viewport.clientHeight) / ROW_HEIGHT) + OVERSCAN
+        );
+        const range = `${first}:${last}`;
+        if (range === painted) return;
+        painted = range;
+
+        let html = "";
+        for (let r = first; r < last; r++) {
+            const rowCards = cards.slice(r * COLUMNS, (r + 1) * COLUMNS);
+            html += `<div class="grid-row" style="top:${r * ROW_HEIGHT}px">`
+                + rowCards.map((c) => cardHtml(c, selected)).join("")
+                + "</div>";
+        }
+        layer.innerHTML = html;
+    };
+
+    let frame = null;
+    viewport.onscroll = () => {
+        if (frame === null) {
+            frame = requestAnimationFrame(() => { frame = null; paint(); });
+        }
+    };
+    viewport.onclick = (e) => {
+        const btn = e.target.closest("[data-event]");
+        if (!btn) return;
+        const card = cards.find((c) => String(c.event_id) === btn.dataset.event);
+        if (!card) return;
+        // highlight now; the fragment rerun only confirms it
+        selected = card.event_id;
+        painted = "";
+        paint();
+        setTriggerValue("selected", card.event_id);
+    };
+
+    paint();
+    return () => {
+        if (frame !== null) cancelAnimationFrame(frame);
+    };
+}
+"""
+
+_card_grid = st.components.v2.component(
+    "outage_card_grid",
+    css=CARD_CSS,
+    js=CARD_JS,
+)
+
+
+def card_payload(df):
+    """Page of enriched outages -> JSON-safe list of card dicts."""
+    cards = pd.DataFrame({
+        "event_id": df["event_id"],
+        "plant_name": df["plant_name"],
+        "plant_state": df["plant_state"],
+        "primary_fuel": df["primary_fuel"],
+        "start": df["start_date"].dt.strftime("%Y-%m-%d"),
+        "end": df["end_date"].dt.strftime("%Y-%m-%d"),
+        "duration_days": df["duration_days"],
+        "note": df["com"].fillna("").astype(str).str.slice(0, 70),
+        "css_class": df["css_class"],
+    })
+    cards = cards.astype(object).where(cards.notna(), None)
+    return cards.to_dict("records")
+
+
+def outage_card_grid(df, selected=None, key="outage_card_grid"):
+    """
+    Draw a page of outage cards. Returns the event_id whose "View" button
+    was clicked on this rerun, else None.
+    """
+    result = _card_grid(
+        data={"cards": card_payload(df), "selected": selected},
+        key=key,
+        on_selected_change=lambda: None,
+    )
+    return result.selected
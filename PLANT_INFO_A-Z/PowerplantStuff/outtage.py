@@ -1,163 +1,247 @@
+import re
 import streamlit as st
 import pandas as pd
+import numpy as np
 import psycopg2
 import pydeck as pydeck
 from datetime import date
-from contextlib import contextmanager
-
-# ============================================================
-# 🔵 FRAGMENT SHIMS (for older Streamlit versions)
-# ============================================================
-
-
-# ---- helper to check if object is a real context manager ----
-def _is_ctx_manager(obj):
-    return hasattr(obj, "__enter__") and hasattr(obj, "__exit__")
-
-# ---- MAIN fragment shim ----
-try:
-    candidate = getattr(st, "fragment", None)
-    if candidate and _is_ctx_manager(candidate):
-        fragment_ctx = candidate
-    else:
-        raise AttributeError
-except Exception:
-    @contextmanager
-    def fragment_ctx(_id: str):
-        yield
-
-# ---- SIDEBAR fragment shim ----
-try:
-    side_candidate = getattr(st.sidebar, "fragment", None)
-    if side_candidate and _is_ctx_manager(side_candidate):
-        sidebar_fragment_ctx = side_candidate
-    else:
-        raise AttributeError
-except Exception:
-    @contextmanager
-    def sidebar_fragment_ctx(_id: str):
-        with st.sidebar:
-            yield
-
 
+from cache import LRUCache
+from export import csv_download_button
+from metrics import instrumented, read_sql, run_counts_caption, track_fragment
+from outage_cards import outage_card_grid
 
 # ============================================================
-# 🔵 GLOBAL CSS — loaded once per session (cards only)
+# 🔵 CACHED QUERIES (FAST)
 # ============================================================
-@st.cache_resource
-def load_outage_css():
-    return """
-    <style>
-        .outage-card {
-            border-radius: 16px;
-            padding: 1.1rem;
-            margin-bottom: 1rem;
-            background: linear-gradient(145deg, #2b2b2b, #1f1f1f);
-            box-shadow: 0 4px 12px rgba(0,0,0,0.35);
-            border-left: 6px solid #6A5ACD;
-            transition: all 0.25s ease;
-        }
-        .outage-card:hover {
-            transform: translateY(-4px);
-            box-shadow: 0 8px 20px rgba(0,0,0,0.55);
-        }
-        .soft-red {
-            border-left-color:#FF6B6B !important;
-            background:linear-gradient(145deg,#3b2020,#2a1a1a);
-        }
-        .soft-orange {
-            border-left-color:#FFB347 !important;
-            background:linear-gradient(145deg,#3d2c17,#2a1e10);
-        }
-        .soft-green {
-            border-left-color:#27AE60 !important;
-            background:linear-gradient(145deg,#20382a,#1a2c22);
-        }
-        .soft-blue {
-            border-left-color:#4A90E2 !important;
-            background:linear-gradient(145deg,#1e2d42,#162232);
-        }
-        .card-title {
-            font-size:1.1rem;
-            font-weight:600;
-            color:#ffffff;
-            margin-bottom:.35rem;
-        }
-        .card-text {
-            font-size:0.9rem;
-            color:#d2d2d2;
-            margin:0.15rem 0;
-        }
-    </style>
+@instrumented
+@st.cache_data(ttl=30)
+def outage_version(_get_conn):
+    """
+    Cheap etag for outtage_info: row count + newest xmin changes on any
+    insert, update or delete. Checked every 30s; the snapshot below only
+    reloads when it moves.
     """
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT COUNT(*), COALESCE(MAX(xmin::text::bigint), 0) FROM outtage_info;"
+            )
+            return tuple(cur.fetchone())
 
 
-# ============================================================
-# 🔵 CACHED QUERIES (FAST)
-# ============================================================
-@st.cache_data(ttl=300)
-def load_upcoming_outages(_get_conn):
-    """Upcoming outages for cards & sidebar."""
+@instrumented
+@st.cache_data(ttl=3600, max_entries=2)
+def load_outage_snapshot(_get_conn, version, today):
+    """
+    Every upcoming outage, enriched (see enrich_outages) with the repeated
+    text columns category-encoded. Cards, details and map all slice this
+    one frame; `version` comes from outage_version().
+    """
     with _get_conn() as conn:
-        return pd.read_sql(
+        df = read_sql(
             """
             SELECT event_id, plant_id, plant_name, plant_state, primary_fuel,
-                   start_date, end_date, duration_days, com
+                   start_date, end_date, duration_days, com, lat, long
             FROM outtage_info
             WHERE start_date >= CURRENT_DATE
             ORDER BY start_date ASC;
             """,
             conn,
         )
+    df = enrich_outages(df, today)
+    for col in ("plant_name", "plant_state", "primary_fuel"):
+        df[col] = df[col].astype("category")
+    return df
+
 
+# max rows the comment search sends back
+COMMENT_SEARCH_LIMIT = 500
 
-@st.cache_data(ttl=300)
-def load_comments(_get_conn):
-    """Rows that have comments."""
+
+def build_tsquery(keywords_input):
+    """
+    Turn the keyword box into a to_tsquery() string:
+    commas = any of, spaces = phrase, trailing * = prefix.
+    'pump, gas turb*' -> '(pump) | (gas <-> turb:*)'
+    """
+    terms = []
+    for keyword in keywords_input.split(","):
+        words = re.findall(r"[A-Za-z0-9]+\*?", keyword.lower())
+        words = [w[:-1] + ":*" if w.endswith("*") else w for w in words]
+        if words:
+            terms.append("(" + " <-> ".join(words) + ")")
+    return " | ".join(terms)
+
+
+@instrumented
+@st.cache_data(ttl=3600, max_entries=2)
+def load_comment_filters(_get_conn, version):
+    """State / fuel options for the comment search dropdowns."""
     with _get_conn() as conn:
-        return pd.read_sql(
+        return read_sql(
             """
-            SELECT event_id, plant_name, plant_state, primary_fuel,
-                   start_date, end_date, duration_days, com
+            SELECT DISTINCT plant_state, primary_fuel
             FROM outtage_info
-            WHERE com IS NOT NULL AND TRIM(com) <> ''
-            ORDER BY start_date DESC;
+            WHERE com IS NOT NULL AND TRIM(com) <> '';
             """,
             conn,
         )
 
 
-@st.cache_data(ttl=300)
-def load_map_outages(_get_conn):
-    """Outages with lat/long for the map."""
-    with _get_conn() as conn:
-        return pd.read_sql(
-            """
+def _comment_filters(tsquery, state, fuel):
+    """WHERE terms, params and rank expression shared by search and export."""
+    filters = ["com IS NOT NULL", "TRIM(com) <> ''"]
+    params = {"q": tsquery}
+
+    if tsquery:
+        filters.append("com_tsv @@ to_tsquery('english', %(q)s)")
+        rank_sql = "ts_rank_cd(com_tsv, to_tsquery('english', %(q)s))"
+    else:
+        rank_sql = "0"
+    if state != "All":
+        filters.append("plant_state = %(state)s")
+        params["state"] = state
+    if fuel != "All":
+        filters.append("primary_fuel = %(fuel)s")
+        params["fuel"] = fuel
+    return filters, params, rank_sql
+
+
+@instrumented
+@st.cache_data(ttl=3600, max_entries=200)
+def search_comments(_get_conn, version, tsquery, state, fuel, today,
+                    limit=COMMENT_SEARCH_LIMIT):
+    """
+    Full-text search over outtage_info.com (GIN index on com_tsv, see
+    migrations.py). Ranked best-first with a highlighted snippet; only
+    `limit` rows come back, total_matches has the full count.
+    Searches every outage, not just upcoming ones, so it stays in SQL
+    instead of slicing the snapshot.
+    """
+    filters, params, rank_sql = _comment_filters(tsquery, state, fuel)
+    params["limit"] = limit
+
+    snippet_sql = (
+        "ts_headline('english', m.com, to_tsquery('english', %(q)s), "
+        "'StartSel=«, StopSel=», MaxFragments=2, MinWords=5, MaxWords=20')"
+        if tsquery else "m.com"
+    )
+
+    # snippets are built only for the rows that survive the LIMIT
+    query = f"""
+        SELECT m.*, {snippet_sql} AS snippet
+        FROM (
             SELECT event_id, plant_name, plant_state, primary_fuel,
-                   start_date, lat, long
+                   start_date, end_date, duration_days, com,
+                   {rank_sql} AS rank,
+                   COUNT(*) OVER () AS total_matches
             FROM outtage_info
-            WHERE lat IS NOT NULL AND long IS NOT NULL
-              AND start_date >= CURRENT_DATE
-            ORDER BY start_date ASC;
-            """,
-            conn,
-        )
+            WHERE {' AND '.join(filters)}
+            ORDER BY rank DESC, start_date DESC
+            LIMIT %(limit)s
+        ) m
+        ORDER BY m.rank DESC, m.start_date DESC;
+    """
+    with _get_conn() as conn:
+        df = read_sql(query, conn, params=params)
+    return enrich_outages(df, today)
 
 
-@st.cache_data(ttl=600)
-def load_contacts(_get_conn, plant_id):
-    """Contacts for a given plant_id (used in sidebar details)."""
-    with _get_conn() as conn:
-        return pd.read_sql(
-            """
-            SELECT cont_fname, cont_lname, email, phone_number, functional_title
+# ============================================================
+# 🔵 EXPORT QUERIES (streamed by export.py, run on click)
+# ============================================================
+def comment_export_query(tsquery, state, fuel):
+    """Every comment match, not just the COMMENT_SEARCH_LIMIT shown."""
+    filters, params, rank_sql = _comment_filters(tsquery, state, fuel)
+    query = f"""
+        SELECT plant_name AS "Plant Name", plant_state AS "State",
+               primary_fuel AS "Fuel", start_date AS "Start Date",
+               end_date AS "End Date", duration_days AS "Duration (Days)",
+               com AS "Comment"
+        FROM outtage_info
+        WHERE {' AND '.join(filters)}
+        ORDER BY {rank_sql} DESC, start_date DESC
+    """
+    return query, params
+
+
+def upcoming_export_query(states, fuel, plant):
+    """Upcoming outages with the Upcoming Outages tab's filters applied."""
+    filters = ["start_date >= CURRENT_DATE"]
+    params = {}
+    if "All" not in states:
+        filters.append("plant_state = ANY(%(states)s)")
+        params["states"] = list(states)
+    if fuel != "All":
+        filters.append("primary_fuel = %(fuel)s")
+        params["fuel"] = fuel
+    if plant != "All":
+        filters.append("plant_name = %(plant)s")
+        params["plant"] = plant
+    query = f"""
+        SELECT plant_name AS "Plant Name", plant_state AS "State",
+               primary_fuel AS "Fuel", start_date AS "Start Date",
+               end_date AS "End Date", duration_days AS "Duration (Days)",
+               com AS "Comment"
+        FROM outtage_info
+        WHERE {' AND '.join(filters)}
+        ORDER BY start_date ASC
+    """
+    return query, params
+
+
+# contacts for this many plants stay in memory (LRU, shared by all sessions)
+CONTACT_CACHE_SIZE = 2000
+CONTACT_CACHE_TTL = 600
+
+CONTACT_COLUMNS = ["cont_fname", "cont_lname", "email", "phone_number", "functional_title"]
+
+
+@st.cache_resource
+def contact_cache():
+    return LRUCache(max_entries=CONTACT_CACHE_SIZE, ttl=CONTACT_CACHE_TTL, name="outtage.contact_cache")
+
+
+@instrumented
+def prefetch_contacts(get_conn, plant_ids):
+    """
+    Load contacts for every plant on the current card page in one query
+    and park them in the LRU, so the details panel never waits on the DB.
+    """
+    cache = contact_cache()
+    missing = [pid for pid in dict.fromkeys(plant_ids) if pid not in cache]
+    if not missing:
+        return
+
+    with get_conn() as conn:
+        df = read_sql(
+            f"""
+            SELECT plant_id, {', '.join(CONTACT_COLUMNS)}
             FROM contact_plant_info
-            WHERE plant_id = %s;
+            WHERE plant_id = ANY(%s);
             """,
             conn,
-            params=[plant_id],
+            params=[missing],
         )
 
+    groups = dict(tuple(df.groupby("plant_id", sort=False)))
+    for pid in missing:
+        found = groups.get(pid)
+        if found is None:
+            found = df.iloc[0:0]
+        cache.set(pid, found[CONTACT_COLUMNS].reset_index(drop=True))
+
+
+@instrumented
+def get_contacts(get_conn, plant_id):
+    """Contacts for a given plant_id (used in the details panel)."""
+    contacts = contact_cache().get(plant_id)
+    if contacts is None:
+        prefetch_contacts(get_conn, [plant_id])
+        contacts = contact_cache().get(plant_id)
+    return contacts
+
 
 @st.cache_data
 def get_distinct_plants(df):
@@ -165,36 +249,186 @@ def get_distinct_plants(df):
 
 
 # ============================================================
-# 🔵 URGENCY HELPERS
+# 🔵 URGENCY (vectorized, one pass per frame)
+# ============================================================
+# (label, css class, rgb, map radius) — first matching bin wins,
+# rows without a start date fall through to UNKNOWN_URGENCY
+URGENCY_BINS = [
+    (7, "Urgent (<7d)", "soft-red", (255, 77, 77), 60000),
+    (30, "Upcoming (<30d)", "soft-orange", (255, 210, 77), 40000),
+    (None, "Future (>30d)", "soft-green", (77, 210, 130), 30000),
+]
+UNKNOWN_URGENCY = ("Unknown", "soft-blue", (160, 160, 180), 30000)
+URGENCY_ORDER = [b[1] for b in URGENCY_BINS] + [UNKNOWN_URGENCY[0]]
+
+# lookup arrays indexed by bin number (last slot = unknown)
+_URGENCY_ROWS = [b[1:] for b in URGENCY_BINS] + [UNKNOWN_URGENCY]
+_URGENCY_LABELS = np.array([r[0] for r in _URGENCY_ROWS], dtype=object)
+_URGENCY_CSS = np.array([r[1] for r in _URGENCY_ROWS], dtype=object)
+_URGENCY_RGB = np.array([r[2] for r in _URGENCY_ROWS], dtype=np.uint8)
+_URGENCY_RADIUS = np.array([r[3] for r in _URGENCY_ROWS], dtype=np.int32)
+
+
+def enrich_outages(df, today):
+    """
+    Parse dates and add days_left, Urgency, css_class, color_r/g/b and
+    radius with datetime64 math and np.select (no per-row .apply).
+    """
+    df = df.copy()
+    df["start_date"] = pd.to_datetime(df["start_date"], errors="coerce")
+    if "end_date" in df:
+        df["end_date"] = pd.to_datetime(df["end_date"], errors="coerce")
+
+    days = (df["start_date"].dt.normalize() - pd.Timestamp(today)).dt.days
+    df["days_left"] = days.astype("Int64")
+
+    known = days.notna().to_numpy()
+    values = days.fillna(0).to_numpy()
+    conditions = [
+        known & (values <= limit) if limit is not None else known
+        for limit, *_ in URGENCY_BINS
+    ]
+    bin_idx = np.select(conditions, list(range(len(URGENCY_BINS))), len(URGENCY_BINS))
+
+    df["Urgency"] = pd.Categorical(
+        _URGENCY_LABELS[bin_idx], categories=URGENCY_ORDER, ordered=True
+    )
+    df["css_class"] = _URGENCY_CSS[bin_idx]
+    df["color_r"], df["color_g"], df["color_b"] = _URGENCY_RGB[bin_idx].T
+    df["radius"] = _URGENCY_RADIUS[bin_idx]
+    return df
+
+
+# ============================================================
+# 🔵 FRAGMENTS (rerun on their own, not the whole page)
 # ============================================================
-def urgency_label(days):
-    if pd.isna(days):
-        return "Unknown"
-    if days <= 7:
-        return "Urgent (<7d)"
-    if days <= 30:
-        return "Upcoming (<30d)"
-    return "Future (>30d)"
-
-
-def urgency_color_class(days):
-    if pd.isna(days):
-        return "soft-blue"
-    if days <= 7:
-        return "soft-red"
-    if days <= 30:
-        return "soft-orange"
-    return "soft-green"
-
-
-def urgency_color_rgb(days):
-    if pd.isna(days):
-        return [160, 160, 180]
-    if days <= 7:
-        return [255, 77, 77]
-    if days <= 30:
-        return [255, 210, 77]
-    return [77, 210, 130]
+PAGE_SIZE = 100
+
+
+def _change_page(step):
+    st.session_state["out_page"] += step
+
+
+def _close_details():
+    st.session_state.pop("selected_outage", None)
+
+
+@st.fragment
+def outage_browser(get_conn, filtered, df):
+    """
+    Prev/Next bar, card grid and details panel as one fragment: a page
+    turn, View or Close reruns only this, never the whole script.
+    """
+    with track_fragment("outage_browser"):
+        cards_col, details_col = st.columns([3, 1])
+        with cards_col:
+            paged_df = outage_pager(get_conn, filtered)
+            clicked = outage_card_grid(
+                paged_df,
+                selected=st.session_state.get("selected_outage"),
+                key="tab2_card_grid",
+            )
+            if clicked is not None and clicked != st.session_state.get("selected_outage"):
+                st.session_state["selected_outage"] = clicked
+                # redraw the grid highlight and the panel; this fragment only
+                st.rerun(scope="fragment")
+        with details_col:
+            with st.container(border=True):
+                outage_details(get_conn, df)
+        run_counts_caption("outage_browser")
+
+
+def outage_pager(get_conn, filtered):
+    """Prev/Next bar; returns the rows of the current page."""
+    total = len(filtered)
+    total_pages = (total - 1) // PAGE_SIZE + 1
+
+    if "out_page" not in st.session_state:
+        st.session_state["out_page"] = 0
+    # filters may have shrunk the result since the last page turn
+    page = min(st.session_state["out_page"], total_pages - 1)
+    st.session_state["out_page"] = page
+
+    start = page * PAGE_SIZE
+    end = start + PAGE_SIZE
+    paged_df = filtered.iloc[start:end]
+
+    # one query for every plant on this page -> instant details panel
+    prefetch_contacts(get_conn, paged_df["plant_id"].dropna().tolist())
+
+    colA, colB, colC = st.columns([1, 2, 1])
+
+    with colA:
+        st.button(
+            "⬅️ Prev", disabled=page == 0,
+            on_click=_change_page, args=(-1,),
+        )
+
+    with colB:
+        st.markdown(
+            f"<div style='text-align:center;font-size:16px;'>"
+            f"Page {page+1} of {total_pages}"
+            f"</div>",
+            unsafe_allow_html=True,
+        )
+
+    with colC:
+        st.button(
+            "Next ➡️", disabled=page >= total_pages - 1,
+            on_click=_change_page, args=(1,),
+        )
+
+    return paged_df
+
+
+def outage_details(get_conn, df):
+    """Details for the selected outage, drawn beside the cards."""
+    if "selected_outage" not in st.session_state:
+        st.caption("Select an outage card and click **View** to see details here.")
+        return
+
+    outage_id = st.session_state["selected_outage"]
+    selected_rows = df[df["event_id"] == outage_id]
+    if selected_rows.empty:
+        st.info("No outage selected.")
+        return
+
+    selected = selected_rows.iloc[0]
+
+    st.subheader(selected["plant_name"])
+    st.write(f"**State:** {selected['plant_state']}")
+    st.write(f"**Fuel:** {selected['primary_fuel']}")
+    st.write(f"**Start:** {selected['start_date'].date()}")
+    st.write(f"**End:** {selected['end_date'].date()}")
+    st.write(
+        f"**Duration:** {selected['duration_days']} days"
+    )
+    st.write("---")
+    st.write("### Notes")
+    st.write(selected["com"] or "No notes available.")
+
+    st.write("---")
+    st.write("### 👥 Key Contacts")
+
+    # plant_id is nullable; int() would raise on NaN
+    if pd.isna(selected["plant_id"]):
+        contacts = pd.DataFrame()
+    else:
+        contacts = get_contacts(get_conn, int(selected["plant_id"]))
+
+    if contacts.empty:
+        st.info("No contacts available!")
+    else:
+        for _, c in contacts.iterrows():
+            st.markdown(
+                f"**{c['cont_fname']} {c['cont_lname']}** — "
+                f"{c['functional_title'] or 'N/A'}  \n"
+                f"📧 {c['email'] or '—'}  \n"
+                f"📞 {c['phone_number'] or '—'}"
+            )
+
+    # the click itself reruns the fragment; the callback runs first
+    st.button("Close details", key="tab2_close_sidebar_outage", on_click=_close_details)
 
 
 # ============================================================
@@ -202,40 +436,23 @@ def urgency_color_rgb(days):
 # ============================================================
 def display_outtages(get_conn):
 
-    # Just card styling; your theme still rules backgrounds/colors.
-    st.markdown(load_outage_css(), unsafe_allow_html=True)
-
     tab1, tab2, tab3 = st.tabs(
         ["Filter by Comments", "Upcoming Outages", "Outages Map"]
     )
 
+    # one etag check per rerun; every loader below keys off it
+    version = outage_version(get_conn)
+    today = date.today()
+
     # ========================================================
     # TAB 1 — COMMENTS
     # ========================================================
     with tab1:
-        df = load_comments(get_conn)
+        options = load_comment_filters(get_conn, version)
 
-        if df.empty:
+        if options.empty:
             st.info("No comments were found.")
         else:
-            # 🟦 Drop event_id column safely (only if exists)
-            df = df.drop(columns=["event_id"], errors="ignore")
-
-            # 🟦 Convert to datetime (keeps original DF clean)
-            df["start_date"] = pd.to_datetime(df["start_date"], errors="coerce")
-            df["end_date"] = pd.to_datetime(df["end_date"], errors="coerce")
-
-            # 🟦 Display-friendly date format (mm/dd/yyyy)
-            df["start_date"] = df["start_date"].dt.strftime("%m/%d/%Y")
-            df["end_date"] = df["end_date"].dt.strftime("%m/%d/%Y")
-
-            # 🟦 Today calc for days_left (use original datetime)
-            today = date.today()
-            df["days_left"] = df["start_date"].apply(
-                lambda d: (pd.to_datetime(d).date() - today).days 
-                if pd.notnull(d) else None
-            )
-
             st.subheader("🔍 Search Comments")
 
             col1, col2, col3 = st.columns(3)
@@ -245,51 +462,48 @@ def display_outtages(get_conn):
                     "Keywords (comma-separated):",
                     "pump, inspection",
                     key="tab1_keywords",
+                    help='Commas match any keyword, "gas turbine" matches the phrase, turb* matches a prefix.',
                 )
 
             with col2:
                 state_filter = st.selectbox(
                     "State",
-                    ["All"] + sorted(df["plant_state"].dropna().unique()),
+                    ["All"] + sorted(options["plant_state"].dropna().unique()),
                     key="tab1_state",
                 )
 
             with col3:
                 fuel_filter = st.selectbox(
                     "Fuel Type",
-                    ["All"] + sorted(df["primary_fuel"].dropna().unique()),
+                    ["All"] + sorted(options["primary_fuel"].dropna().unique()),
                     key="tab1_fuel",
                 )
 
-            keywords = [
-                k.strip().lower()
-                for k in keywords_input.split(",")
-                if k.strip()
-            ]
-
-            filtered = df.copy()
-
-            # Filters
-            if state_filter != "All":
-                filtered = filtered[filtered["plant_state"] == state_filter]
-
-            if fuel_filter != "All":
-                filtered = filtered[filtered["primary_fuel"] == fuel_filter]
-
-            if keywords:
-                filtered = filtered[
-                    filtered["com"]
-                    .astype(str)
-                    .str.lower()
-                    .apply(lambda txt: any(k in txt for k in keywords))
-                ]
+            filtered = search_comments(
+                get_conn, version, build_tsquery(keywords_input),
+                state_filter, fuel_filter, today,
+            )
 
             if filtered.empty:
                 st.warning("No matches found.")
             else:
+                total_matches = int(filtered["total_matches"].iloc[0])
+
+                # 🟦 Keep only display columns (dates/days_left already parsed)
+                filtered = filtered[[
+                    "plant_name", "plant_state", "primary_fuel", "start_date",
+                    "end_date", "duration_days", "snippet", "com", "days_left",
+                ]].copy()
+
+                # 🟦 Display-friendly date format (mm/dd/yyyy)
+                filtered["start_date"] = filtered["start_date"].dt.strftime("%m/%d/%Y")
+                filtered["end_date"] = filtered["end_date"].dt.strftime("%m/%d/%Y")
+
                 c1, c2, _ = st.columns(3)
-                c1.metric("Matching Records", len(filtered))
+                c1.metric("Matching Records", total_matches)
                 c2.metric("Unique Plants", filtered["plant_name"].nunique())
+                if total_matches > len(filtered):
+                    st.caption(f"Showing the {len(filtered)} best matches.")
 
                 # 🟦 Rename columns for display
                 filtered = filtered.rename(columns={
@@ -299,6 +513,7 @@ def display_outtages(get_conn):
                     "duration_days": "Duration (Days)",
                     "start_date": "Start Date",
                     "end_date": "End Date",
+                    "snippet": "Match",
                     "com": "Comment",
                     "days_left":"Days  Left"
                 })
@@ -309,26 +524,24 @@ def display_outtages(get_conn):
                     use_container_width=True,
                     hide_index=True,
                 )
+
+                query, params = comment_export_query(
+                    build_tsquery(keywords_input), state_filter, fuel_filter)
+                csv_download_button(
+                    "Download all matches (CSV)",
+                    get_conn, query, params,
+                    file_name="outage_comment_matches.csv",
+                    key="tab1_export",
+                )
     # ========================================================
     # TAB 2 — UPCOMING OUTAGES (CARDS + SIDEBAR)
     # ========================================================
     with tab2:
-        df = load_upcoming_outages(get_conn)
+        df = load_outage_snapshot(get_conn, version, today)
 
         if df.empty:
             st.info("There are no upcoming outages.")
         else:
-            df["start_date"] = pd.to_datetime(df["start_date"], errors="coerce")
-            df["end_date"] = pd.to_datetime(df["end_date"], errors="coerce")
-
-            today = date.today()
-            df["days_left"] = df["start_date"].apply(
-                lambda d: (d.date() - today).days if pd.notnull(d) else None
-            )
-
-            df["Urgency"] = df["days_left"].apply(urgency_label)
-            df["css_class"] = df["days_left"].apply(urgency_color_class)
-
             st.header("Upcoming Outages")
 
             col1, col2, col3 = st.columns(3)
@@ -375,159 +588,33 @@ def display_outtages(get_conn):
             if filtered.empty:
                 st.warning("No outages match your filters.")
             else:
+                query, params = upcoming_export_query(state_filter, fuel_filter, plant_filter)
+                csv_download_button(
+                    "Download outages (CSV)",
+                    get_conn, query, params,
+                    file_name="upcoming_outages.csv",
+                    key="tab2_export",
+                )
 
-                # ============================================================
-                # ✅ PAGINATION (THIS FIXES ALL LAG)
-                # ============================================================
-                PAGE_SIZE = 100
-
-                if "out_page" not in st.session_state:
-                    st.session_state["out_page"] = 0
-
-                page = st.session_state["out_page"]
-                total = len(filtered)
-                total_pages = (total - 1) // PAGE_SIZE + 1
-
-                start = page * PAGE_SIZE
-                end = start + PAGE_SIZE
-                paged_df = filtered.iloc[start:end]
-
-                # Pagination Controls
-                colA, colB, colC = st.columns([1, 2, 1])
-
-                with colA:
-                    if st.button("⬅️ Prev", disabled=page == 0):
-                        st.session_state["out_page"] -= 1
-                        st.rerun()
-
-                with colB:
-                    st.markdown(
-                        f"<div style='text-align:center;font-size:16px;'>"
-                        f"Page {page+1} of {total_pages}"
-                        f"</div>",
-                        unsafe_allow_html=True,
-                    )
-
-                with colC:
-                    if st.button("Next ➡️", disabled=page >= total_pages - 1):
-                        st.session_state["out_page"] += 1
-                        st.rerun()
-
-                # ============================================================
-                # CARD RENDERING — NOW USING paged_df ONLY
-                # ============================================================
-                with fragment_ctx("tab2_outage_cards"):
-                    cols = st.columns(3)
-
-                    for i, row in enumerate(paged_df.itertuples()):
-                        with cols[i % 3]:
-                            st.markdown(
-                                f"""
-                                <div class="outage-card {row.css_class}">
-                                    <div class="card-title">🏭 {row.plant_name}</div>
-                                    <div class="card-text"><b>State:</b> {row.plant_state}</div>
-                                    <div class="card-text"><b>Fuel:</b> {row.primary_fuel}</div>
-                                    <div class="card-text"><b>Start:</b> {row.start_date.date()}</div>
-                                    <div class="card-text"><b>End:</b> {row.end_date.date()}</div>
-                                    <div class="card-text"><b>Duration:</b> {row.duration_days} days</div>
-                                    <div class="card-text"><b>Note:</b> {(row.com or '')[:70]}...</div>
-                                </div>
-                                """,
-                                unsafe_allow_html=True,
-                            )
-
-                            if st.button(
-                                "View",
-                                key=f"btn_view_{row.event_id}",
-                                use_container_width=True,
-                            ):
-                                st.session_state["selected_outage"] = row.event_id
-
-                # ============================================================
-                # SIDEBAR DETAILS (UNCHANGED)
-                # ============================================================
-                with sidebar_fragment_ctx("tab2_outage_details"):
-                    if "selected_outage" in st.session_state:
-                        outage_id = st.session_state["selected_outage"]
-                        selected_rows = df[df["event_id"] == outage_id]
-
-                        if not selected_rows.empty:
-                            selected = selected_rows.iloc[0]
-
-                            st.subheader(selected["plant_name"])
-                            st.write(f"**State:** {selected['plant_state']}")
-                            st.write(f"**Fuel:** {selected['primary_fuel']}")
-                            st.write(f"**Start:** {selected['start_date'].date()}")
-                            st.write(f"**End:** {selected['end_date'].date()}")
-                            st.write(
-                                f"**Duration:** {selected['duration_days']} days"
-                            )
-                            st.write("---")
-                            st.write("### Notes")
-                            st.write(selected["com"] or "No notes available.")
-
-                            contacts = load_contacts(get_conn, selected["plant_id"])
-                            st.write("---")
-                            st.write("### 👥 Key Contacts")
-
-                            if contacts.empty:
-                                st.info("No contacts available!")
-                            else:
-                                for _, c in contacts.iterrows():
-                                    st.markdown(
-                                        f"**{c['cont_fname']} {c['cont_lname']}** — "
-                                        f"{c['functional_title'] or 'N/A'}  \n"
-                                        f"📧 {c['email'] or '—'}  \n"
-                                        f"📞 {c['phone_number'] or '—'}"
-                                    )
-
-                            if st.button(
-                                "Close details",
-                                key="tab2_close_sidebar_outage",
-                            ):
-                                del st.session_state["selected_outage"]
-                        else:
-                            st.info("No outage selected.")
-                    else:
-                        st.caption("Select an outage card and click **View** to see details here.")
-
-
-
-
-
-
-
+                outage_browser(get_conn, filtered, df)
 
     # ========================================================
     # TAB 3 — MAP
     # ========================================================
     with tab3:
-        df = load_map_outages(get_conn)
+        df = load_outage_snapshot(get_conn, version, today)
+        df = df[df["lat"].notna() & df["long"].notna()]
 
         if df.empty:
             st.info("No location-based outages found.")
         else:
-            df["start_date"] = pd.to_datetime(df["start_date"], errors="coerce")
-
-            today = date.today()
-            df["days_left"] = df["start_date"].apply(
-                lambda d: (d.date() - today).days if pd.notnull(d) else None
-            )
-
-            df["color"] = df["days_left"].apply(urgency_color_rgb)
-            df["radius"] = df["days_left"].apply(
-                lambda d: 60000 if d is not None and d <= 7
-                else 40000 if d is not None and d <= 30
-                else 30000
-            )
-
             st.subheader("🗺️ Outages Map")
 
             layer = pydeck.Layer(
                 "ScatterplotLayer",
                 data=df,
                 get_position=["long", "lat"],
-                get_color="color",
+                get_color="[color_r, color_g, color_b]",
                 get_radius="radius",
                 pickable=True,
                 auto_highlight=True,
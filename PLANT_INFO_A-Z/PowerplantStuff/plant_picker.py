@@ -0,0 +1,84 @@
+import pandas as pd
+import streamlit as st
+
+from cache import cached
+from metrics import instrumented, read_sql
+
+PICKER_LIMIT = 20
+PICKER_MIN_CHARS = 2
+
+
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# ------------------------------------------------------
+# TYPE-AHEAD QUERY
+# ------------------------------------------------------
+@instrumented
+@cached(tables=("general_plant_info",), ttl=300, max_entries=1024)
+def search_plants(_get_conn, text, limit=PICKER_LIMIT):
+    """
+    Top `limit` plants for what's been typed: name prefix matches first
+    (lower(plantname) text_pattern_ops index), then names containing it
+    (trigram index). Returns plant_id, plantname.
+    """
+    needle = _like_escape(text.strip().lower())
+    query = """
+        SELECT plant_id, plantname FROM (
+            (SELECT plant_id, plantname, 0 AS rank
+             FROM general_plant_info
+             WHERE lower(plantname) LIKE %(prefix)s
+             ORDER BY lower(plantname)
+             LIMIT %(limit)s)
+            UNION ALL
+            (SELECT plant_id, plantname, 1 AS rank
+             FROM general_plant_info
+             WHERE plantname ILIKE %(contains)s
+               AND lower(plantname) NOT LIKE %(prefix)s
+             ORDER BY lower(plantname)
+             LIMIT %(limit)s)
+        ) m
+        ORDER BY rank, lower(plantname)
+        LIMIT %(limit)s;
+    """
+    with _get_conn() as conn:
+        return read_sql(
+            query,
+            conn,
+            params={"prefix": needle + "%", "contains": "%" + needle + "%", "limit": limit},
+        )
+
+
+# ------------------------------------------------------
+# WIDGET
+# ------------------------------------------------------
+def plant_picker(get_conn, label, key, limit=PICKER_LIMIT):
+    """
+    Text box + short list of server-side matches, so the browser never gets
+    the full plant list. Returns (plant_id, plantname) or (None, None).
+    """
+    text = st.text_input(
+        label,
+        key=f"{key}_text",
+        placeholder=f"Type at least {PICKER_MIN_CHARS} letters of the plant name",
+    )
+    if len(text.strip()) < PICKER_MIN_CHARS:
+        return None, None
+
+    matches = search_plants(get_conn, text.strip().lower(), limit=limit)
+    if matches.empty:
+        st.caption("No plants match that name.")
+        return None, None
+
+    names = dict(zip(matches["plant_id"].tolist(), matches["plantname"]))
+    plant_id = st.selectbox(
+        f"{label} matches",
+        list(names),
+        format_func=names.get,
+        key=f"{key}_pick",
+        label_visibility="collapsed",
+    )
+    if len(matches) == limit:
+        st.caption(f"Showing the first {limit} matches, keep typing to narrow it down.")
+    return plant_id, names[plant_id]
@@ -0,0 +1,215 @@
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from metrics import instrumented, read_sql
+
+
+# display label -> column, same names/order the Search tab's SQL used
+CONTACT_COLUMNS = {
+    "plantname": "Plant Name",
+    "functional_title": "Functional Title",
+    "actual_title": "Title",
+    "cont_fname": "First Name",
+    "cont_lname": "Last Name",
+    "email": "Email",
+    "phone_number": "Phone Number",
+    "company_address": "Company Address",
+    "company_city": "City",
+    "company_state": "State",
+    "fuel_type_1": "Primary Fuel Type",
+    "company_url": "Company URL",
+}
+DRIVE_COLUMNS = {
+    "plantname": "Plant Name",
+    "drive_name": "Drive Name",
+    "drive_capacity": "Drive Capacity",
+    "drive_manufacturer": "Manufacturer",
+    "drive_type": "Type",
+    "drive_series": "Series",
+    "drive_info": "Info",
+    "drive_primary_fuel": "Primary Fuel",
+    "drive_startup": "Startup Year",
+    "company_state": "State",
+}
+
+YEAR_RE = re.compile(r"^\d{4}$")
+
+
+def _bitmaps(values):
+    """value -> packed bitmap of the rows holding it (NULLs get none)."""
+    codes, uniques = pd.factorize(values)
+    return {u: np.packbits(codes == i) for i, u in enumerate(uniques)}
+
+
+def _row_bitmaps(values, n):
+    """Like _bitmaps, for a Series of values indexed by row (rows may repeat)."""
+    out = {}
+    for value, rows in values.groupby(values).groups.items():
+        mask = np.zeros(n, dtype=bool)
+        mask[rows.to_numpy()] = True
+        out[value] = np.packbits(mask)
+    return out
+
+
+class PlantSearchIndex:
+    """
+    In-memory copy of plants, contacts and drives for the Search tab.
+
+    Rows are stored already joined and in display order; every dropdown
+    value has a precomputed bitmap, so a search is a few ANDs plus one
+    take(). Shared by all sessions, treat the frames as read-only.
+    """
+
+    def __init__(self, plants, contacts, drives):
+        plants = plants.reset_index(drop=True)
+
+        # LEFT JOIN + DISTINCT: contactless plants keep one row
+        contact_rows = (
+            plants.merge(contacts, on="plant_id", how="left")
+            .drop_duplicates(subset=list(CONTACT_COLUMNS))
+            .sort_values("plantname", kind="stable")
+        )
+        drive_rows = (
+            drives.merge(plants, on="plant_id", how="inner")
+            .sort_values("plantname", kind="stable")
+        )
+
+        self.plants = plants
+        self.contacts = contact_rows[list(CONTACT_COLUMNS)].rename(columns=CONTACT_COLUMNS)
+        self.drives = drive_rows[list(DRIVE_COLUMNS)].rename(columns=DRIVE_COLUMNS)
+        self.contacts.reset_index(drop=True, inplace=True)
+        self.drives.reset_index(drop=True, inplace=True)
+
+        # row -> plant position, to fan plant masks out to contacts/drives
+        pos = pd.Series(np.arange(len(plants)), index=plants["plant_id"])
+        self._contact_plant = pos.reindex(contact_rows["plant_id"]).to_numpy()
+        self._drive_plant = pos.reindex(drive_rows["plant_id"]).to_numpy()
+
+        self._names = plants["plantname"].fillna("").str.lower().to_numpy(dtype=object)
+        self._plant_bitmaps = {
+            "state": _bitmaps(plants["company_state"]),
+            "fuel": _bitmaps(plants["fuel_type_1"]),
+        }
+        self._drive_bitmaps = {
+            "drive_info": _bitmaps(drive_rows["drive_info"]),
+            "manufacturer": _bitmaps(drive_rows["drive_manufacturer"]),
+        }
+        # every 4-digit run, overlapping: "1990/1995" -> 1990, 1995 and
+        # "19955" -> 1995, 9955, so a year finds what ILIKE '%1995%' did
+        years = (
+            drive_rows["drive_startup"].astype("string").reset_index(drop=True)
+            .str.findall(r"(?=(\d{4}))").explode().dropna()
+        )
+        self._drive_bitmaps["startup"] = _row_bitmaps(years, len(drive_rows))
+
+    @staticmethod
+    def _lookup(bitmaps, key, value, n):
+        bitmap = bitmaps[key].get(value)
+        if bitmap is None:
+            return np.zeros((n + 7) // 8, dtype=np.uint8)
+        return bitmap
+
+    def _plant_mask(self, plantname, state, fuel):
+        n = len(self.plants)
+        packed = np.packbits(np.ones(n, dtype=bool))
+        if state:
+            packed = packed & self._lookup(self._plant_bitmaps, "state", state, n)
+        if fuel:
+            packed = packed & self._lookup(self._plant_bitmaps, "fuel", fuel, n)
+        mask = np.unpackbits(packed, count=n).astype(bool)
+        if plantname:
+            # same as ILIKE '%name%'; the name comes from a dropdown
+            needle = plantname.lower()
+            mask &= np.fromiter((needle in s for s in self._names), bool, n)
+        return mask
+
+    @staticmethod
+    def can_answer(startup):
+        """Only whole years are indexed; other startup text goes to SQL."""
+        return not startup or bool(YEAR_RE.match(startup))
+
+    def search(self, plantname=None, state=None, fuel=None,
+               drive_info=None, manufacturer=None, startup=None):
+        """
+        Filters left as None/"" are ignored. Returns (contact_df, drive_df)
+        shaped like the old SQL results.
+        """
+        plant_mask = self._plant_mask(plantname, state, fuel)
+
+        n = len(self.drives)
+        packed = np.packbits(plant_mask[self._drive_plant])
+        if drive_info:
+            packed = packed & self._lookup(self._drive_bitmaps, "drive_info", drive_info, n)
+        if manufacturer:
+            packed = packed & self._lookup(self._drive_bitmaps, "manufacturer", manufacturer, n)
+        if startup:
+            packed = packed & self._lookup(self._drive_bitmaps, "startup", startup, n)
+        drive_mask = np.unpackbits(packed, count=n).astype(bool)
+
+        contact_df = self.contacts[plant_mask[self._contact_plant]].reset_index(drop=True)
+        drive_df = self.drives[drive_mask].reset_index(drop=True)
+        return contact_df, drive_df
+
+
+# ------------------------------------------------------
+# CACHED LOADERS
+# ------------------------------------------------------
+@instrumented
+@st.cache_data(ttl=60)
+def search_index_version(_get_conn):
+    """
+    Row count + newest xmin of the three tables; moves on any insert,
+    update or delete, which is when load_search_index rebuilds.
+    """
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT
+                    (SELECT (COUNT(*), COALESCE(MAX(xmin::text::bigint), 0))::text
+                     FROM general_plant_info),
+                    (SELECT (COUNT(*), COALESCE(MAX(xmin::text::bigint), 0))::text
+                     FROM contact_plant_info),
+                    (SELECT (COUNT(*), COALESCE(MAX(xmin::text::bigint), 0))::text
+                     FROM plant_drive_info);
+                """
+            )
+            return tuple(cur.fetchone())
+
+
+@instrumented
+@st.cache_resource(max_entries=2)
+def load_search_index(_get_conn, version):
+    """Build the shared PlantSearchIndex; `version` from search_index_version()."""
+    with _get_conn() as conn:
+        plants = read_sql(
+            """
+            SELECT plant_id, plantname, company_address, company_city,
+                   company_state, fuel_type_1, company_url
+            FROM general_plant_info;
+            """,
+            conn,
+        )
+        contacts = read_sql(
+            """
+            SELECT plant_id, functional_title, actual_title, cont_fname,
+                   cont_lname, email, phone_number
+            FROM contact_plant_info
+            WHERE plant_id IS NOT NULL;
+            """,
+            conn,
+        )
+        drives = read_sql(
+            """
+            SELECT plant_id, drive_name, drive_capacity, drive_manufacturer,
+                   drive_type, drive_series, drive_info, drive_primary_fuel,
+                   drive_startup
+            FROM plant_drive_info
+            WHERE plant_id IS NOT NULL;
+            """,
+            conn,
+        )
+    return PlantSearchIndex(plants, contacts, drives)
@@ -0,0 +1,233 @@
+"""
+Slow-query log: every statement slower than SLOW_QUERY_MS goes to a
+rotating JSONL file with its SQL, bound params, tab and loader. The first
+time a query shape (fingerprint) is slow in a process, its
+EXPLAIN (ANALYZE, BUFFERS) plan is captured too.
+
+    python slowlog.py                     # p50/p95/p99 per fingerprint
+    python slowlog.py --show 3f2a9c01d4e7 # SQL, params and plan for one shape
+"""
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+import psycopg2
+import psycopg2.extensions
+
+from metrics import current_context
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 500))
+SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG", os.path.join(BASE_DIR, "slow_queries.jsonl"))
+SLOW_QUERY_LOG_BYTES = int(os.environ.get("SLOW_QUERY_LOG_BYTES", 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get("SLOW_QUERY_LOG_BACKUPS", 5))
+# 0 = log slow queries but never re-run them under EXPLAIN ANALYZE
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "1") != "0"
+
+_explained = set()           # fingerprints already explained in this process
+_explained_lock = threading.Lock()
+_logger_lock = threading.Lock()
+
+READ_ONLY_RE = re.compile(r"^\s*(select|with)\b", re.I)
+WRITE_RE = re.compile(r"\b(insert|update|delete|merge|truncate|copy)\b", re.I)
+
+
+# ------------------------------------------------------
+# FINGERPRINTS
+# ------------------------------------------------------
+def normalize(sql):
+    """Query shape: comments, literals, params and whitespace flattened."""
+    text = re.sub(r"--[^\n]*|/\*.*?\*/", " ", sql, flags=re.S)
+    text = re.sub(r"'(?:[^']|'')*'", "?", text)
+    text = re.sub(r"%\(\w+\)s|%s", "?", text)
+    text = re.sub(r"\b\d+(?:\.\d+)?\b", "?", text)
+    text = re.sub(r"\s+", " ", text).strip().rstrip(";").strip().lower()
+    # IN (?, ?, ?) and friends collapse to one shape
+    return re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?)", text)
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:12]
+
+
+# ------------------------------------------------------
+# LOG FILE
+# ------------------------------------------------------
+def _logger():
+    logger = logging.getLogger("dashboard.slow_queries")
+    with _logger_lock:
+        if not logger.handlers:
+            handler = RotatingFileHandler(
+                SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES,
+                backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def _explain(conn, sql, params):
+    """Plan text for a read-only statement, run inside a savepoint that is rolled back."""
+    if not READ_ONLY_RE.match(sql) or WRITE_RE.search(sql):
+        return None
+    if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_INTRANS:
+        return None
+    # plain cursor: the plan query itself must not be traced
+    with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+        cur.execute("SAVEPOINT slowlog_explain;")
+        try:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+            return [row[0] for row in cur.fetchall()]
+        except psycopg2.Error as e:
+            return [f"EXPLAIN failed: {e}".strip()]
+        finally:
+            cur.execute("ROLLBACK TO SAVEPOINT slowlog_explain;")
+
+
+def log_slow(cur, sql, params, elapsed_ms, error=None):
+    fp = fingerprint(sql)
+    tab, loader = current_context()
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "ms": round(elapsed_ms, 2),
+        "fingerprint": fp,
+        "tab": tab,
+        "loader": loader,
+        "rows": cur.rowcount,
+        "sql": sql.strip(),
+        "params": params,
+    }
+    if error:
+        record["error"] = error
+
+    if SLOW_QUERY_EXPLAIN and error is None:
+        with _explained_lock:
+            first = fp not in _explained
+            _explained.add(fp)
+        if first:
+            try:
+                record["plan"] = _explain(cur.connection, sql, params)
+            except psycopg2.Error:
+                pass    # connection went bad; the query itself already finished
+
+    _logger().info(json.dumps(record, default=str))
+
+
+class TracingCursor(psycopg2.extensions.cursor):
+    """Cursor factory for the pool: times execute() and logs slow statements."""
+
+    def execute(self, query, vars=None):
+        t0 = time.perf_counter()
+        error = None
+        try:
+            return super().execute(query, vars)
+        except psycopg2.Error as e:
+            error = str(e).strip()
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            if elapsed_ms >= SLOW_QUERY_MS:
+                sql = query if isinstance(query, str) else (
+                    query.as_string(self) if hasattr(query, "as_string") else query.decode())
+                try:
+                    log_slow(self, sql, vars, elapsed_ms, error)
+                except Exception:
+                    pass    # never let logging break the query
+
+
+# ------------------------------------------------------
+# REPORT
+# ------------------------------------------------------
+def read_log(path=SLOW_QUERY_LOG):
+    """Records from the log and its rotated backups, oldest file first."""
+    # RotatingFileHandler: .1 is the newest backup, the highest number the oldest
+    backups = [p for p in glob.glob(path + ".*") if p.rsplit(".", 1)[1].isdigit()]
+    backups.sort(key=lambda p: int(p.rsplit(".", 1)[1]), reverse=True)
+    for name in backups + [path]:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+def summarize(records):
+    groups = {}
+    for r in records:
+        g = groups.setdefault(r["fingerprint"], {"ms": [], "tabs": set(), "sql": r["sql"]})
+        g["ms"].append(r["ms"])
+        if r.get("tab"):
+            g["tabs"].add(r["tab"])
+    rows = []
+    for fp, g in groups.items():
+        ms = sorted(g["ms"])
+        rows.append({
+            "fingerprint": fp, "count": len(ms),
+            "p50": percentile(ms, 50), "p95": percentile(ms, 95),
+            "p99": percentile(ms, 99), "max": ms[-1],
+            "tabs": ", ".join(sorted(g["tabs"])), "sql": normalize(g["sql"]),
+        })
+    return sorted(rows, key=lambda r: r["p95"] * r["count"], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the dashboard slow-query log.")
+    parser.add_argument("--log", default=SLOW_QUERY_LOG, help="log file (rotated backups are read too)")
+    parser.add_argument("--top", type=int, default=20, help="fingerprints to list")
+    parser.add_argument("--since", help="only records at/after this ISO timestamp")
+    parser.add_argument("--show", metavar="FINGERPRINT",
+                        help="print the latest SQL, params and captured plan for one fingerprint")
+    args = parser.parse_args(argv)
+
+    records = list(read_log(args.log))
+    if args.since:
+        since = datetime.fromisoformat(args.since)
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        records = [r for r in records if datetime.fromisoformat(r["ts"]) >= since]
+    if not records:
+        print("no slow queries logged")
+        return 0
+
+    if args.show:
+        matches = [r for r in records if r["fingerprint"].startswith(args.show)]
+        if not matches:
+            print(f"no records for {args.show}")
+            return 1
+        latest = matches[-1]
+        plan = next((r["plan"] for r in reversed(matches) if r.get("plan")), None)
+        print(f"{latest['fingerprint']}  {len(matches)} slow runs, latest {latest['ms']:.0f} ms "
+              f"({latest['ts']}, tab={latest.get('tab')}, loader={latest.get('loader')})")
+        print(f"\n{latest['sql']}\n\nparams: {json.dumps(latest['params'], default=str)}")
+        print("\n" + ("\n".join(plan) if plan else "(no plan captured)"))
+        return 0
+
+    print(f"{len(records):,} slow queries, {len({r['fingerprint'] for r in records})} shapes\n")
+    print(f"{'fingerprint':<13} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  tabs / sql")
+    for row in summarize(records)[:args.top]:
+        print(f"{row['fingerprint']:<13} {row['count']:>6} {row['p50']:>9.1f} {row['p95']:>9.1f} "
+              f"{row['p99']:>9.1f} {row['max']:>9.1f}  {row['tabs'] or '-'}")
+        print(f"{'':<13} {row['sql'][:110]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,17 +1,19 @@
 import sys, os
-import io
 from activity import display_sales_activity
 from all_plants import display_all_plant
+from cache import cache_stats, cached
 from calldir import call_directory
+from db import get_conn, pool_metrics
+from export import csv_download_button, xlsx_download_button
 from login import logout_user, show_login
+from metrics import instrumented, perf_panel, read_sql, start_metrics_server, track_rerun
 from outtage import display_outtages
-import psycopg2
+from plant_picker import plant_picker
+from search_index import PlantSearchIndex, load_search_index, search_index_version
 import streamlit as st
 import pandas as pd
 import warnings
 from PIL import Image
-from pandas import ExcelWriter
-import xlsxwriter
 from st_aggrid import AgGrid, GridOptionsBuilder
 from dotenv import load_dotenv
 
@@ -32,76 +34,71 @@ st.set_page_config(
 # ignore a warning in terminal just tells me to use sqlalchemy
 warnings.filterwarnings("ignore", category=UserWarning, module="psycopg2")
 
+# Prometheus /metrics on METRICS_PORT (once per process, see metrics.py)
+start_metrics_server()
+
 # ------------------------------------------------------
-# DB connection
+# DB connection (pooled, see db.py)
 # ------------------------------------------------------
-conn = psycopg2.connect(os.environ["DATABASE_URL"])
-def get_conn():
-    return psycopg2.connect(os.environ["DATABASE_URL"])
 
 # ------------------------------------------------------
 # CACHED LOADERS for Plant Search tab
 # ------------------------------------------------------
-@st.cache_data(ttl=900)
+@instrumented
+@cached(tables=("general_plant_info", "plant_drive_info"), ttl=900)
 def load_filter_data():
     """
-    Load plant names, fuel types, and manufacturers and drive types for dropdowns.
+    Load fuel types, manufacturers and drive types for dropdowns (plant
+    names come from the type-ahead picker instead).
     Tables: general_plant_info, plant_drive_info (mostly static).
     """
     with get_conn() as conn:
-        plant_names = pd.read_sql(
-            "SELECT DISTINCT plantname FROM general_plant_info "
-            "WHERE plantname IS NOT NULL ORDER BY plantname;",
-            conn
-        )
-        fuel_types = pd.read_sql(
+        fuel_types = read_sql(
             "SELECT DISTINCT fuel_type_1 FROM general_plant_info "
             "WHERE fuel_type_1 IS NOT NULL ORDER BY fuel_type_1;",
             conn
         )
-        manufacturers = pd.read_sql(
+        manufacturers = read_sql(
             "SELECT DISTINCT drive_manufacturer FROM plant_drive_info "
             "WHERE drive_manufacturer IS NOT NULL ORDER BY drive_manufacturer;",
             conn
         )
-        drive_types = pd.read_sql(
+        drive_types = read_sql(
             "SELECT DISTINCT drive_info FROM plant_drive_info "
             "WHERE drive_info IS NOT NULL ORDER BY drive_info;",
             conn
         )
 
-    plant_option = ["All"] + plant_names["plantname"].dropna().tolist()
     fuel_options = ["All"] + fuel_types["fuel_type_1"].dropna().tolist()
     manufacturer_options = ["All"] + manufacturers["drive_manufacturer"].dropna().tolist()
     drive_info_options = ["All"] + drive_types["drive_info"].dropna().tolist()
 
-    return plant_option, fuel_options, manufacturer_options, drive_info_options
+    return fuel_options, manufacturer_options, drive_info_options
 
 
-@st.cache_data(ttl=120)
+@instrumented
+@cached(tables=("general_plant_info", "contact_plant_info", "plant_drive_info"), ttl=120)
 def load_main_plant_summary():
     """
     Load the main plant list with contact & drive counts.
-    Uses contact_plant_info (changes more often), so TTL is short.
+    Reads the trigger-maintained plant_summary view (migration
+    002_plant_summary_counts); counts are current, the TTL only saves the trip.
     """
     query = """
-        SELECT DISTINCT 
-            g.plant_id, 
-            g.plantname, 
-            g.ownername, 
-            g.company_city, 
-            g.company_state, 
-            g.fuel_type_1,
-            COUNT(DISTINCT c.cont_id) AS contact_count,
-            COUNT(DISTINCT d.drive_id) AS drive_count
-        FROM general_plant_info g
-        INNER JOIN contact_plant_info c ON g.plant_id = c.plant_id
-        INNER JOIN plant_drive_info d ON g.plant_id = d.plant_id
-        GROUP BY g.plant_id, g.plantname, g.ownername, g.company_address, g.company_city, g.company_state, g.fuel_type_1
-        ORDER BY g.plantname ASC;
+        SELECT
+            plant_id,
+            plantname,
+            ownername,
+            company_city,
+            company_state,
+            fuel_type_1,
+            contact_count,
+            drive_count
+        FROM plant_summary
+        ORDER BY plantname ASC;
     """
     with get_conn() as conn:
-        df = pd.read_sql_query(query, conn)
+        df = read_sql(query, conn)
         df = df.rename(columns={
             "plantname": "Plant Name",
             "ownername": "Owner Name",
@@ -128,6 +125,12 @@ user = show_login(get_conn)
 st.sidebar.markdown(f"👋 Logged in as **{user['full_name'] or user['username']}** ({user['role']})")
 if st.sidebar.button("🚪 Logout"):
     logout_user()
+
+if user["role"] == "admin":
+    with st.sidebar.expander("🔌 DB Pool"):
+        st.json(pool_metrics())
+    with st.sidebar.expander("🧮 Loader caches"):
+        st.dataframe(pd.DataFrame(cache_stats()), hide_index=True)
     
 # ------------------------------------------------------
 # HEADER
@@ -216,6 +219,84 @@ st.markdown(
 # ------------------------------------------------------
 # TAB 1 FUNCTION: Search Plants By Name
 # ------------------------------------------------------
+def build_search_queries(plantname, plantstate, plantfuel,
+                         drive_info, drivemanufacturer, drivestartup):
+    """
+    SQL for the Search tab: (contact_query, drive_query, plant_params,
+    drive_params). Contacts get the plant filters, drives get both.
+    """
+    # --- JOINT FILTER LOGIC ---
+    plant_filters = []
+    plant_params = []
+
+    drive_filters = []
+    drive_params = []
+
+    # ✅ Plant filters
+    if plantname and plantname != "All":
+        plant_filters.append("g.plantname ILIKE %s")
+        plant_params.append(f"%{plantname}%")
+    if plantstate and plantstate != "All":
+        plant_filters.append("g.company_state = %s")
+        plant_params.append(plantstate)
+    if plantfuel and plantfuel != "All":
+        plant_filters.append("g.fuel_type_1 = %s")
+        plant_params.append(plantfuel)
+
+    # ✅ Drive filters
+    if drive_info and drive_info.strip() != "All":
+        drive_filters.append("d.drive_info = %s")
+        drive_params.append(drive_info)
+    if drivemanufacturer and drivemanufacturer != "All":
+        drive_filters.append("d.drive_manufacturer = %s")
+        drive_params.append(drivemanufacturer)
+    if drivestartup and drivestartup.strip() != "":
+        drive_filters.append("d.drive_startup ILIKE %s")
+        drive_params.append(f"%{drivestartup}%")
+
+    # Contact Query (plant filters only)
+    contact_query = f"""
+        SELECT DISTINCT
+            g.plantname AS "Plant Name", 
+            c.functional_title AS "Functional Title", 
+            c.actual_title AS "Title", 
+            c.cont_fname AS "First Name", 
+            c.cont_lname AS "Last Name", 
+            c.email AS "Email", 
+            c.phone_number AS "Phone Number",
+            g.company_address AS "Company Address", 
+            g.company_city  AS "City", 
+            g.company_state AS "State", 
+            g.fuel_type_1 AS "Primary Fuel Type", 
+            g.company_url AS "Company URL"
+        FROM general_plant_info g
+        LEFT JOIN contact_plant_info c ON g.plant_id = c.plant_id
+        {' WHERE ' + ' AND '.join(plant_filters) if plant_filters else ''}
+        ORDER BY g.plantname
+    """
+    # Drive Query (plant + drive filters)
+    drive_query = f"""                 
+        SELECT
+            g.plantname AS "Plant Name",
+            d.drive_name AS "Drive Name",
+            d.drive_capacity AS "Drive Capacity",
+            d.drive_manufacturer AS "Manufacturer",
+            d.drive_type AS "Type",
+            d.drive_series AS "Series",
+            d.drive_info AS "Info",
+            d.drive_primary_fuel AS "Primary Fuel",
+            d.drive_startup AS "Startup Year",
+            g.company_state AS "State"
+        FROM plant_drive_info d
+        JOIN general_plant_info g ON g.plant_id = d.plant_id
+        { 'WHERE ' + ' AND '.join(plant_filters + drive_filters) 
+            if (plant_filters or drive_filters) else '' }
+        ORDER BY g.plantname
+    """
+
+    return contact_query, drive_query, plant_params, drive_params
+
+
 def tab_search_plants():
     st.header("🏭 Powerplants with Contacts & Drives")
     
@@ -249,15 +330,16 @@ def tab_search_plants():
 
         # Fetch distinct values for dropdowns (CACHED)
         try:
-            plant_option, fuel_options, manufacturer_options, drive_info_options = load_filter_data()
+            fuel_options, manufacturer_options, drive_info_options = load_filter_data()
         except Exception as e:
             st.error(f"Error loading dropdown data: {e}")
-            plant_option, fuel_options, manufacturer_options = ["All"], ["All"], ["All"]
+            fuel_options, manufacturer_options, drive_info_options = ["All"], ["All"], ["All"]
 
         # 1st row (Plant filters)
         col1, col2, col3 = st.columns(3)
         with col1:
-            plantname = st.selectbox("Plant Name", plant_option, key="p1")
+            _, plantname = plant_picker(get_conn, "Plant Name", key="p1")
+            plantname = plantname or "All"
         with col2:
             plantstate = st.selectbox("Plant State", state_list, key="p2")
         with col3:
@@ -316,80 +398,28 @@ def tab_search_plants():
                 mime="text/csv",
             )
 
-    # --- JOINT FILTER LOGIC ---
-    plant_filters = []
-    plant_params = []
-
-    drive_filters = []
-    drive_params = []
-
-    # ✅ Plant filters
-    if plantname and plantname != "All":
-        plant_filters.append("g.plantname ILIKE %s")
-        plant_params.append(f"%{plantname}%")
-    if plantstate and plantstate != "All":
-        plant_filters.append("g.company_state = %s")
-        plant_params.append(plantstate)
-    if plantfuel and plantfuel != "All":
-        plant_filters.append("g.fuel_type_1 = %s")
-        plant_params.append(plantfuel)
-
-    # ✅ Drive filters
-    if drive_info and drive_info.strip() != "All":
-        drive_filters.append("d.drive_info = %s")
-        drive_params.append(drive_info)
-    if drivemanufacturer and drivemanufacturer != "All":
-        drive_filters.append("d.drive_manufacturer = %s")
-        drive_params.append(drivemanufacturer)
-    if drivestartup and drivestartup.strip() != "":
-        drive_filters.append("d.drive_startup ILIKE %s")
-        drive_params.append(f"%{drivestartup}%")
+    contact_query, drive_query, plant_params, drive_params = build_search_queries(
+        plantname, plantstate, plantfuel, drive_info, drivemanufacturer, drivestartup,
+    )
 
     # --- EXECUTE SEARCH ---
     if search_btn:
-        with get_conn() as conn:
-            # Contact Query (plant filters only)
-            contact_query = f"""
-                SELECT DISTINCT
-                    g.plantname AS "Plant Name", 
-                    c.functional_title AS "Functional Title", 
-                    c.actual_title AS "Title", 
-                    c.cont_fname AS "First Name", 
-                    c.cont_lname AS "Last Name", 
-                    c.email AS "Email", 
-                    c.phone_number AS "Phone Number",
-                    g.company_address AS "Company Address", 
-                    g.company_city  AS "City", 
-                    g.company_state AS "State", 
-                    g.fuel_type_1 AS "Primary Fuel Type", 
-                    g.company_url AS "Company URL"
-                FROM general_plant_info g
-                LEFT JOIN contact_plant_info c ON g.plant_id = c.plant_id
-                {' WHERE ' + ' AND '.join(plant_filters) if plant_filters else ''}
-                ORDER BY g.plantname;
-            """
-            contact_df = pd.read_sql_query(contact_query, conn, params=plant_params)
-
-            # Drive Query (plant + drive filters)
-            drive_query = f"""                 
-                SELECT
-                    g.plantname AS "Plant Name",
-                    d.drive_name AS "Drive Name",
-                    d.drive_capacity AS "Drive Capacity",
-                    d.drive_manufacturer AS "Manufacturer",
-                    d.drive_type AS "Type",
-                    d.drive_series AS "Series",
-                    d.drive_info AS "Info",
-                    d.drive_primary_fuel AS "Primary Fuel",
-                    d.drive_startup AS "Startup Year",
-                    g.company_state AS "State"
-                FROM plant_drive_info d
-                JOIN general_plant_info g ON g.plant_id = d.plant_id
-                { 'WHERE ' + ' AND '.join(plant_filters + drive_filters) 
-                    if (plant_filters or drive_filters) else '' }
-                ORDER BY g.plantname
-            """
-            drive_df = pd.read_sql_query(drive_query, conn, params=plant_params + drive_params)
+        # dropdowns (and a whole startup year) are answered from the
+        # in-memory index; partial startup text still goes to SQL
+        if PlantSearchIndex.can_answer(drivestartup.strip()):
+            index = load_search_index(get_conn, search_index_version(get_conn))
+            contact_df, drive_df = index.search(
+                plantname=plantname if plantname != "All" else None,
+                state=plantstate if plantstate != "All" else None,
+                fuel=plantfuel if plantfuel != "All" else None,
+                drive_info=drive_info if drive_info.strip() != "All" else None,
+                manufacturer=drivemanufacturer if drivemanufacturer != "All" else None,
+                startup=drivestartup.strip() or None,
+            )
+        else:
+            with get_conn() as conn:
+                contact_df = read_sql(contact_query, conn, params=plant_params)
+                drive_df = read_sql(drive_query, conn, params=plant_params + drive_params)
 
         # --- DISPLAY RESULTS ---
         if not contact_df.empty:
@@ -412,39 +442,34 @@ def tab_search_plants():
         
             col1, col2, col3 = st.columns([1, 1, 1])
 
+            # files are built from the SQL only when a button is clicked
             with col1:
                 if not contact_df.empty:
-                    st.download_button(
-                        label="Download Contacts CSV",
-                        data=contact_df.to_csv(index=False).encode("utf-8"),
+                    csv_download_button(
+                        "Download Contacts CSV",
+                        get_conn, contact_query, plant_params,
                         file_name=f"{plantname}_plant_contact_results_{plantstate}.csv",
-                        mime="text/csv",
                         use_container_width=True
                     )
             with col2:
                 if not drive_df.empty:
-                    st.download_button(
-                        label="Download Drive CSV",
-                        data=drive_df.to_csv(index=False).encode("utf-8"),
+                    csv_download_button(
+                        "Download Drive CSV",
+                        get_conn, drive_query, plant_params + drive_params,
                         file_name=f"{plantname}_drive_info_{plantfuel}.csv",
-                        mime="text/csv",
                         use_container_width=True
                     )
             with col3:
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                    if not contact_df.empty:
-                        contact_df.to_excel(writer, sheet_name="Contacts", index=False)
-                    if not drive_df.empty:
-                        drive_df.to_excel(writer, sheet_name="Drive", index=False)
-                
-                buffer.seek(0)
-
-                st.download_button(
-                    label="Download Contact & Driver Information",
-                    data=buffer,
+                sheets = []
+                if not contact_df.empty:
+                    sheets.append(("Contacts", contact_query, plant_params))
+                if not drive_df.empty:
+                    sheets.append(("Drive", drive_query, plant_params + drive_params))
+
+                xlsx_download_button(
+                    "Download Contact & Driver Information",
+                    get_conn, sheets,
                     file_name=f"{plantname}_info.xlsx",
-                    mime="application/vnd.openxmlformats-officedocuments.spreadsheetml.sheet",
                     use_container_width=True
                 )
 
@@ -457,21 +482,27 @@ current_role = st.session_state.get("role", "admin")
 # ------------------------------------------------------
 # ROUTE TO SELECTED TAB
 # ------------------------------------------------------
-if tab == "Search Plants By Name":
-    tab_search_plants()
+# timed per tab; the admin panel below shows what this rerun cost
+with track_rerun(tab):
+    if tab == "Search Plants By Name":
+        tab_search_plants()
+
+    elif tab == "Call Directory Overview":
+        # this function draws its own layout
+        call_directory(get_conn)
 
-elif tab == "Call Directory Overview":
-    # this function draws its own layout
-    call_directory(get_conn)
+    elif tab == "All Plants":
+        display_all_plant(get_conn)
 
-elif tab == "All Plants":
-    display_all_plant(get_conn)
+    elif tab == "Sales Activity":
+        display_sales_activity(get_conn)
 
-elif tab == "Sales Activity":
-    display_sales_activity(get_conn)
+    elif tab == "Outtages":
+        display_outtages(get_conn)
 
-elif tab == "Outtages":
-    display_outtages(get_conn)
+if user["role"] == "admin":
+    with st.sidebar.expander("⏱ Performance"):
+        perf_panel()
 
 # ------------------------------------------------------
 # FOOTER